@@ -0,0 +1,334 @@
+# benchmark_geracao.py — mede gerar_documento / salvar_documento com templates sintéticos.
+#
+# Uso (na raiz do projeto):
+#   python -m bench.benchmark_geracao                       # todos os cenários, 3 repetições
+#   python -m bench.benchmark_geracao --cenarios pequeno,medio --repeticoes 5
+#   python -m bench.benchmark_geracao --saida bench/resultados/antes.json
+#   python -m bench.benchmark_geracao --baixa-memoria        # compara o pico de RSS no modo de baixa memória
+#
+# Para cada cenário (tamanho do template x número de pedidos x caminho Composer/mesclador interno) os templates
+# são gerados em uma pasta temporária e o cenário roda em um processo novo, para que o pico de RSS e o
+# cache de templates frio/quente sejam medidos de forma independente. O resultado é gravado em JSON
+# (um objeto por cenário) para comparar execuções ao longo do tempo.
+#
+# Formatação dos runs: o modelo_base traz um parágrafo cujo placeholder está num run com cor, realce, caixa alta,
+# itálico, sublinhado e fonte próprios. "fidelidade_formatacao" conta quantas dessas propriedades o valor
+# substituído manteve, e a fase "formatar_runs" mede a substituição em cópias desse parágrafo e a criação
+# dos títulos dos pedidos.
+import argparse
+import json
+import os
+import platform
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from copy import deepcopy
+from multiprocessing import get_context
+
+try:
+    import resource  # indisponível no Windows
+except ImportError:
+    resource = None
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nome -> parâmetros dos templates sintéticos
+CENARIOS = {
+    "pequeno": {"paragrafos": 20, "runs_por_paragrafo": 2, "tabelas": 1, "aninhamento": 1, "pedidos": 1, "paragrafos_pedido": 10},
+    "medio": {"paragrafos": 200, "runs_por_paragrafo": 4, "tabelas": 3, "aninhamento": 2, "pedidos": 10, "paragrafos_pedido": 40},
+    "grande": {"paragrafos": 1000, "runs_por_paragrafo": 6, "tabelas": 6, "aninhamento": 3, "pedidos": 50, "paragrafos_pedido": 80},
+}
+
+# parágrafo do modelo_base com formatação rica no run do placeholder (fidelidade_formatacao)
+MARCADOR_FORMATACAO = "Formatação: "
+RUNS_FORMATACAO = 300
+
+CAMPOS_EXEMPLO = {
+    "Nome reclamante": "FULANO DE TAL", "Profissao / Cargo": "Auxiliar de produção", "Data de nascimento": "01/01/1980",
+    "Nome da mae": "BELTRANA DE TAL", "Número do pis": "123.45678.90-1", "Número da ctps": "1234567",
+    "Número rg": "12.345.678-9", "Número do cpf": "123.456.789-00", "Rua do reclamante": "Rua das Flores",
+    "Número da casa do reclamante e complemento": "100, ap. 12", "Bairro reclamante": "Centro", "Cep reclamante": "01000-000",
+    "Nome da reclamada": "EMPRESA EXEMPLO LTDA", "Empresa processada": "EMPRESA EXEMPLO", "Numero de cnpj da reclamada": "00.000.000/0001-00",
+    "Endereço reclamada": "Av. Paulista, 1000", "Complemento reclamada": "10º andar", "Bairro reclamada": "Bela Vista", "Cep reclamada": "01310-100",
+}
+
+
+def _png(cor, lado=32):
+    """PNG RGB sólido (sem depender do Pillow)."""
+    linha = b"\x00" + bytes(cor) * lado
+    def chunk(tipo, dados):
+        return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados) & 0xFFFFFFFF)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", lado, lado, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(linha * lado)) + chunk(b"IEND", b""))
+
+
+def _paragrafo_fragmentado(doc_ou_celula, texto, runs):
+    """Adiciona um parágrafo com o texto quebrado em 'runs' pedaços (como o Word faz com revisões)."""
+    p = doc_ou_celula.add_paragraph()
+    passo = max(1, len(texto) // runs)
+    for i in range(0, len(texto), passo):
+        p.add_run(texto[i:i + passo])
+    return p
+
+
+def _propriedades_formatacao(run):
+    """Propriedades conferidas em fidelidade_formatacao (valores esperados no run do placeholder)."""
+    fonte = run.font
+    return {
+        "cor": str(fonte.color.rgb) if fonte.color.type is not None else None,
+        "realce": fonte.highlight_color,
+        "caixa_alta": fonte.all_caps,
+        "italico": run.italic,
+        "sublinhado": run.underline,
+        "fonte": fonte.name,
+        "tamanho": fonte.size,
+    }
+
+
+def _paragrafo_formatado(doc):
+    from docx.enum.text import WD_COLOR_INDEX
+    from docx.shared import Pt, RGBColor
+
+    p = doc.add_paragraph()
+    p.add_run(MARCADOR_FORMATACAO)
+    run = p.add_run("CPF {{NUMERO_CPF_RECLAMANTE}} conforme documento")
+    run.font.color.rgb = RGBColor(0xC0, 0x10, 0x10)
+    run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+    run.font.all_caps = True
+    run.italic = True
+    run.underline = True
+    run.font.name = "Arial"
+    run.font.size = Pt(11)
+    return p
+
+
+def _fidelidade_formatacao(doc):
+    """Quantas propriedades do run original o valor substituído (CPF) manteve."""
+    esperado = _propriedades_formatacao(_paragrafo_formatado(_DocumentoVazio()).runs[1])
+    valor = CAMPOS_EXEMPLO["Número do cpf"]
+    obtido = None
+    for p in doc.paragraphs:
+        if p.text.startswith(MARCADOR_FORMATACAO):
+            obtido = next((_propriedades_formatacao(r) for r in p.runs if r.text == valor), None)
+            break
+    perdidas = sorted(k for k, v in esperado.items() if obtido is None or obtido[k] != v)
+    return {"preservadas": len(esperado) - len(perdidas), "total": len(esperado), "perdidas": perdidas}
+
+
+class _DocumentoVazio:
+    """Recebe o parágrafo de referência de _paragrafo_formatado sem criar um Document."""
+
+    def add_paragraph(self):
+        from docx.oxml import OxmlElement
+        from docx.text.paragraph import Paragraph
+        return Paragraph(OxmlElement("w:p"), None)
+
+
+def _medir_formatacao(gw):
+    """Substituição em RUNS_FORMATACAO cópias do parágrafo formatado + o mesmo número de títulos de pedido."""
+    from docx.text.paragraph import Paragraph
+
+    modelo = _paragrafo_formatado(_DocumentoVazio())._p
+    copias = [Paragraph(deepcopy(modelo), None) for _ in range(RUNS_FORMATACAO)]
+    substituicoes = gw.montar_substituicoes(CAMPOS_EXEMPLO)
+    t0 = time.perf_counter()
+    for p in copias:
+        gw.replace_placeholders_in_paragraph_preserve_runs(p, substituicoes, gw.CAMPOS_NEGRITO)
+    titulos = Paragraph(deepcopy(modelo), None)
+    for i in range(RUNS_FORMATACAO):
+        gw._anexar_run_titulo(titulos, f"                  {gw.int_to_roman(i + 1)} - Pedido")
+    return time.perf_counter() - t0
+
+
+def _tabela_aninhada(container, nivel, texto):
+    tabela = container.add_table(rows=2, cols=2)
+    for celula in tabela._cells:
+        celula.paragraphs[0].text = texto
+    if nivel > 1:
+        _tabela_aninhada(tabela.cell(1, 1), nivel - 1, texto)
+
+
+def gerar_templates_sinteticos(destino, paragrafos, runs_por_paragrafo, tabelas, aninhamento, pedidos, paragrafos_pedido, imagens=True):
+    """Cria destino/modelo_base.docx, destino/modelo_base_final.docx e destino/modelos/*.docx. Retorna a lista de pedidos."""
+    from docx import Document
+    from docx.shared import Inches
+    from src.generate_word import PLACEHOLDERS_CAMPOS
+
+    modelos_dir = os.path.join(destino, "modelos")
+    os.makedirs(modelos_dir, exist_ok=True)
+    logo = os.path.join(destino, "logo.png")
+    with open(logo, "wb") as f:
+        f.write(_png((30, 60, 120)))
+
+    placeholders = [ph for ph, _ in PLACEHOLDERS_CAMPOS]
+    texto_base = "Texto jurídico de preenchimento para o corpo da petição inicial. "
+
+    base = Document()
+    secao = base.sections[0]
+    secao.header.paragraphs[0].text = "ESCRITÓRIO EXEMPLO — {{NOME_RECLAMANTE}}"
+    secao.footer.paragraphs[0].text = "{{EMPRESA_PROCESSADA}} — página"
+    if imagens:
+        secao.header.add_paragraph().add_run().add_picture(logo, width=Inches(0.5))
+    for i in range(paragrafos):
+        texto = texto_base + (placeholders[i % len(placeholders)] + " " if i % 3 == 0 else "") + texto_base
+        _paragrafo_fragmentado(base, texto, runs_por_paragrafo)
+    for i in range(tabelas):
+        _tabela_aninhada(base, aninhamento, f"CNPJ {{{{NUMERO_CNPJ_RECLAMADA}}}} célula {i}")
+    _paragrafo_formatado(base)
+    if imagens:
+        base.add_picture(logo, width=Inches(1))
+    base.save(os.path.join(destino, "modelo_base.docx"))
+
+    final = Document()
+    for i in range(3):
+        final.add_paragraph(f"TITULO FINAL {i + 1}").runs[0].bold = True
+        for _ in range(max(1, paragrafos_pedido // 3)):
+            _paragrafo_fragmentado(final, texto_base * 3, runs_por_paragrafo)
+    final.save(os.path.join(destino, "modelo_base_final.docx"))
+
+    lista = []
+    for n in range(pedidos):
+        pedido = Document()
+        for i in range(paragrafos_pedido):
+            _paragrafo_fragmentado(pedido, f"Pedido {n + 1}, parágrafo {i + 1}. " + texto_base * 2, runs_por_paragrafo)
+        if n % 2 == 0:
+            _tabela_aninhada(pedido, aninhamento, "valor")
+        if imagens:
+            pedido.add_picture(logo, width=Inches(1))
+        nome = f"Pedido {n + 1:02d}"
+        caminho = os.path.join(modelos_dir, nome + ".docx")
+        pedido.save(caminho)
+        lista.append((nome, caminho))
+    return lista
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB, macOS informa bytes
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+def _executar_cenario(parametros):
+    """Roda em processo novo: gera templates, mede as fases e devolve o dicionário de resultados."""
+    sys.path.insert(0, RAIZ)
+    import src.generate_word as gw
+    from src.template_cache import abrir_template, template_cache
+
+    nome, caminho_composicao, repeticoes, spec, baixa_memoria = parametros
+    gw.BAIXA_MEMORIA = baixa_memoria
+    if caminho_composicao == "interna":
+        gw.MESCLAGEM = "interna"  # força o mesclador próprio (src/mesclador.py) mesmo com docxcompose instalado
+
+    with tempfile.TemporaryDirectory(prefix="bench_gerador_") as tmp:
+        templates = os.path.join(tmp, "templates")
+        pedidos = gerar_templates_sinteticos(templates, **spec)
+        caminho_base = os.path.join(templates, "modelo_base.docx")
+        destino = os.path.join(tmp, "saida.docx")
+
+        medidas = []
+        for rep in range(repeticoes):
+            fases = {}
+            t0 = time.perf_counter()
+            doc = abrir_template(caminho_base)
+            fases["abrir_base"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            gw._preencher_modelo_base(doc, caminho_base, gw.montar_substituicoes(CAMPOS_EXEMPLO))
+            fases["preencher"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            gw.compor_documento(caminho_base, pedidos)
+            fases["compor"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            doc = gw.gerar_documento(caminho_base, CAMPOS_EXEMPLO, pedidos)
+            fases["gerar_documento"] = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            gw.salvar_documento(doc, destino)
+            fases["salvar_documento"] = time.perf_counter() - t0
+
+            fases["formatar_runs"] = _medir_formatacao(gw)
+            fidelidade = _fidelidade_formatacao(doc)
+
+            medidas.append({k: round(v, 4) for k, v in fases.items()})
+
+        tamanho_saida = os.path.getsize(destino)
+
+    quentes = medidas[1:] or medidas
+    return {
+        "cenario": nome,
+        "caminho": caminho_composicao,
+        "parametros": spec,
+        "baixa_memoria": baixa_memoria,
+        "repeticoes": repeticoes,
+        "frio": medidas[0],
+        "quente_mediana": {fase: round(statistics.median(m[fase] for m in quentes), 4) for fase in medidas[0]},
+        "wall_total_s": round(sum(m["gerar_documento"] + m["salvar_documento"] for m in medidas), 4),
+        "rss_pico_mb": _rss_pico_mb(),
+        "tamanho_saida_bytes": tamanho_saida,
+        "fidelidade_formatacao": fidelidade,
+        "cache": template_cache.stats(),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.benchmark_geracao", description="Benchmark de gerar_documento/salvar_documento.")
+    parser.add_argument("--cenarios", default=",".join(CENARIOS), help=f"lista separada por vírgula ({', '.join(CENARIOS)})")
+    parser.add_argument("--caminhos", default="composer,interna", help="composer, interna (mesclador próprio) ou ambos")
+    parser.add_argument("--repeticoes", type=int, default=3, help="repetições por cenário (a primeira é a de cache frio)")
+    parser.add_argument("--baixa-memoria", action="store_true", help="usa o modo de baixa memória (GERADOR_BAIXA_MEMORIA)")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: bench/resultados/<data>.json)")
+    args = parser.parse_args(argv)
+
+    cenarios = [c.strip() for c in args.cenarios.split(",") if c.strip()]
+    caminhos = [c.strip() for c in args.caminhos.split(",") if c.strip()]
+    for c in cenarios:
+        if c not in CENARIOS:
+            parser.error(f"cenário desconhecido: {c}")
+
+    saida = args.saida or os.path.join(RAIZ, "bench", "resultados", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+
+    resultados = []
+    ctx = get_context("spawn")
+    for nome in cenarios:
+        for caminho in caminhos:
+            # um processo por cenário: RSS de pico e cache independentes
+            with ctx.Pool(1, maxtasksperchild=1) as pool:
+                r = pool.apply(_executar_cenario, ((nome, caminho, max(1, args.repeticoes), CENARIOS[nome], args.baixa_memoria),))
+            resultados.append(r)
+            q = r["quente_mediana"]
+            print(f"{nome:8s} {caminho:9s} gerar={q['gerar_documento']:.3f}s (frio {r['frio']['gerar_documento']:.3f}s) "
+                  f"salvar={q['salvar_documento']:.3f}s compor={q['compor']:.3f}s preencher={q['preencher']:.4f}s "
+                  f"formatar_runs={q['formatar_runs']:.4f}s fidelidade={r['fidelidade_formatacao']['preservadas']}/"
+                  f"{r['fidelidade_formatacao']['total']} rss={r['rss_pico_mb']}MB saida={r['tamanho_saida_bytes'] // 1024}KB", flush=True)
+
+    relatorio = {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=1)
+    print(f"\nresultados gravados em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
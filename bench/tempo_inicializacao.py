@@ -0,0 +1,89 @@
+# tempo_inicializacao.py — mede quanto custa abrir o programa (import de src.main e, com display, a janela).
+#
+# Uso (na raiz do projeto):
+#   python -m bench.tempo_inicializacao                     # árvore atual
+#   python -m bench.tempo_inicializacao --raiz /tmp/antes   # outra cópia do projeto (ex.: git worktree de um commit antigo)
+#   python -m bench.tempo_inicializacao --janela            # também mede até a janela ser desenhada (precisa de display)
+#
+# Cada medida roda em um processo novo (imports frios do ponto de vista do interpretador). O relatório traz o
+# tempo mínimo/mediano, se python-docx já estava carregado ao fim do import e os módulos mais caros segundo
+# `python -X importtime`.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SCRIPT_IMPORT = """
+import sys, time
+t0 = time.perf_counter()
+import src.main
+print(time.perf_counter() - t0, int('docx' in sys.modules))
+"""
+
+# mede até o primeiro ciclo ocioso do Tk depois de criar a App (janela desenhada) e fecha
+_SCRIPT_JANELA = """
+import sys, time
+t0 = time.perf_counter()
+import src.main
+app = src.main.App()
+def pronto():
+    print(time.perf_counter() - t0, int('docx' in sys.modules))
+    app.destroy()
+app.after_idle(pronto)
+app.mainloop()
+"""
+
+
+def _executar(raiz, script):
+    saida = subprocess.run([sys.executable, "-c", script], cwd=raiz, capture_output=True, text=True, timeout=120)
+    if saida.returncode != 0:
+        raise RuntimeError(saida.stderr.strip().splitlines()[-1] if saida.stderr.strip() else f"código {saida.returncode}")
+    segundos, docx_carregado = saida.stdout.strip().splitlines()[-1].split()
+    return float(segundos), docx_carregado == "1"
+
+
+def _mais_caros(raiz, quantidade):
+    """Módulos com maior tempo cumulativo de import segundo -X importtime."""
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.main"], cwd=raiz, capture_output=True, text=True, timeout=120)
+    linhas = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, _, resto = linha.partition(":")
+        _, cumulativo, modulo = [p.strip() for p in resto.split("|", 2)]
+        linhas.append((int(cumulativo), modulo.strip()))
+    linhas.sort(reverse=True)
+    return linhas[:quantidade]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.tempo_inicializacao", description="Tempo de inicialização da interface.")
+    parser.add_argument("--raiz", default=RAIZ, help="raiz do projeto a medir (padrão: esta árvore)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--janela", action="store_true", help="mede também até a janela ficar pronta (precisa de display)")
+    args = parser.parse_args(argv)
+
+    medidas = [("import src.main", _SCRIPT_IMPORT)]
+    if args.janela:
+        medidas.append(("janela pronta", _SCRIPT_JANELA))
+
+    print(f"raiz: {args.raiz}")
+    _executar(args.raiz, _SCRIPT_IMPORT)  # aquece o cache de bytecode
+    for nome, script in medidas:
+        tempos, docx = [], False
+        for _ in range(max(1, args.repeticoes)):
+            segundos, docx = _executar(args.raiz, script)
+            tempos.append(segundos)
+        print(f"{nome:16s} min={min(tempos):.3f}s mediana={statistics.median(tempos):.3f}s python-docx carregado: {'sim' if docx else 'não'}")
+
+    print("\nimports mais caros (cumulativo):")
+    for micros, modulo in _mais_caros(args.raiz, 12):
+        print(f"{micros / 1000:9.1f} ms  {modulo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
-# launcher.py — executa o módulo src.main como script (preserva imports relativos)
-# IMPORT ESTÁTICO para o PyInstaller detectar o package `src`
-import src.main  # for PyInstaller static analysis / inclusion
-import runpy
+# launcher.py — ponto de entrada do executável (equivalente a python -m src.main)
+# IMPORT ESTÁTICO para o PyInstaller detectar o package `src`. Importar src.main é barato: só configura o
+# logging e carrega a interface; as bibliotecas de documento são importadas em segundo plano pela própria App.
+import src.main
 
 if __name__ == "__main__":
-    # Executa src.main como __main__ (equivalente a python -m src.main)
-    runpy.run_module("src.main", run_name="__main__")
\ No newline at end of file
+    src.main.main()
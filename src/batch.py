@@ -0,0 +1,298 @@
+# batch.py — geração em lote (sem interface gráfica) a partir de um arquivo CSV ou JSONL.
+#
+# Uso:
+#   python -m src.batch casos.jsonl --saida saida/ --workers 4
+#   python -m src.batch casos.csv --templates templates/ --saida saida/
+#   python -m src.batch casos.jsonl --servico http://127.0.0.1:8765   # gera no serviço local (src/servico.py)
+#
+# Cada registro traz os campos do preâmbulo (mesmos nomes da interface, ex.: "Nome reclamante")
+# e a lista ordenada de pedidos (nomes dos arquivos em templates/modelos, sem .docx):
+#   - JSONL: {"Nome reclamante": "...", ..., "pedidos": ["Horas Extras", "Danos Morais"], "arquivo": "joao.docx"}
+#   - CSV:   coluna "pedidos" com os nomes separados por "|"; delimitador "," ou ";" detectado automaticamente.
+# Colunas opcionais: "arquivo" (nome do .docx de saída) e "numeracao_inicial".
+#
+# Este módulo NÃO importa customtkinter: pode rodar em servidores sem display.
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from .generate_word import compor_esqueleto, salvar_documento, replace_bar_placeholder, PLACEHOLDERS_CAMPOS
+from . import metricas, perfil, registro_log
+from .servico_cliente import gerar_no_servico, registro_de_geracao
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_ESPECIAIS = {"pedidos", "arquivo", "numeracao_inicial"}
+
+
+def get_base_dir():
+    """Mesmo critério de src/main.py: diretório do executável quando empacotado, senão a raiz do projeto."""
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def ler_casos(caminho):
+    """Lê os casos de um arquivo .jsonl/.json (um objeto por linha) ou .csv. Retorna lista de dicts."""
+    ext = os.path.splitext(caminho)[1].lower()
+    casos = []
+    if ext in (".jsonl", ".json", ".ndjson"):
+        with open(caminho, "r", encoding="utf-8-sig") as f:
+            for num_linha, linha in enumerate(f, 1):
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except ValueError as e:
+                    raise ValueError(f"{caminho}:{num_linha}: JSON inválido: {e}")
+                if not isinstance(registro, dict):
+                    raise ValueError(f"{caminho}:{num_linha}: cada linha deve ser um objeto JSON")
+                casos.append(registro)
+    elif ext == ".csv":
+        with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+            amostra = f.read(4096)
+            f.seek(0)
+            try:
+                dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+            except csv.Error:
+                dialeto = csv.excel
+            for registro in csv.DictReader(f, dialect=dialeto):
+                pedidos = registro.get("pedidos") or ""
+                registro["pedidos"] = [p.strip() for p in pedidos.split("|") if p.strip()]
+                casos.append(registro)
+    else:
+        raise ValueError(f"Formato não suportado: {caminho} (use .csv ou .jsonl)")
+    return casos
+
+
+def indice_modelos(modelos_dir):
+    """Mapa nome -> caminho dos modelos; aceita tanto o nome bruto ({{BARRA}}) quanto o exibido ('/')."""
+    indice = {}
+    if not os.path.isdir(modelos_dir):
+        return indice
+    for nome_arquivo in sorted(os.listdir(modelos_dir)):
+        if not nome_arquivo.lower().endswith(".docx"):
+            continue
+        nome_raw = os.path.splitext(nome_arquivo)[0]
+        caminho = os.path.join(modelos_dir, nome_arquivo)
+        indice[nome_raw] = (nome_raw, caminho)
+        indice.setdefault(replace_bar_placeholder(nome_raw), (nome_raw, caminho))
+    return indice
+
+
+def _nome_saida(registro, numero):
+    nome = registro.get("arquivo")
+    if not nome:
+        base = registro.get("Nome reclamante") or "inicial"
+        nome = f"{numero:04d}_{base}"
+    nome = re.sub(r'[\\/:*?"<>|]+', "_", str(nome)).strip() or f"{numero:04d}"
+    if not nome.lower().endswith(".docx"):
+        nome += ".docx"
+    return nome
+
+
+def _processar_grupo(tarefas):
+    """
+    Executado no processo worker para casos com o mesmo template, pedidos e numeração: compõe o esqueleto
+    uma vez e só preenche/salva cada caso. O tempo da composição entra no primeiro caso do grupo.
+    """
+    inicio = time.perf_counter()
+    _, caminho_template, _, pedidos_ordenados, numeracao, _ = tarefas[0]
+    try:
+        esqueleto = compor_esqueleto(caminho_template, pedidos_ordenados, numeracao)
+    except Exception as e:
+        logger.exception("[batch] falha ao compor o esqueleto de %d casos", len(tarefas))
+        erro = f"{type(e).__name__}: {e}"
+        return [(numero, False, destino, erro, time.perf_counter() - inicio) for numero, _, _, _, _, destino in tarefas]
+
+    resultados = []
+    for numero, _, campos, _, _, caminho_destino in tarefas:
+        try:
+            salvar_documento(esqueleto.preencher(campos), caminho_destino)
+            resultados.append((numero, True, caminho_destino, None, time.perf_counter() - inicio))
+        except Exception as e:
+            logger.exception("[batch] falha no caso %s", numero)
+            resultados.append((numero, False, caminho_destino, f"{type(e).__name__}: {e}", time.perf_counter() - inicio))
+        inicio = time.perf_counter()
+    return resultados
+
+
+def agrupar_por_esqueleto(tarefas, workers=1):
+    """
+    Junta as tarefas com o mesmo (template, pedidos, numeração) em grupos que compartilham um esqueleto.
+    Cada conjunto é dividido em até 'workers' grupos para manter todos os processos ocupados.
+    """
+    conjuntos = {}
+    for tarefa in tarefas:
+        _, caminho_template, _, pedidos_ordenados, numeracao, _ = tarefa
+        chave = (caminho_template, tuple(caminho for _, caminho in pedidos_ordenados), numeracao)
+        conjuntos.setdefault(chave, []).append(tarefa)
+    grupos = []
+    for conjunto in conjuntos.values():
+        partes = max(1, min(workers, len(conjunto)))
+        tamanho = -(-len(conjunto) // partes)
+        grupos.extend(conjunto[i:i + tamanho] for i in range(0, len(conjunto), tamanho))
+    return grupos
+
+
+NOMES_CAMPOS = frozenset(campo for _, campo in PLACEHOLDERS_CAMPOS)
+
+
+def _processar_caso_no_servico(url, numero, caminho_template, campos, pedidos_ordenados, numeracao, caminho_destino):
+    """Gera um caso no serviço local (python -m src.servico) em 'url'. Retorna (numero, ok, destino, erro, segundos)."""
+    inicio = time.perf_counter()
+    try:
+        doc = gerar_no_servico(url, registro_de_geracao(campos, pedidos_ordenados, numeracao))
+        salvar_documento(doc, caminho_destino)
+        return numero, True, caminho_destino, None, time.perf_counter() - inicio
+    except Exception as e:
+        logger.exception("[batch] falha no caso %s (serviço %s)", numero, url)
+        return numero, False, caminho_destino, f"{type(e).__name__}: {e}", time.perf_counter() - inicio
+
+
+def preparar_registro(registro, indice, numeracao_padrao=6):
+    """
+    Valida um registro (campos do preâmbulo + "pedidos" + "numeracao_inicial" opcional) contra o índice de
+    modelos de indice_modelos. Retorna (campos, pedidos_ordenados, numeracao); levanta ValueError se inválido.
+    """
+    pedidos = registro.get("pedidos") or []
+    if isinstance(pedidos, str):
+        pedidos = [p.strip() for p in pedidos.split("|") if p.strip()]
+    faltando = [p for p in pedidos if p not in indice]
+    if faltando:
+        raise ValueError(f"pedidos não encontrados em templates/modelos: {faltando}")
+    try:
+        numeracao = int(registro.get("numeracao_inicial") or numeracao_padrao)
+    except (TypeError, ValueError):
+        raise ValueError(f"numeracao_inicial inválida: {registro.get('numeracao_inicial')!r}")
+
+    campos = {campo: "" if registro.get(campo) is None else str(registro.get(campo)) for campo in NOMES_CAMPOS}
+    return campos, [indice[p] for p in pedidos], numeracao
+
+
+def preparar_casos(casos, templates_dir, saida_dir, numeracao_padrao=6):
+    """
+    Converte os registros em tarefas (numero, template, campos, pedidos, numeracao, destino).
+    Registros inválidos (pedido inexistente, numeração inválida) voltam como erros (numero, mensagem).
+    """
+    caminho_template = os.path.join(templates_dir, "modelo_base.docx")
+    indice = indice_modelos(os.path.join(templates_dir, "modelos"))
+
+    tarefas, erros = [], []
+    for numero, registro in enumerate(casos, 1):
+        desconhecidos = set(registro) - NOMES_CAMPOS - CAMPOS_ESPECIAIS
+        if desconhecidos:
+            logger.warning("[batch] caso %s: colunas ignoradas: %s", numero, sorted(desconhecidos))
+        try:
+            campos, pedidos_ordenados, numeracao = preparar_registro(registro, indice, numeracao_padrao)
+        except ValueError as e:
+            erros.append((numero, str(e)))
+            continue
+        destino = os.path.join(saida_dir, _nome_saida(registro, numero))
+        tarefas.append((numero, caminho_template, campos, pedidos_ordenados, numeracao, destino))
+    return tarefas, erros
+
+
+def _configurar_worker(diretorio_logs):
+    metricas.configurar(diretorio_logs)
+    perfil.configurar(diretorio_logs)
+
+
+def executar_lote(tarefas, workers=None, ao_concluir=None, diretorio_logs=None, servico=None):
+    """
+    Executa as tarefas em um pool de processos (workers=1 roda no próprio processo). Casos com os mesmos pedidos
+    na mesma ordem compartilham um esqueleto composto uma vez (ver agrupar_por_esqueleto).
+    ao_concluir(resultado) é chamado a cada caso finalizado. Retorna a lista de resultados ordenada por número.
+    diretorio_logs: onde os workers gravam metricas.jsonl e os perfis (GERADOR_METRICAS / GERADOR_PERFIL).
+    servico: URL do serviço local; as tarefas são enviadas a ele por 'workers' threads em vez de geradas aqui.
+    """
+    resultados = []
+    if servico:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = [pool.submit(_processar_caso_no_servico, servico, *tarefa) for tarefa in tarefas]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados.append(resultado)
+                if ao_concluir:
+                    ao_concluir(resultado)
+    elif workers == 1:
+        for grupo in agrupar_por_esqueleto(tarefas):
+            for resultado in _processar_grupo(grupo):
+                resultados.append(resultado)
+                if ao_concluir:
+                    ao_concluir(resultado)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_configurar_worker, initargs=(diretorio_logs,)) as pool:
+            futuros = [pool.submit(_processar_grupo, grupo) for grupo in agrupar_por_esqueleto(tarefas, workers)]
+            for futuro in as_completed(futuros):
+                for resultado in futuro.result():
+                    resultados.append(resultado)
+                    if ao_concluir:
+                        ao_concluir(resultado)
+    resultados.sort(key=lambda r: r[0])
+    return resultados
+
+
+def _imprimir_resultado(resultado):
+    numero, ok, destino, erro, segundos = resultado
+    if ok:
+        print(f"[ok]   caso {numero:04d} -> {destino} ({segundos:.2f}s)", flush=True)
+    else:
+        print(f"[ERRO] caso {numero:04d}: {erro}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.batch", description="Geração de iniciais em lote a partir de CSV/JSONL.")
+    parser.add_argument("entrada", help="arquivo .csv ou .jsonl com um caso por registro")
+    parser.add_argument("--templates", default=os.path.join(get_base_dir(), "templates"), help="pasta com modelo_base.docx, modelo_base_final.docx e modelos/")
+    parser.add_argument("--saida", default="saida", help="pasta onde os .docx serão gravados (padrão: ./saida)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="número de processos (padrão: núcleos da CPU)")
+    parser.add_argument("--numeracao", type=int, default=6, help="numeração romana inicial dos pedidos (padrão: 6)")
+    parser.add_argument("--relatorio", help="grava o resultado de cada caso em JSONL neste caminho")
+    parser.add_argument("--servico", help="URL do serviço local de geração (python -m src.servico), ex.: http://127.0.0.1:8765")
+    args = parser.parse_args(argv)
+
+    registro_log.configurar(console=True, nivel=logging.WARNING)
+    diretorio_logs = os.path.join(get_base_dir(), "logs")
+    if metricas.habilitado() or perfil.habilitado():
+        os.makedirs(diretorio_logs, exist_ok=True)
+        _configurar_worker(diretorio_logs)
+
+    if not os.path.isfile(os.path.join(args.templates, "modelo_base.docx")):
+        print(f"modelo_base.docx não encontrado em {args.templates}", file=sys.stderr)
+        return 2
+
+    casos = ler_casos(args.entrada)
+    tarefas, erros = preparar_casos(casos, args.templates, args.saida, args.numeracao)
+    resultados = [(numero, False, None, erro, 0.0) for numero, erro in erros]
+    for resultado in resultados:
+        _imprimir_resultado(resultado)
+
+    inicio = time.perf_counter()
+    resultados += executar_lote(tarefas, workers=max(1, args.workers), ao_concluir=_imprimir_resultado,
+                               diretorio_logs=diretorio_logs, servico=args.servico)
+    total = time.perf_counter() - inicio
+    resultados.sort(key=lambda r: r[0])
+
+    ok = sum(1 for r in resultados if r[1])
+    falhas = len(resultados) - ok
+    vazao = ok / total if total > 0 else 0.0
+    print(f"\n{len(resultados)} casos: {ok} ok, {falhas} com erro em {total:.2f}s ({vazao:.2f} documentos/s, {max(1, args.workers)} workers)")
+
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as f:
+            for numero, sucesso, destino, erro, segundos in resultados:
+                f.write(json.dumps({"caso": numero, "ok": sucesso, "arquivo": destino, "erro": erro, "segundos": round(segundos, 4)}, ensure_ascii=False) + "\n")
+
+    return 0 if falhas == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
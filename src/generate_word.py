@@ -1,16 +1,39 @@
 # NOTE: Este é o generate_word.py com as últimas melhorias (heurísticas de títulos, modelo_final com 3 títulos, replace_bar_placeholder, etc.).
+import contextvars
+import io
 import logging
 import re
+from bisect import bisect_right
+from functools import lru_cache
 from docx import Document
+from docx.oxml import OxmlElement
+from docx.text.run import Run
 from docx.shared import Pt
 from docx.oxml.ns import qn
-from copy import deepcopy
 import zipfile
 import tempfile
 import os
+import threading
+import time
+import gc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from docx.blkcntnr import BlockItemContainer
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.text.paragraph import Paragraph
+from .template_cache import abrir_template, clonar_documento, estatisticas_cache, template_key
+from .template_index import TemplateIndex
+from .mesclador import Mesclador, deduplicar_midias, indexar_midias
+from . import metricas, perfil
+from .salvamento import gravar_pacote, registrar_origem
+from .normalizacao import contar_runs, estatisticas_do_documento, normalizar_template
 
 # logger para este módulo
 logger = logging.getLogger(__name__)
+# dumps de listas (pedidos_ordenados) — GERADOR_LOG_NIVEIS=src.generate_word.listas=WARNING desliga
+logger_listas = logging.getLogger(__name__ + ".listas")
 
 # Try to import Composer from docxcompose (best option to preserve images/relationships)
 try:
@@ -18,7 +41,28 @@ try:
     logger.info("docxcompose.Composer disponível — imagens serão preservadas quando anexar modelos.")
 except Exception as e:
     Composer = None
-    logger.info("docxcompose.Composer não disponível: %s. Uso fallback para anexação (pode perder imagens).", e)
+    logger.info("docxcompose.Composer não disponível: %s. Anexação feita pelo mesclador interno.", e)
+
+# Modo de baixa memória (GERADOR_BAIXA_MEMORIA=1 ou gerar_documento(..., baixa_memoria=True)): os modelos são
+# lidos direto do disco, sem passar pelo cache de templates, e cada documento de origem é liberado logo após
+# ser anexado. O pico de memória residente observado é registrado no log (e nos spans de métricas).
+BAIXA_MEMORIA = os.environ.get("GERADOR_BAIXA_MEMORIA", "").strip().lower() in ("1", "true", "sim", "yes", "on")
+
+# Mecanismo de anexação: "composer" (docxcompose, quando instalado) ou "interna" (src/mesclador.py, mais rápido).
+# O mesclador interno é sempre usado quando o docxcompose não está disponível ou falha.
+MESCLAGEM = os.environ.get("GERADOR_MESCLAGEM", "composer").strip().lower()
+
+def _threads_prefetch_do_ambiente():
+    try:
+        # padrão: até 4 threads, deixando um núcleo para a thread que anexa (0 em máquinas de um núcleo)
+        return max(0, int(os.environ.get("GERADOR_PREFETCH", min(4, (os.cpu_count() or 1) - 1))))
+    except ValueError:
+        logger.warning("GERADOR_PREFETCH inválido; usando leitura sequencial dos modelos.")
+        return 0
+
+# Threads que abrem (unzip + parse) os modelos dos pedidos antecipadamente enquanto os anteriores são anexados.
+# 0 desativa o prefetch (modelos abertos um a um, no momento da anexação).
+PREFETCH_THREADS = _threads_prefetch_do_ambiente()
 
 def int_to_roman(num: int) -> str:
     vals = [
@@ -33,6 +77,41 @@ def int_to_roman(num: int) -> str:
             num -= val
     return roman
 
+_W_P = qn('w:p')
+_W_TBL = qn('w:tbl')
+_W_TC = qn('w:tc')
+_W_SECTPR = qn('w:sectPr')
+_W_HEADER_REFERENCE = qn('w:headerReference')
+_W_FOOTER_REFERENCE = qn('w:footerReference')
+_R_ID = qn('r:id')
+
+# Placeholder do modelo_base -> nome do campo do preâmbulo (mesmos nomes usados na interface e no batch)
+PLACEHOLDERS_CAMPOS = [
+    ("{{NOME_RECLAMANTE}}", "Nome reclamante"),
+    ("{{PROFISSAO_RECLAMANTE}}", "Profissao / Cargo"),
+    ("{{DATA_NASCIMENTO_RECLAMANTE}}", "Data de nascimento"),
+    ("{{NOME_MAE_RECLAMANTE}}", "Nome da mae"),
+    ("{{NUMERO_PIS_RECLAMANTE}}", "Número do pis"),
+    ("{{NUMERO_CTPS_RECLAMANTE}}", "Número da ctps"),
+    ("{{NUMERO_RG_RECLAMANTE}}", "Número rg"),
+    ("{{NUMERO_CPF_RECLAMANTE}}", "Número do cpf"),
+    ("{{RUA_DO_RECLAMANTE}}", "Rua do reclamante"),
+    ("{{NUMERO_CASA_RECLAMANTE_E_COMPLEMENTO}}", "Número da casa do reclamante e complemento"),
+    ("{{BAIRRO_RECLAMANTE}}", "Bairro reclamante"),
+    ("{{CEP_RECLAMANTE}}", "Cep reclamante"),
+    ("{{NOME_RECLAMADA}}", "Nome da reclamada"),
+    ("{{EMPRESA_PROCESSADA}}", "Empresa processada"),
+    ("{{NUMERO_CNPJ_RECLAMADA}}", "Numero de cnpj da reclamada"),
+    ("{{ENDERECO_RECLAMADA}}", "Endereço reclamada"),
+    ("{{COMPLEMENTO_RECLAMADA}}", "Complemento reclamada"),
+    ("{{BAIRRO_RECLAMADA}}", "Bairro reclamada"),
+    ("{{CEP_RECLAMADA}}", "Cep reclamada"),
+]
+
+def montar_substituicoes(campos):
+    """Monta o dicionário placeholder -> valor a partir dos campos do preâmbulo."""
+    return {placeholder: campos.get(campo, "") for placeholder, campo in PLACEHOLDERS_CAMPOS}
+
 # Placeholders that should be forced bold when substituted
 CAMPOS_NEGRITO = {
     "{{NOME_RECLAMANTE}}",
@@ -40,120 +119,213 @@ CAMPOS_NEGRITO = {
     "{{NOME_MAE_RECLAMANTE}}"
 }
 
-def _copy_run_formatting(src_run, dst_run):
-    try:
-        if src_run.font.name:
-            dst_run.font.name = src_run.font.name
-            try:
-                dst_run._element.rPr.rFonts.set(qn('w:eastAsia'), src_run.font.name)
-            except Exception:
-                pass
-    except Exception:
-        pass
-    try:
-        if src_run.font.size:
-            dst_run.font.size = src_run.font.size
-    except Exception:
-        pass
-    try:
-        dst_run.bold = src_run.bold
-    except Exception:
-        pass
-    try:
-        dst_run.italic = src_run.italic
-    except Exception:
-        pass
-    try:
-        dst_run.underline = src_run.underline
-    except Exception:
-        pass
+_W_RPRCHANGE = qn('w:rPrChange')
+_W_EASTASIA = qn('w:eastAsia')
 
-def replace_placeholders_in_paragraph_preserve_runs(paragraph, substitutions, campos_negrito):
-    runs = list(paragraph.runs)
-    if not runs:
-        return
+def _rpr_modelo(origem_r):
+    """Cópia do w:rPr de um run (todas as propriedades: fonte, tamanho, cor, realce, caixa alta, estilo...), sem marcas de revisão."""
+    rpr = origem_r.rPr
+    if rpr is None:
+        return None
+    copia = deepcopy(rpr)
+    for alteracao in copia.findall(_W_RPRCHANGE):
+        copia.remove(alteracao)
+    return copia
 
-    run_texts = [r.text for r in runs]
-    full_text = ''.join(run_texts)
+def _novo_run(texto, rpr_modelo=None):
+    """w:r com 'texto' (tabs/quebras convertidos como em Run.text) e uma cópia de rpr_modelo."""
+    r = OxmlElement('w:r')
+    if rpr_modelo is not None:
+        r.append(deepcopy(rpr_modelo))
+    r.text = texto
+    return r
 
-    if not any(ph in full_text for ph in substitutions.keys()):
-        return
+def _clonar_rpr(origem_r, destino_r):
+    """Substitui a formatação de destino_r pela de origem_r numa única operação."""
+    existente = destino_r.rPr
+    if existente is not None:
+        destino_r.remove(existente)
+    rpr = _rpr_modelo(origem_r)
+    if rpr is not None:
+        destino_r.insert(0, rpr)
 
-    cursor = 0
-    segments = []
-
-    def _find_run_index_and_offset(pos):
-        acc = 0
-        for idx, txt in enumerate(run_texts):
-            if acc + len(txt) > pos:
-                return idx, pos - acc
-            acc += len(txt)
-        return len(run_texts) - 1, max(0, len(run_texts[-1]))
-
-    while cursor < len(full_text):
-        matched = False
-        for placeholder, valor in substitutions.items():
-            if full_text.startswith(placeholder, cursor):
-                matched = True
-                valor_text = "" if valor is None else str(valor)
-                start_pos = cursor
-                end_pos = cursor + len(placeholder)
+def _montar_rpr_titulo():
+    r = OxmlElement('w:r')
+    run = Run(r, None)
+    run.bold = True
+    run.font.name = 'Garamond'
+    r.rPr.rFonts.set(_W_EASTASIA, 'Garamond')
+    run.font.size = Pt(12)
+    return r.rPr
 
-                start_run_idx, start_offset = _find_run_index_and_offset(start_pos)
-                end_run_idx, end_offset = _find_run_index_and_offset(end_pos - 1)
+# formatação dos títulos dos pedidos (Garamond 12 negrito), montada uma vez e copiada para cada título
+_RPR_TITULO = _montar_rpr_titulo()
 
-                before_text = run_texts[start_run_idx][:start_offset]
-                after_text = run_texts[end_run_idx][end_offset:]
+def _anexar_run_titulo(paragraph, texto):
+    """Acrescenta ao parágrafo um run Garamond 12 negrito (caminho rápido dos títulos)."""
+    r = _novo_run(texto, _RPR_TITULO)
+    paragraph._p.append(r)
+    return r
 
-                for i in range(0, start_run_idx):
-                    segments.append( (run_texts[i], runs[i]) )
+_documento_titulo_vazio = None
 
-                if before_text:
-                    segments.append( (before_text, runs[start_run_idx]) )
+def _documento_titulo(titulo):
+    """Documento só com o título do pedido, anexado antes dele pelo Composer (clone de um Document() vazio)."""
+    global _documento_titulo_vazio
+    if _documento_titulo_vazio is None:
+        _documento_titulo_vazio = Document()
+    doc = clonar_documento(_documento_titulo_vazio)
+    _anexar_run_titulo(doc.add_paragraph(), titulo)
+    return doc
 
-                segments.append( (valor_text, runs[start_run_idx], placeholder in campos_negrito) )
+def _garantir_formatacao_valor(r, negrito):
+    """Valor substituído: Garamond/12 quando o run de origem não define fonte/tamanho; negrito se pedido."""
+    rpr = r.get_or_add_rPr()
+    if not rpr.rFonts_ascii:
+        rpr.rFonts_ascii = 'Garamond'
+        rpr.rFonts_hAnsi = 'Garamond'
+        rpr.rFonts.set(_W_EASTASIA, 'Garamond')
+    if not rpr.sz_val:
+        rpr.sz_val = Pt(12)
+    if negrito:
+        rpr.get_or_add_b().val = True
 
-                for i in range(end_run_idx + 1, len(runs)):
-                    segments.append( (run_texts[i], runs[i]) )
+@lru_cache(maxsize=32)
+def _compile_placeholder_pattern(placeholders):
+    """Compila uma única alternância com todos os placeholders (mais longos primeiro, para não casar prefixos)."""
+    ordered = sorted(placeholders, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(ph) for ph in ordered))
 
-                for r in list(paragraph.runs):
-                    try:
-                        r._element.getparent().remove(r._element)
-                    except Exception:
-                        pass
+def _placeholder_pattern(substitutions):
+    return _compile_placeholder_pattern(tuple(substitutions.keys()))
 
-                for seg in segments:
-                    if len(seg) == 2:
-                        text, src_run = seg
-                        if text == "":
-                            continue
-                        new_run = paragraph.add_run(text)
-                        _copy_run_formatting(src_run, new_run)
-                    else:
-                        text, src_run, force_bold = seg
-                        new_run = paragraph.add_run(text)
-                        try:
-                            _copy_run_formatting(src_run, new_run)
-                        except Exception:
-                            pass
-                        try:
-                            if not new_run.font.name:
-                                new_run.font.name = "Garamond"
-                                try:
-                                    new_run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-                                except Exception:
-                                    pass
-                            if not new_run.font.size:
-                                new_run.font.size = Pt(12)
-                        except Exception:
-                            pass
-                        if force_bold:
-                            new_run.bold = True
+def _insert_run_before(anchor_r, text, rpr_modelo):
+    """Cria um w:r com 'text' imediatamente antes de anchor_r, com uma cópia de rpr_modelo (ver _rpr_modelo)."""
+    new_r = _novo_run(text, rpr_modelo)
+    anchor_r.addprevious(new_r)
+    return new_r
+
+class MapaSubstituicoes:
+    """
+    Onde cada valor do preâmbulo foi parar no documento gerado: placeholder -> runs (w:r) que recebem o valor.
+    Permite corrigir um campo (ex.: CPF digitado errado) sem gerar o documento de novo (ver atualizar_preambulo).
+    """
+    def __init__(self, substitutions):
+        self.valores = dict(substitutions)
+        self.runs = {}
 
-                replace_placeholders_in_paragraph_preserve_runs(paragraph, substitutions, campos_negrito)
-                return
-        if not matched:
-            cursor += 1
+    def registrar(self, placeholder, r_element):
+        self.runs.setdefault(placeholder, []).append(r_element)
+
+# mapa que está sendo preenchido na thread atual (None fora de _registrando_substituicoes)
+_mapa_atual = contextvars.ContextVar("mapa_substituicoes", default=None)
+_ATRIBUTO_MAPA = "_gerador_mapa_substituicoes"
+
+class _registrando_substituicoes:
+    """with _registrando_substituicoes(doc, substitutions): o preenchimento registra os runs no mapa de 'doc'."""
+    def __init__(self, doc, substitutions):
+        self.doc = doc
+        self.mapa = MapaSubstituicoes(substitutions)
+
+    def __enter__(self):
+        self._token = _mapa_atual.set(self.mapa)
+        return self.mapa
+
+    def __exit__(self, exc_type, exc, tb):
+        _mapa_atual.reset(self._token)
+        if exc_type is None:
+            setattr(self.doc, _ATRIBUTO_MAPA, self.mapa)
+        return False
+
+def atualizar_preambulo(doc, campos):
+    """
+    Aplica a um documento já gerado só os campos do preâmbulo que mudaram, reescrevendo os runs registrados
+    no preenchimento. Retorna o número de runs alterados, ou None se o documento não tem mapa (o chamador
+    deve gerar de novo).
+    """
+    mapa = getattr(doc, _ATRIBUTO_MAPA, None)
+    if mapa is None:
+        return None
+    with metricas.geracao("atualizar_preambulo", id_geracao=metricas.id_do_documento(doc)):
+        with metricas.span("atualizar_preambulo") as span:
+            novos = montar_substituicoes(campos)
+            alterados = {ph: valor for ph, valor in novos.items() if mapa.valores.get(ph) != valor}
+            runs = 0
+            for placeholder, valor in alterados.items():
+                for r_element in mapa.runs.get(placeholder, ()):
+                    Run(r_element, None).text = "" if valor is None else str(valor)
+                    runs += 1
+            mapa.valores.update(alterados)
+            span.set(campos=len(alterados), runs=runs)
+    logger.info("[generate_word] preâmbulo atualizado no documento existente: %d campos, %d runs", len(alterados), runs)
+    return runs
+
+def replace_placeholders_in_paragraph_preserve_runs(paragraph, substitutions, campos_negrito):
+    """
+    Substitui todos os placeholders do parágrafo em uma única passada:
+    - uma regex com todas as chaves localiza as ocorrências no texto concatenado dos runs;
+    - apenas os runs que contêm (parte de) um placeholder são divididos/reconstruídos;
+    - o valor herda o w:rPr inteiro do run onde o placeholder começa (Garamond 12 quando sem fonte/tamanho)
+      e fica em negrito quando o placeholder está em campos_negrito.
+    """
+    if not substitutions:
+        return
+    runs = list(paragraph.runs)
+    if not runs:
+        return
+
+    run_texts = [r.text for r in runs]
+    full_text = ''.join(run_texts)
+    matches = list(_placeholder_pattern(substitutions).finditer(full_text))
+    if not matches:
+        return
+
+    # posição inicial de cada run no texto concatenado
+    run_starts = []
+    acc = 0
+    for txt in run_texts:
+        run_starts.append(acc)
+        acc += len(txt)
+
+    def _run_index(pos):
+        # último run que começa em pos ou antes (ignorando runs vazios)
+        idx = bisect_right(run_starts, pos) - 1
+        while idx > 0 and not run_texts[idx]:
+            idx -= 1
+        return max(idx, 0)
+
+    # run -> matches que o tocam (na ordem do texto)
+    touched = {}
+    for m in matches:
+        first = _run_index(m.start())
+        last = _run_index(m.end() - 1)
+        for i in range(first, last + 1):
+            touched.setdefault(i, []).append(m)
+
+    for i, run_matches in touched.items():
+        src_r = runs[i]._r
+        rpr_modelo = _rpr_modelo(src_r)
+        run_begin = run_starts[i]
+        run_end = run_begin + len(run_texts[i])
+        cursor = run_begin
+        for m in run_matches:
+            if m.start() > cursor:
+                _insert_run_before(src_r, full_text[cursor:m.start()], rpr_modelo)
+            if run_begin <= m.start() < run_end:
+                placeholder = m.group(0)
+                valor = substitutions.get(placeholder)
+                valor_text = "" if valor is None else str(valor)
+                mapa = _mapa_atual.get()
+                # com um mapa ativo, valores vazios também ganham um run (vazio) para poder ser corrigidos depois
+                if valor_text or mapa is not None:
+                    new_r = _insert_run_before(src_r, valor_text, rpr_modelo)
+                    if mapa is not None:
+                        mapa.registrar(placeholder, new_r)
+                    _garantir_formatacao_valor(new_r, placeholder in campos_negrito)
+            cursor = max(cursor, m.end())
+        if cursor < run_end:
+            _insert_run_before(src_r, full_text[cursor:run_end], rpr_modelo)
+        src_r.getparent().remove(src_r)
 
 def replace_placeholders_in_table(table, substitutions, campos_negrito):
     for row in table.rows:
@@ -168,30 +340,147 @@ def replace_placeholders_in_doc(doc, substitutions, campos_negrito):
         replace_placeholders_in_paragraph_preserve_runs(p, substitutions, campos_negrito)
     for t in doc.tables:
         replace_placeholders_in_table(t, substitutions, campos_negrito)
-    try:
-        for section in doc.sections:
-            header = section.header
-            for p in header.paragraphs:
-                replace_placeholders_in_paragraph_preserve_runs(p, substitutions, campos_negrito)
-            for t in header.tables:
-                replace_placeholders_in_table(t, substitutions, campos_negrito)
-            footer = section.footer
-            for p in footer.paragraphs:
-                replace_placeholders_in_paragraph_preserve_runs(p, substitutions, campos_negrito)
-            for t in footer.tables:
-                replace_placeholders_in_table(t, substitutions, campos_negrito)
-    except Exception:
-        pass
+    # cada parte de cabeçalho/rodapé uma vez só, mesmo quando várias seções a compartilham
+    for part in _header_footer_parts(doc):
+        story = BlockItemContainer(part.element, part)
+        for p in story.paragraphs:
+            replace_placeholders_in_paragraph_preserve_runs(p, substitutions, campos_negrito)
+        for t in story.tables:
+            replace_placeholders_in_table(t, substitutions, campos_negrito)
+
+# ---------------------------------------------------------------------------
+# Modo "compilado": mapa de localização dos placeholders por template.
+# Como os documentos entregues pelo cache são clones estruturalmente idênticos ao arquivo,
+# basta registrar uma vez o caminho (índices de filhos a partir da raiz da parte) de cada
+# parágrafo que contém placeholder; o preenchimento vai direto nesses parágrafos.
+# O mapa é refeito automaticamente quando o arquivo muda (mtime/tamanho).
+# ---------------------------------------------------------------------------
+
+class CompiledTemplate:
+    def __init__(self, key, placeholders, locations):
+        self.key = key                    # (caminho_abs, mtime_ns, tamanho)
+        self.placeholders = placeholders  # tupla das chaves usadas na compilação
+        # lista de (partname, caminho_de_indices, placeholders_encontrados); no preenchimento cada parágrafo
+        # localizado é varrido inteiro por replace_placeholders_in_paragraph_preserve_runs
+        self.locations = locations
+
+_compiled_templates = {}
+_compiled_lock = threading.Lock()
+
+def _iter_story_paragraph_elements(container):
+    """Parágrafos visitados por replace_placeholders_in_doc: w:p diretos e células de tabelas (inclusive aninhadas)."""
+    for child in container.iterchildren():
+        if child.tag == _W_P:
+            yield child
+        elif child.tag == _W_TBL:
+            for tc in child.iter(_W_TC):
+                for p in tc.iterchildren(_W_P):
+                    yield p
+
+def _element_path(root, element):
+    path = []
+    el = element
+    while el is not root:
+        parent = el.getparent()
+        path.append(parent.index(el))
+        el = parent
+    path.reverse()
+    return tuple(path)
+
+def _resolve_element_path(root, path):
+    el = root
+    for i in path:
+        el = el[i]
+    return el
+
+def _header_footer_parts(doc):
+    """
+    Partes de cabeçalho/rodapé referenciadas pelas seções (padrão, primeira página e páginas pares), cada uma
+    uma única vez e sem criar definições novas. Seções "vinculadas à anterior" não têm referência própria.
+    Partes sem árvore XML (.element) são ignoradas individualmente, com um aviso no log.
+    """
+    parts = []
+    seen = set()
+    related = doc.part.related_parts
+    for sectPr in doc.element.body.iter(_W_SECTPR):
+        for ref in sectPr.iterchildren(_W_HEADER_REFERENCE, _W_FOOTER_REFERENCE):
+            part = related.get(ref.get(_R_ID))
+            if part is None:
+                continue
+            if part.partname in seen:
+                continue
+            seen.add(part.partname)
+            if getattr(part, "element", None) is None:
+                logger.warning("[generate_word] cabeçalho/rodapé %s sem XML carregado (%s); ignorado.",
+                               part.partname, type(part).__name__)
+                continue
+            parts.append(part)
+    return parts
+
+def _story_roots(doc):
+    """(partname, raiz da parte, contêiner dos parágrafos) do corpo e dos cabeçalhos/rodapés."""
+    stories = [(str(doc.part.partname), doc.element, doc.element.body)]
+    for part in _header_footer_parts(doc):
+        stories.append((str(part.partname), part.element, part.element))
+    return stories
+
+def _compile_doc_locations(doc, pattern):
+    locations = []
+    for partname, root, container in _story_roots(doc):
+        for p_el in _iter_story_paragraph_elements(container):
+            full_text = ''.join(r.text for r in Paragraph(p_el, None).runs)
+            found = tuple(m.group(0) for m in pattern.finditer(full_text))
+            if found:
+                locations.append((partname, _element_path(root, p_el), found))
+    return locations
+
+def compilar_template(caminho, placeholders):
+    """
+    Retorna o CompiledTemplate de 'caminho' para o conjunto de placeholders informado,
+    compilando (ou recompilando, se o arquivo mudou) quando necessário.
+    """
+    key = template_key(caminho)
+    placeholders = tuple(placeholders)
+    cache_key = (key[0], placeholders)
+    with _compiled_lock:
+        compiled = _compiled_templates.get(cache_key)
+    if compiled is not None and compiled.key == key:
+        return compiled
+
+    doc = _abrir_template_auxiliar(caminho)
+    locations = _compile_doc_locations(doc, _compile_placeholder_pattern(placeholders))
+    compiled = CompiledTemplate(key, placeholders, locations)
+    with _compiled_lock:
+        _compiled_templates[cache_key] = compiled
+    logger.info("[generate_word] template compilado %s: %d parágrafos com placeholders", key[0], len(locations))
+    return compiled
+
+def replace_placeholders_compiled(doc, compiled, substitutions, campos_negrito):
+    """
+    Preenche apenas os parágrafos registrados no mapa compilado.
+    Retorna False se o documento não corresponde ao mapa (ex.: template alterado entre a
+    compilação e a abertura); nesse caso o chamador deve usar replace_placeholders_in_doc.
+    """
+    roots = {str(doc.part.partname): doc.element}
+    for rel in doc.part.rels.values():
+        if not rel.is_external and rel.reltype in (RT.HEADER, RT.FOOTER):
+            roots[str(rel.target_part.partname)] = rel.target_part.element
 
-def _docx_has_media(docx_path: str) -> bool:
     try:
-        with zipfile.ZipFile(docx_path, 'r') as z:
-            for name in z.namelist():
-                if name.startswith('word/media/'):
-                    return True
-    except Exception:
+        targets = [(_resolve_element_path(roots[partname], path), found)
+                   for partname, path, found in compiled.locations]
+    except (KeyError, IndexError):
         return False
-    return False
+
+    for p_el, found in targets:
+        if p_el.tag != _W_P:
+            return False
+        paragraph = Paragraph(p_el, None)
+        text = paragraph.text
+        if any(ph not in text for ph in found):
+            return False
+        replace_placeholders_in_paragraph_preserve_runs(paragraph, substitutions, campos_negrito)
+    return True
 
 # regex para detectar prefixo romano seguido por separador (tab, hífen ou –/—)
 _ROMAN_PREFIX_RE = re.compile(r'^\s*[IVXLCDM]+\s*[\t\-\u2013\u2014]\s*', flags=re.I)
@@ -206,16 +495,26 @@ def _extract_title_text(paragraph):
     text = (paragraph.text or "").strip()
     return _ROMAN_PREFIX_RE.sub('', text).strip() or text
 
-def _is_heading_style(paragraph):
+def _heading_style_ids(doc):
+    """
+    Ids dos estilos de parágrafo cujo nome contém 'heading' ou 'title', mais o id do estilo padrão: a detecção
+    de títulos compara o w:pStyle de cada parágrafo com esse conjunto em vez de resolver paragraph.style
+    (uma busca nos estilos por parágrafo).
+    """
+    ids = set()
+    default_id = None
     try:
-        style = paragraph.style
-        if style and getattr(style, 'name', None):
-            name = style.name.lower()
+        for style in doc.styles.element.style_lst:
+            if style.type != WD_STYLE_TYPE.PARAGRAPH:
+                continue
+            if style.default:
+                default_id = style.styleId
+            name = (style.name_val or "").lower()
             if 'heading' in name or 'title' in name:
-                return True
+                ids.add(style.styleId)
     except Exception:
-        pass
-    return False
+        logger.exception("Erro ao ler estilos do documento")
+    return ids, default_id
 
 def _paragraph_has_bold(paragraph):
     try:
@@ -228,89 +527,69 @@ def _paragraph_has_bold(paragraph):
 
 def _find_title_paragraph_indices(doc: Document, max_count: int = 3):
     """
-    Heurística para localizar índices de parágrafos que funcionam como títulos:
+    Heurística para localizar índices de parágrafos que funcionam como títulos (em ordem de prioridade):
     1) parágrafos com estilo contendo 'heading' ou 'title'
     2) parágrafos com runs bold
     3) parágrafos curtos seguidos por parágrafo não-vazio
     4) fallback: primeiros parágrafos não vazios
+    Os parágrafos são materializados uma única vez e as quatro heurísticas avaliadas na mesma
+    passada (cada uma guarda no máximo max_count candidatos, o suficiente para a mesclagem por prioridade).
     Retorna lista de índices (ordenados na ordem que aparecem no documento), até max_count.
     """
-    indices = []
-    total = len(doc.paragraphs)
+    paragraphs = doc.paragraphs
+    texts = [(p.text or "").strip() for p in paragraphs]
+    total = len(paragraphs)
+    heading_ids, default_id = _heading_style_ids(doc)
+    candidatos = ([], [], [], [])  # heading, bold, curto+conteúdo, não vazio
 
-    # helper to add index if valid and not duplicate
-    def add_idx(i):
-        if i is None or i < 0 or i >= total:
-            return
-        if i not in indices:
-            indices.append(i)
-
-    # 1) heading style
-    for i, p in enumerate(doc.paragraphs):
-        if len(indices) >= max_count:
-            break
-        if not (p.text or "").strip():
+    for i, p in enumerate(paragraphs):
+        text = texts[i]
+        if not text:
             continue
-        if _is_heading_style(p):
-            add_idx(i)
-
-    # 2) bold paragraphs
-    if len(indices) < max_count:
-        for i, p in enumerate(doc.paragraphs):
-            if len(indices) >= max_count:
-                break
-            if i in indices:
-                continue
-            if not (p.text or "").strip():
-                continue
-            if _paragraph_has_bold(p):
-                add_idx(i)
+        heading, bold, curto, nao_vazio = candidatos
+        if len(heading) < max_count and (p._p.style or default_id) in heading_ids:
+            heading.append(i)
+            if len(heading) >= max_count:
+                break  # heurística 1 já preenche tudo
+        if len(bold) < max_count and _paragraph_has_bold(p):
+            bold.append(i)
+        if len(curto) < max_count and i + 1 < total and texts[i + 1] and len(text) <= 200:
+            curto.append(i)
+        if len(nao_vazio) < max_count:
+            nao_vazio.append(i)
 
-    # 3) short paragraph followed by non-empty paragraph (title+content pattern)
-    if len(indices) < max_count:
-        for i in range(len(doc.paragraphs)-1):
-            if len(indices) >= max_count:
-                break
-            if i in indices:
-                continue
-            p = doc.paragraphs[i]
-            nxt = doc.paragraphs[i+1]
-            if not (p.text or "").strip():
-                continue
-            if not (nxt.text or "").strip():
-                continue
-            if len((p.text or "").strip()) <= 200:
-                add_idx(i)
-
-    # 4) fallback: first non-empty paragraphs
-    if len(indices) < max_count:
-        for i, p in enumerate(doc.paragraphs):
+    indices = []
+    escolhidos = set()
+    for lista in candidatos:
+        for i in lista:
             if len(indices) >= max_count:
                 break
-            if i in indices:
-                continue
-            if (p.text or "").strip():
-                add_idx(i)
+            if i not in escolhidos:
+                escolhidos.add(i)
+                indices.append(i)
 
     indices.sort()
     return indices
 
-def _apply_sequential_titles_to_doc(doc: Document, start_idx: int, count: int = 3, prefix_spaces: str = "                  "):
+def _apply_sequential_titles_to_doc(doc: Document, start_idx: int, count: int = 3, prefix_spaces: str = "                  ", title_indices=None):
     """
     Localiza até 'count' parágrafos que parecem títulos e substitui seus textos por
     títulos sequenciais começando em start_idx (em números romanos).
+    title_indices: índices já conhecidos (ex.: do índice de templates); se None, são detectados aqui.
     Retorna next_idx = start_idx + number_of_titles_applied
     """
-    title_indices = _find_title_paragraph_indices(doc, max_count=count)
+    if title_indices is None:
+        title_indices = _find_title_paragraph_indices(doc, max_count=count)
     applied = 0
     idx = start_idx
+    paragraphs = doc.paragraphs  # materializa uma vez (cada acesso a doc.paragraphs recria a lista)
 
     # Replace existing title paragraphs
     for ti in title_indices:
         if applied >= count:
             break
         try:
-            p = doc.paragraphs[ti]
+            p = paragraphs[ti]
             original_text = _extract_title_text(p)
             # remove runs
             for r in list(p.runs):
@@ -320,14 +599,7 @@ def _apply_sequential_titles_to_doc(doc: Document, start_idx: int, count: int =
                     pass
             # insert new numbered title
             title_str = f"{prefix_spaces}{int_to_roman(idx)} - {replace_bar_placeholder(original_text)}"
-            new_run = p.add_run(title_str)
-            new_run.bold = True
-            try:
-                new_run.font.name = 'Garamond'
-                new_run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-                new_run.font.size = Pt(12)
-            except Exception:
-                pass
+            _anexar_run_titulo(p, title_str)
             applied += 1
             idx += 1
         except Exception as e:
@@ -337,88 +609,292 @@ def _apply_sequential_titles_to_doc(doc: Document, start_idx: int, count: int =
     # If not enough titles found, insert missing titles after the last applied title (or at end)
     if applied < count:
         # find insertion point: after last applied index, otherwise end of document
-        insert_pos = title_indices[-1] + 1 if title_indices else len(doc.paragraphs)
+        insert_pos = title_indices[-1] + 1 if title_indices else len(paragraphs)
+        target = paragraphs[insert_pos]._element if insert_pos < len(paragraphs) else None
         for _ in range(count - applied):
             try:
                 p_new = doc.add_paragraph("")  # appended at end
-                # attempt to move it to insert_pos by inserting before doc.paragraphs[insert_pos] if possible
-                try:
-                    target = doc.paragraphs[insert_pos]._element
-                    # remove runs from p_new then add run
-                    for r in list(p_new.runs):
-                        try:
-                            r._element.getparent().remove(r._element)
-                        except Exception:
-                            pass
-                    title_str = f"{prefix_spaces}{int_to_roman(idx)}- "
-                    new_run = p_new.add_run(title_str)
-                    new_run.bold = True
-                    try:
-                        new_run.font.name = 'Garamond'
-                        new_run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-                        new_run.font.size = Pt(12)
-                    except Exception:
-                        pass
-                    # move element before target
-                    p_new._element.addprevious(target)
-                except Exception:
-                    # fallback: leave appended at end
-                    for r in list(p_new.runs):
-                        try:
-                            r._element.getparent().remove(r._element)
-                        except Exception:
-                            pass
-                    title_str = f"{prefix_spaces}{int_to_roman(idx)}- "
-                    new_run = p_new.add_run(title_str)
-                    new_run.bold = True
-                    try:
-                        new_run.font.name = 'Garamond'
-                        new_run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-                        new_run.font.size = Pt(12)
-                    except Exception:
-                        pass
+                title_str = f"{prefix_spaces}{int_to_roman(idx)}- "
+                _anexar_run_titulo(p_new, title_str)
+                # move before target (titles inserted in sequence keep their order); without target, stays at end
+                if target is not None:
+                    target.addprevious(p_new._element)
                 applied += 1
                 idx += 1
-                insert_pos += 1
             except Exception as e:
                 logger.exception("Erro ao inserir título adicional: %s", e)
                 idx += 1
-                inserted = False
 
     return start_idx + applied
 
-def gerar_documento(caminho_modelo, campos, pedidos_ordenados, numeracao_inicial=6, ai_response=None):
-    logger.info("[generate_word] inicio gerar_documento; modelo_base=%s; pedidos_ordenados=%s", caminho_modelo, pedidos_ordenados)
+# ---------------------------------------------------------------------------
+# Índice persistente de metadados (templates/.indice_templates.json): evita reabrir zips e
+# refazer as heurísticas de título a cada geração. Ver template_index.py.
+# ---------------------------------------------------------------------------
+
+_PLACEHOLDER_TOKEN_RE = re.compile(r'\{\{[^{}]+\}\}')
+
+def _calcular_fatos_template(caminho):
+    doc = _abrir_template_auxiliar(caminho)
+    placeholders = set()
+    for _, _, container in _story_roots(doc):
+        for p_el in _iter_story_paragraph_elements(container):
+            placeholders.update(_PLACEHOLDER_TOKEN_RE.findall(Paragraph(p_el, None).text))
+    normalizacao = estatisticas_do_documento(doc)
+    runs = contar_runs(doc)
+    return {
+        "placeholders": sorted(placeholders),
+        "titulos": _find_title_paragraph_indices(doc, max_count=3),
+        # contagem de runs no arquivo e depois da normalização (iguais com GERADOR_NORMALIZAR=0)
+        "runs": {"arquivo": normalizacao["runs_antes"] if normalizacao else runs, "normalizado": runs},
+    }
+
+_indices_templates = {}
+_indices_lock = threading.Lock()
+
+def indice_templates(diretorio):
+    """Índice (compartilhado no processo) do diretório de templates."""
+    diretorio = os.path.abspath(diretorio)
+    with _indices_lock:
+        indice = _indices_templates.get(diretorio)
+        if indice is None:
+            indice = TemplateIndex(diretorio, _calcular_fatos_template)
+            _indices_templates[diretorio] = indice
+        return indice
+
+def _fatos_template(caminho, templates_dir):
+    try:
+        return indice_templates(templates_dir).fatos(caminho)
+    except Exception as e:
+        logger.exception("[generate_word] falha ao consultar índice para %s: %s", caminho, e)
+        return None
+
+class GeracaoCancelada(Exception):
+    """Levantada por gerar_documento quando o evento 'cancelar' é sinalizado entre dois anexos."""
+
+def _checar_cancelamento(cancelar):
+    if cancelar is not None and cancelar.is_set():
+        logger.info("[generate_word] geração cancelada pelo usuário.")
+        raise GeracaoCancelada("Geração cancelada pelo usuário.")
+
+def _notificar_progresso(progresso, feitos, total, descricao):
+    if progresso is None:
+        return
+    try:
+        progresso(feitos, total, descricao)
+    except Exception:
+        logger.exception("Erro no callback de progresso")
+
+def gerar_documento(caminho_modelo, campos, pedidos_ordenados, numeracao_inicial=6, ai_response=None, progresso=None, cancelar=None,
+                    baixa_memoria=None):
+    """
+    Gera o documento a partir do modelo_base, anexando os pedidos na ordem informada e o modelo_base_final.
+    - progresso(feitos, total, descricao): chamado após cada anexo (pode vir de uma thread de trabalho).
+    - cancelar: threading.Event; quando sinalizado, a geração é interrompida entre dois anexos com GeracaoCancelada.
+    - baixa_memoria: força (True/False) o modo de baixa memória; None usa GERADOR_BAIXA_MEMORIA.
+    """
+    return compor_documento(caminho_modelo, pedidos_ordenados, numeracao_inicial, progresso=progresso, cancelar=cancelar, campos=campos,
+                            baixa_memoria=baixa_memoria)
+
+def _preencher_modelo_base(doc, caminho_modelo, substitutions):
+    """Preenche os placeholders do modelo_base pelo mapa compilado; retorna False se o mapa não corresponder ao documento."""
+    fatos = _fatos_template(caminho_modelo, os.path.dirname(caminho_modelo))
+    if fatos is not None and not set(fatos["placeholders"]) & set(substitutions):
+        return True  # modelo sem placeholders conhecidos: nada a preencher
+    try:
+        compiled = compilar_template(caminho_modelo, substitutions.keys())
+        return replace_placeholders_compiled(doc, compiled, substitutions, CAMPOS_NEGRITO)
+    except Exception as e:
+        logger.exception("Erro no preenchimento compilado de %s: %s", caminho_modelo, e)
+        return False
+
+def preencher_documento_composto(doc, caminho_modelo, campos):
+    """
+    Preenche o trecho do modelo_base de um documento montado por compor_documento(campos=None).
+    Os pedidos são anexados depois do conteúdo do modelo_base, então o mapa compilado continua válido;
+    retorna False se não corresponder (ex.: template alterado) e o chamador deve usar gerar_documento.
+    """
+    with metricas.geracao("preencher_pre_composto", id_geracao=metricas.id_do_documento(doc)):
+        with metricas.span("preencher"):
+            substitutions = montar_substituicoes(campos)
+            with _registrando_substituicoes(doc, substitutions):
+                return _preencher_modelo_base(doc, caminho_modelo, substitutions)
+
+def compor_documento(caminho_modelo, pedidos_ordenados, numeracao_inicial=6, progresso=None, cancelar=None, campos=None, baixa_memoria=None):
+    """
+    Monta modelo_base + pedidos (com títulos romanos) + modelo_base_final.
+    Com campos=None os placeholders do modelo_base ficam intactos: a composição não depende do preâmbulo
+    e pode ser feita antecipadamente (ver preencher_documento_composto).
+    """
+    nome = "gerar_documento" if campos is not None else "pre_composicao"
+    with perfil.perfilar(nome, len(pedidos_ordenados or [])) as ctx_perfil, \
+            metricas.geracao(nome, pedidos=len(pedidos_ordenados or [])) as ctx:
+        if baixa_memoria is None:
+            baixa_memoria = BAIXA_MEMORIA
+        with _modo_baixa_memoria(baixa_memoria):
+            doc = _compor_documento(caminho_modelo, pedidos_ordenados, numeracao_inicial, progresso, cancelar, campos, baixa_memoria)
+        metricas.associar_documento(doc, ctx)
+        perfil.associar_documento(doc, ctx_perfil)
+        return doc
+
+class Esqueleto:
+    """
+    Documento composto uma única vez (modelo_base + pedidos com títulos romanos + modelo_base_final) com os
+    placeholders intactos, para gerar a inicial de várias pessoas com os mesmos pedidos na mesma ordem.
+    preencher(campos) devolve um documento novo por registro: clone do esqueleto preenchido pelo mapa compilado
+    do modelo_base, como em preencher_documento_composto. Placeholders dos pedidos e do modelo_base_final ficam
+    intactos, igual a gerar_documento.
+    """
+
+    def __init__(self, doc, caminho_modelo, pedidos_ordenados, numeracao_inicial, baixa_memoria=None):
+        self._doc = doc
+        self.caminho_modelo = caminho_modelo
+        self.pedidos_ordenados = list(pedidos_ordenados or [])
+        self.pedidos = len(self.pedidos_ordenados)
+        self.numeracao_inicial = numeracao_inicial
+        self.baixa_memoria = baixa_memoria
+
+    def preencher(self, campos):
+        with metricas.geracao("preencher_esqueleto", pedidos=self.pedidos) as ctx:
+            with metricas.span("clonar_esqueleto"):
+                doc = clonar_documento(self._doc)
+            with metricas.span("preencher"):
+                substitutions = montar_substituicoes(campos)
+                with _registrando_substituicoes(doc, substitutions), _modo_baixa_memoria(self.baixa_memoria):
+                    preenchido = _preencher_modelo_base(doc, self.caminho_modelo, substitutions)
+            metricas.associar_documento(doc, ctx)
+        if not preenchido:
+            logger.warning("[generate_word] mapa do modelo_base não corresponde ao esqueleto; gerando o documento completo.")
+            return gerar_documento(self.caminho_modelo, campos, self.pedidos_ordenados, self.numeracao_inicial,
+                                   baixa_memoria=self.baixa_memoria)
+        return doc
+
+def compor_esqueleto(caminho_modelo, pedidos_ordenados, numeracao_inicial=6, progresso=None, cancelar=None, baixa_memoria=None):
+    """Compõe o Esqueleto reutilizável; equivale a gerar_documento sem o preâmbulo, feito uma vez para N registros."""
+    doc = compor_documento(caminho_modelo, pedidos_ordenados, numeracao_inicial, progresso=progresso, cancelar=cancelar,
+                           baixa_memoria=baixa_memoria)
+    esqueleto = Esqueleto(doc, caminho_modelo, pedidos_ordenados, numeracao_inicial, baixa_memoria)
+    logger.info("[generate_word] esqueleto composto: %d pedidos", esqueleto.pedidos)
+    return esqueleto
+
+def _abrir_modelo(caminho, baixa_memoria):
+    """No modo de baixa memória lê direto do disco (o cache manteria uma cópia mestre de cada modelo em memória)."""
+    if baixa_memoria:
+        registrar_origem(caminho)
+        doc = Document(caminho)
+        normalizar_template(doc, caminho)
+        return doc
+    return abrir_template(caminho)
+
+# modo de baixa memória da geração em andamento (None: vale GERADOR_BAIXA_MEMORIA). Os caminhos que abrem
+# templates só para consulta (mapa compilado, índice de metadados) também leem do disco nesse modo.
+_baixa_memoria_atual = contextvars.ContextVar("baixa_memoria", default=None)
+
+class _modo_baixa_memoria:
+    """with _modo_baixa_memoria(True/False/None): vale para _abrir_template_auxiliar na thread atual."""
+    def __init__(self, baixa_memoria):
+        self.baixa_memoria = baixa_memoria
+
+    def __enter__(self):
+        self._token = _baixa_memoria_atual.set(self.baixa_memoria)
+
+    def __exit__(self, exc_type, exc, tb):
+        _baixa_memoria_atual.reset(self._token)
+        return False
+
+def _abrir_template_auxiliar(caminho):
+    baixa_memoria = _baixa_memoria_atual.get()
+    return _abrir_modelo(caminho, BAIXA_MEMORIA if baixa_memoria is None else baixa_memoria)
+
+_pool_prefetch = None
+_pool_prefetch_lock = threading.Lock()
+
+def _obter_pool_prefetch():
+    global _pool_prefetch
+    with _pool_prefetch_lock:
+        if _pool_prefetch is None:
+            _pool_prefetch = ThreadPoolExecutor(max_workers=PREFETCH_THREADS, thread_name_prefix="prefetch_modelos")
+        return _pool_prefetch
+
+class _AberturaAdiada:
+    """Mesma interface de um Future, mas só abre o modelo quando result() é chamado (prefetch desativado)."""
+    __slots__ = ("_caminho", "_baixa_memoria")
+
+    def __init__(self, caminho, baixa_memoria):
+        self._caminho = caminho
+        self._baixa_memoria = baixa_memoria
+
+    def result(self):
+        return _abrir_modelo(self._caminho, self._baixa_memoria)
+
+    def cancel(self):
+        return True
+
+def _abrir_em_paralelo(caminhos, baixa_memoria):
+    """
+    Gera, na ordem de 'caminhos', um future por modelo. Até PREFETCH_THREADS modelos (1 no modo de baixa memória)
+    ficam sendo abertos adiantados no pool; unzip e parse do lxml liberam o GIL, então isso se sobrepõe à anexação.
+    Erros de abertura aparecem em future.result(), no mesmo ponto em que apareceriam na abertura sequencial.
+    """
+    if PREFETCH_THREADS <= 0:
+        for caminho in caminhos:
+            yield _AberturaAdiada(caminho, baixa_memoria)
+        return
+    pool = _obter_pool_prefetch()
+    janela = 1 if baixa_memoria else PREFETCH_THREADS
+    restantes = iter(caminhos)
+    pendentes = deque(pool.submit(_abrir_modelo, c, baixa_memoria) for _, c in zip(range(janela), restantes))
+    try:
+        while pendentes:
+            futuro = pendentes.popleft()
+            proximo = next(restantes, None)
+            if proximo is not None:
+                pendentes.append(pool.submit(_abrir_modelo, proximo, baixa_memoria))
+            yield futuro
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+
+class _MonitorMemoria:
+    """No modo de baixa memória, coleta o lixo após cada anexo e acompanha o pico de RSS observado."""
+
+    def __init__(self, ativo):
+        self.ativo = ativo
+        self.inicial = metricas.rss_atual_mb() if ativo else None
+        self.pico = self.inicial
+
+    def amostrar(self, span=None):
+        if not self.ativo:
+            return
+        # os documentos de origem têm ciclos (part <-> package): sem gc.collect só seriam liberados mais tarde
+        gc.collect()
+        rss = metricas.rss_atual_mb()
+        if rss is not None and (self.pico is None or rss > self.pico):
+            self.pico = rss
+        if span is not None:
+            span.set(rss_mb=rss)
+
+    def relatar(self, pedidos):
+        if self.ativo:
+            logger.info("[generate_word] baixa memória: %s pedidos; RSS inicial=%s MB, pico observado=%s MB", pedidos, self.inicial, self.pico)
+
+def _compor_documento(caminho_modelo, pedidos_ordenados, numeracao_inicial, progresso, cancelar, campos, baixa_memoria=False):
+    logger.info("[generate_word] inicio gerar_documento; modelo_base=%s; %d pedidos", caminho_modelo, len(pedidos_ordenados or []))
+    logger_listas.info("[generate_word] pedidos_ordenados=%s", pedidos_ordenados)
     # Open base template
     try:
-        doc = Document(caminho_modelo)
+        with metricas.span("abrir_base"):
+            doc = _abrir_modelo(caminho_modelo, baixa_memoria)
     except Exception as e:
         logger.exception("Erro ao abrir modelo_base: %s", caminho_modelo)
         raise
 
-    substitutions = {
-        "{{NOME_RECLAMANTE}}": campos.get("Nome reclamante", ""),
-        "{{PROFISSAO_RECLAMANTE}}": campos.get("Profissao / Cargo", ""),
-        "{{DATA_NASCIMENTO_RECLAMANTE}}": campos.get("Data de nascimento", ""),
-        "{{NOME_MAE_RECLAMANTE}}": campos.get("Nome da mae", ""),
-        "{{NUMERO_PIS_RECLAMANTE}}": campos.get("Número do pis", ""),
-        "{{NUMERO_CTPS_RECLAMANTE}}": campos.get("Número da ctps", ""),
-        "{{NUMERO_RG_RECLAMANTE}}": campos.get("Número rg", ""),
-        "{{NUMERO_CPF_RECLAMANTE}}": campos.get("Número do cpf", ""),
-        "{{RUA_DO_RECLAMANTE}}": campos.get("Rua do reclamante", ""),
-        "{{NUMERO_CASA_RECLAMANTE_E_COMPLEMENTO}}": campos.get("Número da casa do reclamante e complemento", ""),
-        "{{BAIRRO_RECLAMANTE}}": campos.get("Bairro reclamante", ""),
-        "{{CEP_RECLAMANTE}}": campos.get("Cep reclamante", ""),
-        "{{NOME_RECLAMADA}}": campos.get("Nome da reclamada", ""),
-        "{{EMPRESA_PROCESSADA}}": campos.get("Empresa processada", ""),
-        "{{NUMERO_CNPJ_RECLAMADA}}": campos.get("Numero de cnpj da reclamada", ""),
-        "{{ENDERECO_RECLAMADA}}": campos.get("Endereço reclamada", ""),
-        "{{COMPLEMENTO_RECLAMADA}}": campos.get("Complemento reclamada", ""),
-        "{{BAIRRO_RECLAMADA}}": campos.get("Bairro reclamada", ""),
-        "{{CEP_RECLAMADA}}": campos.get("Cep reclamada", "")
-    }
-
-    replace_placeholders_in_doc(doc, substitutions, CAMPOS_NEGRITO)
+    if campos is not None:
+        with metricas.span("preencher"):
+            substitutions = montar_substituicoes(campos)
+            with _registrando_substituicoes(doc, substitutions):
+                if not _preencher_modelo_base(doc, caminho_modelo, substitutions):
+                    replace_placeholders_in_doc(doc, substitutions, CAMPOS_NEGRITO)
 
     if not pedidos_ordenados:
         logger.info("[generate_word] nenhum pedido informado; retornando apenas template.")
@@ -442,142 +918,107 @@ def gerar_documento(caminho_modelo, campos, pedidos_ordenados, numeracao_inicial
     base_templates_dir = os.path.dirname(caminho_modelo)
     final_model_path = os.path.join(base_templates_dir, "modelo_base_final.docx")
     final_exists = os.path.isfile(final_model_path)
+    final_titles = None
+    if final_exists:
+        fatos_final = _fatos_template(final_model_path, base_templates_dir)
+        if fatos_final is not None:
+            final_titles = fatos_final["titulos"]
+    total_etapas = len(pedidos_validos) + (1 if final_exists else 0)
+    _notificar_progresso(progresso, 0, total_etapas, "")
+    memoria = _MonitorMemoria(baixa_memoria)
+    caminhos_a_anexar = [c for _, c in pedidos_validos] + ([final_model_path] if final_exists else [])
 
     # If Composer is available, try to use it (best option to preserve images/relationships)
-    if Composer is not None:
+    if Composer is not None and MESCLAGEM != "interna":
         composer = None
         try:
             composer = Composer(doc)
+            indice_midias = indexar_midias(doc)
         except Exception as e:
             logger.exception("Erro inicializando Composer: %s. Faremos fallback.", e)
             composer = None
 
         if composer is not None:
             composer_failed = False
+            abertos = _abrir_em_paralelo(caminhos_a_anexar, baixa_memoria)
             # Try appending using composer. For titles we append a tiny Document with the title before the model.
             for idx, (nome_modelo, caminho_modelo_pedido) in enumerate(pedidos_validos, numeracao_inicial):
+                _checar_cancelamento(cancelar)
                 titulo = f"                  {int_to_roman(idx)} - {replace_bar_placeholder(nome_modelo)}"
                 logger.info("[generate_word] Composer: anexando %s -> %s", nome_modelo, caminho_modelo_pedido)
                 try:
-                    # create small Document for title
-                    title_doc = Document()
-                    p_title = title_doc.add_paragraph()
-                    run_title = p_title.add_run(titulo)
-                    run_title.bold = True
-                    try:
-                        run_title.font.name = 'Garamond'
-                        run_title._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-                        run_title.font.size = Pt(12)
-                    except Exception:
-                        pass
+                    title_doc = _documento_titulo(titulo)
 
                     # append title doc then the source doc
-                    composer.append(title_doc)
-                    src = Document(caminho_modelo_pedido)
-                    composer.append(src)
+                    with metricas.span("anexar_pedido", pedido=nome_modelo, via="composer") as span:
+                        composer.append(title_doc)
+                        with metricas.span("abrir_pedido", pedido=nome_modelo):
+                            src = next(abertos).result()
+                        composer.append(src)
+                        # o Composer já copiou corpo e mídia para 'doc': a origem pode ser liberada
+                        del src, title_doc
+                        memoria.amostrar(span)
                 except Exception as e:
                     logger.exception("Composer falhou ao anexar %s: %s", nome_modelo, e)
                     composer_failed = True
                     break
+                _notificar_progresso(progresso, idx - numeracao_inicial + 1, total_etapas, replace_bar_placeholder(nome_modelo))
 
             if not composer_failed:
                 # Append final model if exists
                 if final_exists:
+                    _checar_cancelamento(cancelar)
                     try:
-                        final_src = Document(final_model_path)
+                        with metricas.span("abrir_final"):
+                            final_src = next(abertos).result()
                         # apply sequential titles to the first 3 title-like paragraphs
                         next_idx = numeracao_inicial + len(pedidos_validos)
-                        _apply_sequential_titles_to_doc(final_src, next_idx, count=3)
-                        composer.append(final_src)
+                        with metricas.span("titulos_final"):
+                            _apply_sequential_titles_to_doc(final_src, next_idx, count=3, title_indices=final_titles)
+                        with metricas.span("anexar_final", via="composer") as span:
+                            composer.append(final_src)
+                            del final_src
+                            memoria.amostrar(span)
                         logger.info("[generate_word] Composer: anexado modelo_final %s (com 3 títulos atualizados)", final_model_path)
+                        _notificar_progresso(progresso, total_etapas, total_etapas, "modelo_base_final")
                     except Exception as e:
                         logger.exception("Composer falhou ao anexar modelo_final: %s", e)
                         composer_failed = True
 
                 if not composer_failed:
-                    tmpf = tempfile.NamedTemporaryFile(delete=False, suffix=".docx")
-                    tmpf.close()
-                    try:
-                        composer.save(tmpf.name)
-                        final_doc = Document(tmpf.name)
-                    finally:
-                        try:
-                            os.remove(tmpf.name)
-                        except Exception:
-                            pass
-                    logger.info("[generate_word] composer finalizado e documento retornado.")
+                    # O Composer monta o resultado no próprio 'doc' (composer.doc is doc): devolvemos o objeto
+                    # em memória em vez de salvar num temporário e reabrir; a única serialização fica em salvar_documento.
+                    abertos.close()
+                    final_doc = composer.doc
+                    _deduplicar_midias(final_doc, indice_midias.reaproveitadas, indice_midias.copiadas)
+                    memoria.relatar(len(pedidos_validos))
+                    logger.info("[generate_word] composer finalizado e documento retornado. cache=%s", estatisticas_cache())
                     return final_doc
                 else:
-                    logger.warning("[generate_word] composer falhou durante append final; faremos fallback para anexar restantes via deepcopy.")
+                    logger.warning("[generate_word] composer falhou durante append final; faremos fallback para o mesclador interno.")
                     # If composer failed, fall through to fallback logic below.
+            abertos.close()
 
-    # Composer is not available (or failed). Check whether any model has media; if so, raise an informative error.
-    models_with_media = [c for _, c in pedidos_validos if _docx_has_media(c)]
-    # Also check if final model has media (it will be appended too)
-    if final_exists and _docx_has_media(final_model_path):
-        models_with_media.append(final_model_path)
-
-    if models_with_media and Composer is None:
-        logger.error("Alguns modelos contêm imagens/mídia e Composer não está disponível: %s", models_with_media)
-        raise RuntimeError(
-            "Alguns modelos contêm imagens/mídia. Para preservar imagens ao concatenar documentos, instale "
-            "a dependência 'docxcompose' no ambiente de build/execution: pip install docxcompose\n"
-            "Ou empacote seu executável a partir de um ambiente onde docxcompose esteja instalado."
-        )
-
-    # Fallback when no media (or composer failed): append by deep-copying XML elements (preserves most formatting for text/tables)
+    # Composer indisponível, desativado (GERADOR_MESCLAGEM=interna) ou com falha: usamos o mesclador próprio,
+    # que leva junto imagens, hyperlinks, estilos e listas de cada modelo
+    mesclador = Mesclador(doc)
+    abertos = _abrir_em_paralelo(caminhos_a_anexar, baixa_memoria)
     for idx, (nome_modelo, caminho_modelo_pedido) in enumerate(pedidos_validos, numeracao_inicial):
-        logger.info("[generate_word] Fallback: anexando por deepcopy %s -> %s", nome_modelo, caminho_modelo_pedido)
+        _checar_cancelamento(cancelar)
+        logger.info("[generate_word] Mesclador: anexando %s -> %s", nome_modelo, caminho_modelo_pedido)
         titulo = f"                  {int_to_roman(idx)} - {replace_bar_placeholder(nome_modelo)}"
-        p_title = doc.add_paragraph()
-        run = p_title.add_run(titulo)
-        run.bold = True
-        try:
-            run.font.name = 'Garamond'
-            run._element.rPr.rFonts.set(qn('w:eastAsia'), 'Garamond')
-            run.font.size = Pt(12)
-        except Exception:
-            pass
-
-        try:
-            src = Document(caminho_modelo_pedido)
-            for element in src.element.body:
-                doc.element.body.append(deepcopy(element))
-        except Exception as e:
-            logger.exception("deepcopy falhou para %s: %s; tentando fallback run-a-run.", nome_modelo, e)
-            # Last-resort fallback: copy paragraph by paragraph preserving run formatting where possible
-            try:
-                src = Document(caminho_modelo_pedido)
-                for paragraph in src.paragraphs:
-                    p = doc.add_paragraph()
-                    try:
-                        p.style = paragraph.style
-                    except Exception:
-                        pass
-                    for run in paragraph.runs:
-                        r = p.add_run(run.text)
-                        _copy_run_formatting(run, r)
-            except Exception as e2:
-                logger.exception("fallback run-a-run também falhou para %s: %s; pula modelo.", nome_modelo, e2)
-                pass
-
-        doc.add_paragraph("")
+        _anexar_run_titulo(doc.add_paragraph(), titulo)
 
-    # Após anexar todos os pedidos, anexamos o modelo_final (se existir) e atualizamos os seus 3 títulos
-    if final_exists:
-        logger.info("[generate_word] Fallback: anexando modelo_final por deepcopy %s", final_model_path)
-        try:
-            final_src = Document(final_model_path)
-            next_idx = numeracao_inicial + len(pedidos_validos)
-            # apply sequential titles to the first 3 title-like paragraphs (in-place)
-            _apply_sequential_titles_to_doc(final_src, next_idx, count=3)
+        with metricas.span("anexar_pedido", pedido=nome_modelo, via="mesclador") as span:
             try:
-                for element in final_src.element.body:
-                    doc.element.body.append(deepcopy(element))
+                src = next(abertos).result()
+                mesclador.anexar(src)
             except Exception as e:
-                logger.exception("deepcopy falhou para modelo_final %s: %s; tentando fallback run-a-run.", final_model_path, e)
+                logger.exception("anexação do corpo falhou para %s: %s; tentando fallback run-a-run.", nome_modelo, e)
+                # Last-resort fallback: copy paragraph by paragraph preserving run formatting where possible
                 try:
-                    for paragraph in final_src.paragraphs:
+                    src = _abrir_modelo(caminho_modelo_pedido, baixa_memoria)
+                    for paragraph in src.paragraphs:
                         p = doc.add_paragraph()
                         try:
                             p.style = paragraph.style
@@ -585,20 +1026,72 @@ def gerar_documento(caminho_modelo, campos, pedidos_ordenados, numeracao_inicial
                             pass
                         for run in paragraph.runs:
                             r = p.add_run(run.text)
-                            _copy_run_formatting(run, r)
+                            _clonar_rpr(run._r, r._r)
                 except Exception as e2:
-                    logger.exception("fallback run-a-run também falhou para modelo_final %s: %s; pula modelo.", final_model_path, e2)
+                    logger.exception("fallback run-a-run também falhou para %s: %s; pula modelo.", nome_modelo, e2)
                     pass
+            src = None
+            memoria.amostrar(span)
+
+        doc.add_paragraph("")
+        _notificar_progresso(progresso, idx - numeracao_inicial + 1, total_etapas, replace_bar_placeholder(nome_modelo))
+
+    # Após anexar todos os pedidos, anexamos o modelo_final (se existir) e atualizamos os seus 3 títulos
+    if final_exists:
+        _checar_cancelamento(cancelar)
+        logger.info("[generate_word] Mesclador: anexando modelo_final %s", final_model_path)
+        try:
+            with metricas.span("abrir_final"):
+                final_src = next(abertos).result()
+            next_idx = numeracao_inicial + len(pedidos_validos)
+            # apply sequential titles to the first 3 title-like paragraphs (in-place)
+            with metricas.span("titulos_final"):
+                _apply_sequential_titles_to_doc(final_src, next_idx, count=3, title_indices=final_titles)
+            with metricas.span("anexar_final", via="mesclador") as span:
+                try:
+                    mesclador.anexar(final_src)
+                except Exception as e:
+                    logger.exception("anexação do corpo falhou para modelo_final %s: %s; tentando fallback run-a-run.", final_model_path, e)
+                    try:
+                        for paragraph in final_src.paragraphs:
+                            p = doc.add_paragraph()
+                            try:
+                                p.style = paragraph.style
+                            except Exception:
+                                pass
+                            for run in paragraph.runs:
+                                r = p.add_run(run.text)
+                                _clonar_rpr(run._r, r._r)
+                    except Exception as e2:
+                        logger.exception("fallback run-a-run também falhou para modelo_final %s: %s; pula modelo.", final_model_path, e2)
+                        pass
+                final_src = None
+                memoria.amostrar(span)
 
             doc.add_paragraph("")
-            logger.info("[generate_word] modelo_final anexado por fallback com títulos atualizados.")
+            logger.info("[generate_word] modelo_final anexado pelo mesclador com títulos atualizados.")
+            _notificar_progresso(progresso, total_etapas, total_etapas, "modelo_base_final")
         except Exception as e:
             logger.exception("Erro ao anexar modelo_final: %s", e)
             # não abortamos; retornamos o documento já gerado sem o final se houver erro
 
-    logger.info("[generate_word] anexação por fallback concluída; retornando documento.")
+    _deduplicar_midias(doc, mesclador.estatisticas["midias_reaproveitadas"], mesclador.estatisticas["midias_copiadas"])
+    memoria.relatar(len(pedidos_validos))
+    logger.info("[generate_word] anexação pelo mesclador concluída; retornando documento. mesclagem=%s cache=%s",
+                mesclador.estatisticas, estatisticas_cache())
     return doc
 
+def _deduplicar_midias(doc, reaproveitadas, copiadas):
+    """Passada final de deduplicação de mídia (src/mesclador.py); registra o que foi reaproveitado na composição e nela."""
+    with metricas.span("deduplicar_midias") as span:
+        estatisticas = deduplicar_midias(doc)
+        estatisticas.update(reaproveitadas_na_composicao=reaproveitadas, copiadas_na_composicao=copiadas)
+        span.set(**estatisticas)
+    logger.info("[generate_word] mídias: %d imagens copiadas e %d reaproveitadas na composição; passada final removeu %d cópias "
+                "(%.1f KB, %d relacionamentos reescritos); %d imagens únicas no documento",
+                copiadas, reaproveitadas, estatisticas["midias_removidas"], estatisticas["bytes_economizados"] / 1024,
+                estatisticas["relacionamentos_reescritos"], estatisticas["midias_unicas"])
+
 def salvar_documento(doc, caminho_destino):
     """
     Salva o docx no caminho_destino de forma mais robusta:
@@ -606,6 +1099,51 @@ def salvar_documento(doc, caminho_destino):
     - Move/replace o arquivo temporário para o destino (os.replace) para evitar problemas de escrita direta.
     - Em caso de erro, levanta RuntimeError com mensagem detalhada.
     """
+    with perfil.perfilar("salvar_documento", prefixo=perfil.prefixo_do_documento(doc)), \
+            metricas.geracao("salvar_documento", id_geracao=metricas.id_do_documento(doc)):
+        with metricas.span("salvar") as span:
+            span.set(**_salvar_documento(doc, caminho_destino))
+
+def documento_em_bytes(doc):
+    """Serializa o docx em memória, sem passar pelo disco (usado pelo serviço local em src/servico.py)."""
+    with perfil.perfilar("salvar_documento", prefixo=perfil.prefixo_do_documento(doc)), \
+            metricas.geracao("salvar_documento", id_geracao=metricas.id_do_documento(doc)):
+        with metricas.span("salvar", destino="memoria") as span:
+            buffer = io.BytesIO()
+            estatisticas = _gravar(doc, buffer)
+            conteudo = buffer.getvalue()
+            estatisticas["bytes"] = len(conteudo)
+            _relatar_salvamento("memória", estatisticas)
+            span.set(**estatisticas)
+            return conteudo
+
+def _gravar(doc, destino):
+    """
+    Grava pelo salvamento próprio (src/salvamento.py: cópia sem recompressão das partes intactas, nível de
+    compressão configurável). Se ele falhar, recorre ao doc.save() do python-docx.
+    Documentos que não são do python-docx (DocumentoGerado do serviço local, já serializado) só gravam os bytes.
+    """
+    inicio = time.perf_counter()
+    if not hasattr(doc, "part"):
+        doc.save(destino)
+        return {"segundos": round(time.perf_counter() - inicio, 4), "pronto": True}
+    try:
+        return gravar_pacote(doc, destino)
+    except Exception as e:
+        logger.warning("[generate_word] salvamento próprio falhou (%r); usando doc.save()", e)
+        if hasattr(destino, "seek"):
+            destino.seek(0)
+            destino.truncate()
+        inicio = time.perf_counter()
+        doc.save(destino)
+        return {"segundos": round(time.perf_counter() - inicio, 4), "fallback": True}
+
+def _relatar_salvamento(destino, estatisticas):
+    logger.info("[generate_word] documento salvo (%s): %.1f KB em %.3fs; %s partes, %s copiadas sem recompressão, %s armazenadas, %s comprimidas",
+                destino, estatisticas.get("bytes", 0) / 1024, estatisticas.get("segundos", 0.0), estatisticas.get("partes", "?"),
+                estatisticas.get("copiadas", "?"), estatisticas.get("armazenadas", "?"), estatisticas.get("comprimidas", "?"))
+
+def _salvar_documento(doc, caminho_destino):
     logger.info("[generate_word] Salvando documento em: %s", caminho_destino)
     if not caminho_destino:
         logger.error("[generate_word] Caminho destino vazio ao salvar documento.")
@@ -626,7 +1164,8 @@ def salvar_documento(doc, caminho_destino):
     try:
         # tenta salvar no temporário
         try:
-            doc.save(tmp_path)
+            estatisticas = _gravar(doc, tmp_path)
+            estatisticas["bytes"] = os.path.getsize(tmp_path)
         except Exception as e:
             logger.exception("Erro ao salvar documento temporário em %s: %s", tmp_path, e)
             raise RuntimeError(f"Erro ao salvar documento temporário em {tmp_path}: {e}")
@@ -662,4 +1201,7 @@ def salvar_documento(doc, caminho_destino):
             if os.path.exists(tmp_path):
                 os.remove(tmp_path)
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+    _relatar_salvamento(caminho_destino, estatisticas)
+    return estatisticas
@@ -2,7 +2,9 @@ import customtkinter as ctk
 import os
 import sys
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, Tk, messagebox
 
 # Determina o diretório base a ser usado para buscar templates e criar logs.
@@ -26,27 +28,135 @@ LOGS_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOGS_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOGS_DIR, "logs.txt")
 
-formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%Y-%m-%d %H:%M:%S")
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.INFO)
-
-file_handler = RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")
-file_handler.setFormatter(formatter)
-root_logger.addHandler(file_handler)
-
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(formatter)
-root_logger.addHandler(console_handler)
+# arquivo e console são escritos por uma thread própria (src/registro_log.py); níveis por módulo via GERADOR_LOG_NIVEIS
+from . import registro_log
+registro_log.configurar(arquivo=LOG_FILE, console=True)
 
 logger = logging.getLogger(__name__)
+# dumps de listas (modelos, pedidos) — podem ser desligados com GERADOR_LOG_NIVEIS=src.main.listas=WARNING
+logger_listas = logging.getLogger(__name__ + ".listas")
 logger.info("Inicializando aplicação — base_dir=%s", BASE_DIR)
 
-# Agora importamos generate_word (que usa logging)
-from .generate_word import gerar_documento, salvar_documento
+# métricas por fase da geração (logs/metricas.jsonl), ativadas com GERADOR_METRICAS=1
+from . import metricas
+metricas.configurar(LOGS_DIR)
+# perfis cProfile/tracemalloc por geração (logs/perfil_*), ativados com GERADOR_PERFIL=1
+from . import perfil
+perfil.configurar(LOGS_DIR)
+
+# generate_word (docx, lxml, docxcompose) NÃO é importado aqui: a janela aparece primeiro e o import acontece
+# na thread de aquecimento (ver _gw e _descobrir_modelos)
 
 ctk.set_appearance_mode("system")
 ctk.set_default_color_theme("blue")
 
+# intervalo (ms) com que a janela consulta o andamento da geração em segundo plano
+POLL_MS = 50
+# espera (ms) após a última mudança na seleção de pedidos antes de iniciar a pré-composição
+PRE_COMPOSICAO_DELAY_MS = 400
+# URL do serviço local de geração (python -m src.servico); quando definida, a geração é feita lá
+SERVICO_URL = os.environ.get("GERADOR_SERVICO", "").strip() or None
+
+def _gw():
+    """
+    Módulo generate_word, importado sob demanda. Normalmente a descoberta de modelos em segundo plano já o
+    importou quando a primeira geração começa; aí isto é só uma consulta a sys.modules.
+    """
+    from . import generate_word
+    return generate_word
+
+def _descobrir_modelos(templates_dir):
+    """
+    Executado na thread de segundo plano: importa as bibliotecas de documento e devolve os nomes dos .docx em
+    templates/modelos pela listagem do diretório. Os metadados são calculados depois, em _indexar_templates,
+    sem segurar o botão Gerar; um template ilegível continua na lista.
+    """
+    modelos_dir = os.path.join(templates_dir, "modelos")
+    if not os.path.isdir(modelos_dir):
+        os.makedirs(modelos_dir)
+    try:
+        listados = _gw().indice_templates(templates_dir).listar()
+        return sorted(rel.split("/", 1)[1] for rel in listados if rel.startswith("modelos/"))
+    except Exception:
+        logger.exception("[main.carregar_modelos] falha ao consultar índice de templates; listando diretório.")
+        return sorted(f for f in os.listdir(modelos_dir) if f.lower().endswith('.docx'))
+
+def _indexar_templates(templates_dir):
+    """Atualiza o índice de templates (só arquivos novos/alterados são reprocessados) em segundo plano."""
+    try:
+        _gw().indice_templates(templates_dir).atualizar()
+    except Exception:
+        logger.exception("[main] falha ao atualizar índice de templates")
+
+def _aquecer_templates(templates_dir):
+    """Deixa modelo_base e modelo_base_final parseados no cache antes da primeira geração."""
+    gw = _gw()
+    if gw.BAIXA_MEMORIA:
+        return  # no modo de baixa memória os modelos são lidos do disco e o cache fica vazio
+    for nome in ("modelo_base.docx", "modelo_base_final.docx"):
+        caminho = os.path.join(templates_dir, nome)
+        if os.path.isfile(caminho):
+            try:
+                gw.abrir_template(caminho)
+            except Exception:
+                logger.exception("[main] falha ao pré-carregar %s", caminho)
+
+def _gerar(caminho_template, dados, pedidos_ordenados, progresso, cancelar):
+    return _gw().gerar_documento(caminho_template, dados, pedidos_ordenados, 6, None, progresso, cancelar)  # numeracao padrão 6
+
+def _compor(caminho_template, pedidos_ordenados, progresso, cancelar):
+    return _gw().compor_documento(caminho_template, pedidos_ordenados, 6, progresso, cancelar)
+
+def _salvar(doc, caminho_destino):
+    return _gw().salvar_documento(doc, caminho_destino)
+
+class _RelayProgresso:
+    """Progresso da pré-composição: guardado até a especulação ser aproveitada, depois repassado à UI."""
+    def __init__(self):
+        self.destino = None
+        self.ultimo = None
+
+    def __call__(self, feitos, total, descricao):
+        self.ultimo = (feitos, total, descricao)
+        destino = self.destino
+        if destino is not None:
+            destino(feitos, total, descricao)
+
+def _atualizar_ultimo_documento(doc, caminho_template, dados, pedidos_ordenados, progresso, cancelar):
+    """Executado na thread de geração: corrige só os campos alterados do último documento (ou gera do zero)."""
+    if _gw().atualizar_preambulo(doc, dados) is not None:
+        return doc
+    logger.warning("[main] último documento sem mapa de substituições; gerando do zero.")
+    return _gerar(caminho_template, dados, pedidos_ordenados, progresso, cancelar)
+
+def _gerar_com_pre_composicao(future_pre, caminho_template, dados, pedidos_ordenados, progresso, cancelar):
+    """
+    Executado na thread de geração: aguarda a pré-composição (pedidos + modelo_base_final já anexados)
+    e só preenche o preâmbulo. Se a pré-composição falhou ou não corresponde ao template, gera do zero.
+    """
+    gw = _gw()
+    try:
+        doc = future_pre.result()
+    except gw.GeracaoCancelada:
+        raise
+    except Exception:
+        logger.exception("[main] pré-composição falhou; gerando do zero.")
+        return _gerar(caminho_template, dados, pedidos_ordenados, progresso, cancelar)
+    if gw.preencher_documento_composto(doc, caminho_template, dados):
+        logger.info("[main] documento gerado a partir da pré-composição.")
+        return doc
+    logger.warning("[main] pré-composição não corresponde ao template; gerando do zero.")
+    return _gerar(caminho_template, dados, pedidos_ordenados, progresso, cancelar)
+
+def _gerar_via_servico(dados, pedidos_ordenados, progresso, cancelar):
+    """Executado na thread de geração: envia o trabalho ao serviço local (sem progresso por pedido)."""
+    from .servico_cliente import gerar_no_servico, registro_de_geracao  # urllib só é necessário neste modo
+    if cancelar.is_set():
+        raise _gw().GeracaoCancelada()
+    doc = gerar_no_servico(SERVICO_URL, registro_de_geracao(dados, pedidos_ordenados, 6))
+    progresso(1, 1, "")
+    return doc
+
 def get_base_dir():
     """
     Retorna o diretório base onde procurar recursos (templates).
@@ -114,8 +224,14 @@ class App(ctk.CTk):
         self.modelos_widgets = []  # referências aos widgets de checkbox (para poder remover ao recarregar)
         self.selecionados_ordem = []  # mantém a ordem em que o usuário marcou (se usar)
 
-        # Carrega modelos iniciais
-        self.carregar_modelos()
+        # Pré-composição especulativa: enquanto o usuário preenche o preâmbulo, os pedidos selecionados
+        # (e o modelo_base_final) já são anexados em segundo plano. _especulacao = (chave, future, cancelar, relay).
+        self._executor_pre = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pre-composicao")
+        self._especulacao = None
+        self._pre_composicao_after = None
+        # Último documento gerado (chave da composição, doc, caminho salvo): se só o preâmbulo mudar, a próxima
+        # geração corrige os valores nos runs já preenchidos em vez de montar tudo de novo.
+        self._ultimo_documento = None
 
         # ---- FRAME DE BOTOES (fora dos painéis), centralizados ----
         botoes_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
@@ -134,11 +250,67 @@ class App(ctk.CTk):
         self.botao_atualizar = ctk.CTkButton(buttons_container, text="Atualizar Modelos", width=160, height=36, font=("Arial",12), command=self.carregar_modelos)
         self.botao_atualizar.pack(side="left", padx=(12,0))
 
+        # ---- PROGRESSO DA GERAÇÃO (exibido apenas enquanto gera/salva) ----
+        self.progresso_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        self.progresso_label = ctk.CTkLabel(self.progresso_frame, text="")
+        self.progresso_label.pack(side="left", padx=(0, 10))
+        self.progresso_bar = ctk.CTkProgressBar(self.progresso_frame, width=360)
+        self.progresso_bar.set(0)
+        self.progresso_bar.pack(side="left", padx=(0, 10))
+        self.botao_cancelar = ctk.CTkButton(self.progresso_frame, text="Cancelar", width=110, height=30, fg_color="#d9534f", hover_color="#c9302c", command=self.cancelar_geracao)
+        self.botao_cancelar.pack(side="left")
+
+        # A geração roda em uma thread de trabalho; o widget Tk só é tocado pela thread principal,
+        # que consulta a fila de eventos via after().
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geracao")
+        self._eventos = queue.Queue()
+        self._cancelar = None
+        self.protocol("WM_DELETE_WINDOW", self._ao_fechar)
+
+        # Descoberta de modelos e import das bibliotecas de documento em segundo plano: a janela é desenhada
+        # antes, e os checkboxes aparecem quando a lista fica pronta.
+        self._executor_fundo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aquecimento")
+        self._modelos_aquecidos = False
+        self._aviso_carregando = None
+        self.carregar_modelos()
+
     def carregar_modelos(self):
         """
-        (Re)carrega a lista de .docx em templates/modelos e recria os checkboxes no scroll.
-        Preserva seleções/ordem anteriores quando possível.
+        (Re)carrega a lista de .docx em templates/modelos em segundo plano; os checkboxes são recriados em
+        _mostrar_modelos quando a lista fica pronta.
         """
+        self.botao_atualizar.configure(state="disabled")
+        self.botao_gerar.configure(state="disabled")
+        if not self.modelos_vars:
+            self._aviso_carregando = ctk.CTkLabel(self.modelos_scroll, text="Carregando modelos...")
+            self._aviso_carregando.pack(anchor="w", padx=6, pady=6)
+        templates_dir = os.path.join(get_base_dir(), "templates")
+        future = self._executor_fundo.submit(_descobrir_modelos, templates_dir)
+        self.after(POLL_MS, self._acompanhar_descoberta, future, templates_dir)
+
+    def _acompanhar_descoberta(self, future, templates_dir):
+        if not future.done():
+            self.after(POLL_MS, self._acompanhar_descoberta, future, templates_dir)
+            return
+        if self._aviso_carregando is not None:
+            self._aviso_carregando.destroy()
+            self._aviso_carregando = None
+        self.botao_atualizar.configure(state="normal")
+        self.botao_gerar.configure(state="normal")
+        try:
+            arquivos = future.result()
+        except Exception as e:
+            logger.exception("[main.carregar_modelos] falha ao listar modelos")
+            messagebox.showerror("Erro", f"Não foi possível listar os modelos:\n{e}")
+            return
+        self._mostrar_modelos(arquivos)
+        self._executor_fundo.submit(_indexar_templates, templates_dir)
+        if not self._modelos_aquecidos:
+            self._modelos_aquecidos = True
+            self._executor_fundo.submit(_aquecer_templates, templates_dir)
+
+    def _mostrar_modelos(self, arquivos):
+        """Recria os checkboxes para 'arquivos'. Preserva seleções/ordem anteriores quando possível."""
         prev_selected = {c: v.get() for (_, v, c) in self.modelos_vars}
         prev_order = list(self.selecionados_ordem)
 
@@ -152,13 +324,7 @@ class App(ctk.CTk):
         self.modelos_vars = []
         self.selecionados_ordem = []
 
-        base_dir = get_base_dir()
-        modelos_dir = os.path.join(base_dir, "templates", "modelos")
-        if not os.path.isdir(modelos_dir):
-            os.makedirs(modelos_dir)
-
-        arquivos = [f for f in os.listdir(modelos_dir) if f.lower().endswith('.docx')]
-        arquivos.sort()  # ordenação estável por nome (você pode escolher outra)
+        modelos_dir = os.path.join(get_base_dir(), "templates", "modelos")
         for nome_arquivo in arquivos:
             caminho_arquivo = os.path.join(modelos_dir, nome_arquivo)
             var = ctk.BooleanVar(value=prev_selected.get(caminho_arquivo, False))
@@ -186,11 +352,13 @@ class App(ctk.CTk):
             if v.get() and (n, c) not in self.selecionados_ordem:
                 self.selecionados_ordem.append((n, c))
 
-        logger.info("[main.carregar_modelos] modelos carregados: %s", [(n,c) for (n,_,c) in self.modelos_vars])
-        logger.debug("[main.carregar_modelos] selecionados_ordem reconstruido: %s", self.selecionados_ordem)
+        if logger_listas.isEnabledFor(logging.INFO):
+            logger_listas.info("[main.carregar_modelos] modelos carregados: %s", [(n,c) for (n,_,c) in self.modelos_vars])
+        logger_listas.debug("[main.carregar_modelos] selecionados_ordem reconstruido: %s", self.selecionados_ordem)
 
         # Atualiza display das labels dos modelos para mostrar ordem quando marcados
         self.update_modelos_display()
+        self._agendar_pre_composicao()
 
     def atualizar_ordem_selecao(self, nome, caminho, var):
         valor = var.get()
@@ -202,6 +370,7 @@ class App(ctk.CTk):
 
         # Atualiza visualmente os textos dos checkboxes para mostrar a ordem atual
         self.update_modelos_display()
+        self._agendar_pre_composicao()
 
     def update_modelos_display(self):
         """
@@ -247,6 +416,7 @@ class App(ctk.CTk):
         self.selecionados_ordem = []
         # atualizar display
         self.update_modelos_display()
+        self._agendar_pre_composicao()
 
         messagebox.showinfo("Limpar", "Campos e seleções foram limpos.")
         logger.info("Campos limpos e seleções removidas pelo usuário.")
@@ -256,53 +426,217 @@ class App(ctk.CTk):
 
         # Recolhe dados do preâmbulo
         dados = {campo: entry.get() for campo, entry in self.campos.items()}
+        pedidos_ordenados = self._pedidos_ordenados()
 
-        # Primeiro tenta usar a ordem interna (se o usuário estava usando isso)
-        pedidos_ordenados = list(self.selecionados_ordem)  # copia para não alterar original
-
-        # Se estiver vazia, reconstrói a lista a partir dos checkboxes marcados (sem ordem)
-        if not pedidos_ordenados:
-            pedidos_ordenados = [(nome, caminho) for (nome, var, caminho) in self.modelos_vars if var.get()]
-
-        logger.info("[main.gerar_inicial] pedidos_ordenados: %s", pedidos_ordenados)
-        logger.debug("[main.gerar_inicial] modelos detectados: %s", [(nome, caminho) for (nome, _, caminho) in self.modelos_vars])
+        logger_listas.info("[main.gerar_inicial] pedidos_ordenados: %s", pedidos_ordenados)
+        if logger_listas.isEnabledFor(logging.DEBUG):
+            logger_listas.debug("[main.gerar_inicial] modelos detectados: %s", [(nome, caminho) for (nome, _, caminho) in self.modelos_vars])
 
         if not pedidos_ordenados:
             if not messagebox.askyesno("Nenhum modelo selecionado", "Nenhum modelo selecionado. Deseja gerar apenas a base (modelo_base)?"):
                 logger.info("Usuário cancelou geração sem modelos selecionados.")
                 return
 
-        base_dir = get_base_dir()
-        caminho_template = os.path.join(base_dir, 'templates', 'modelo_base.docx')
+        caminho_template = self._caminho_template()
         if not os.path.exists(caminho_template):
             logger.error("Template não encontrado em %s", caminho_template)
             messagebox.showerror("Erro", f"Template não encontrado em {caminho_template}")
             return
 
+        self._iniciar_geracao(caminho_template, dados, pedidos_ordenados)
+
+    def _pedidos_ordenados(self):
+        # Primeiro tenta usar a ordem interna (se o usuário estava usando isso)
+        pedidos_ordenados = list(self.selecionados_ordem)  # copia para não alterar original
+
+        # Se estiver vazia, reconstrói a lista a partir dos checkboxes marcados (sem ordem)
+        if not pedidos_ordenados:
+            pedidos_ordenados = [(nome, caminho) for (nome, var, caminho) in self.modelos_vars if var.get()]
+        return pedidos_ordenados
+
+    def _caminho_template(self):
+        return os.path.join(get_base_dir(), 'templates', 'modelo_base.docx')
+
+    def _chave_composicao(self, caminho_template, pedidos_ordenados):
+        """Identifica uma composição: pedidos na ordem + versão (mtime/tamanho) de cada template envolvido."""
+        try:
+            template_key = _gw().template_key
+            caminho_final = os.path.join(os.path.dirname(caminho_template), "modelo_base_final.docx")
+            versao_final = template_key(caminho_final) if os.path.isfile(caminho_final) else None
+            return (template_key(caminho_template), versao_final,
+                    tuple((nome, template_key(caminho)) for nome, caminho in pedidos_ordenados))
+        except OSError:
+            return None
+
+    def _agendar_pre_composicao(self):
+        """Reinicia a contagem para a pré-composição (evita recompor a cada clique em sequência)."""
+        if SERVICO_URL:
+            return  # a geração acontece no serviço local; não há o que pré-compor aqui
+        if self._pre_composicao_after is not None:
+            self.after_cancel(self._pre_composicao_after)
+        self._pre_composicao_after = self.after(PRE_COMPOSICAO_DELAY_MS, self._iniciar_pre_composicao)
+
+    def _iniciar_pre_composicao(self):
+        self._pre_composicao_after = None
+        caminho_template = self._caminho_template()
+        pedidos_ordenados = self._pedidos_ordenados()
+        chave = self._chave_composicao(caminho_template, pedidos_ordenados) if pedidos_ordenados else None
+        if self._especulacao is not None and self._especulacao[0] == chave:
+            return
+        self._descartar_pre_composicao()
+        if chave is None:
+            return
+        if self._ultimo_documento is not None and self._ultimo_documento[0] == chave:
+            return  # a próxima geração só reaplica o preâmbulo no último documento; nada a pré-compor
+        cancelar = threading.Event()
+        relay = _RelayProgresso()
+        future = self._executor_pre.submit(_compor, caminho_template, pedidos_ordenados, relay, cancelar)
+        self._especulacao = (chave, future, cancelar, relay)
+        logger_listas.debug("[main] pré-composição iniciada para %s", pedidos_ordenados)
+
+    def _descartar_pre_composicao(self):
+        if self._especulacao is not None:
+            _, future, cancelar, _ = self._especulacao
+            cancelar.set()
+            future.cancel()
+            self._especulacao = None
+
+    def _iniciar_geracao(self, caminho_template, dados, pedidos_ordenados):
+        # descarta eventos de progresso que tenham sobrado de uma geração anterior
+        while not self._eventos.empty():
+            self._eventos.get_nowait()
+        self._set_gerando(True, "Gerando documento...")
+
+        def progresso(feitos, total, descricao):
+            # chamado na thread de trabalho: só enfileira; a UI é atualizada em _acompanhar_geracao
+            self._eventos.put((feitos, total, descricao))
+
+        # Aproveita a pré-composição se ela corresponde exatamente à seleção atual; senão, descarta e gera do zero.
+        if self._pre_composicao_after is not None:
+            self.after_cancel(self._pre_composicao_after)
+            self._pre_composicao_after = None
+        chave = self._chave_composicao(caminho_template, pedidos_ordenados) if pedidos_ordenados else None
+        chave_documento = self._chave_composicao(caminho_template, pedidos_ordenados)
+        ultimo, self._ultimo_documento = self._ultimo_documento, None
+        if SERVICO_URL:
+            self._cancelar = threading.Event()
+            future = self._executor.submit(_gerar_via_servico, dados, pedidos_ordenados, progresso, self._cancelar)
+        elif ultimo is not None and chave_documento is not None and ultimo[0] == chave_documento:
+            # mesmos pedidos e templates: só o preâmbulo pode ter mudado
+            self._descartar_pre_composicao()
+            self._cancelar = threading.Event()
+            future = self._executor.submit(_atualizar_ultimo_documento, ultimo[1], caminho_template, dados,
+                                           pedidos_ordenados, progresso, self._cancelar)
+        elif self._especulacao is not None and chave is not None and self._especulacao[0] == chave:
+            _, future_pre, cancelar, relay = self._especulacao
+            self._especulacao = None
+            self._cancelar = cancelar
+            relay.destino = progresso
+            if relay.ultimo is not None:
+                progresso(*relay.ultimo)
+            future = self._executor.submit(_gerar_com_pre_composicao, future_pre, caminho_template, dados,
+                                           pedidos_ordenados, progresso, cancelar)
+        else:
+            self._descartar_pre_composicao()
+            self._cancelar = threading.Event()
+            future = self._executor.submit(_gerar, caminho_template, dados, pedidos_ordenados, progresso, self._cancelar)
+        self.after(POLL_MS, self._acompanhar_geracao, future, chave_documento, ultimo[2] if ultimo else None)
+
+    def _acompanhar_geracao(self, future, chave_documento=None, caminho_anterior=None):
+        while not self._eventos.empty():
+            feitos, total, descricao = self._eventos.get_nowait()
+            self.progresso_bar.set(feitos / total if total else 0)
+            texto = f"Anexando pedidos: {feitos}/{total}"
+            if descricao:
+                texto += f" — {descricao}"
+            self.progresso_label.configure(text=texto)
+
+        if not future.done():
+            self.after(POLL_MS, self._acompanhar_geracao, future, chave_documento, caminho_anterior)
+            return
+
+        self._set_gerando(False)
+        # o documento pré-composto foi consumido; prepara o próximo para a mesma seleção (se ela continuar
+        # igual à do documento gerado, _iniciar_pre_composicao não compõe nada: vale o caminho do preâmbulo)
+        self._agendar_pre_composicao()
         try:
-            doc = gerar_documento(caminho_template, dados, pedidos_ordenados, 6)  # numeracao padrão 6
+            doc = future.result()
+        except _gw().GeracaoCancelada:
+            logger.info("Geração cancelada pelo usuário.")
+            messagebox.showinfo("Cancelado", "A geração do documento foi cancelada.")
+            return
         except Exception as e:
             logger.exception("Erro ao gerar documento")
             messagebox.showerror("Erro na geração", f"Ocorreu um erro ao gerar o documento:\n{e}")
             return
+        if not SERVICO_URL and chave_documento is not None:
+            self._ultimo_documento = (chave_documento, doc, caminho_anterior)
 
         root = Tk()
         root.withdraw()
+        # numa correção do preâmbulo o diálogo já sugere o arquivo salvo da última vez
+        opcoes_dialogo = {}
+        if caminho_anterior:
+            opcoes_dialogo = {"initialdir": os.path.dirname(caminho_anterior), "initialfile": os.path.basename(caminho_anterior)}
         caminho_destino = filedialog.asksaveasfilename(
             title="Salvar documento gerado",
             filetypes=[("Word Document", "*.docx")],
-            defaultextension=".docx"
+            defaultextension=".docx",
+            **opcoes_dialogo
         )
         root.destroy()
         if caminho_destino:
-            try:
-                salvar_documento(doc, caminho_destino)
-                logger.info("Documento salvo em %s", caminho_destino)
-                messagebox.showinfo("Sucesso", f"Documento salvo em:\n{caminho_destino}")
-            except Exception as e:
-                logger.exception("Erro ao salvar documento")
-                messagebox.showerror("Erro ao salvar", f"Não foi possível salvar o arquivo:\n{e}")
+            self._set_gerando(True, "Salvando documento...", cancelavel=False)
+            self.progresso_bar.set(1)
+            future_salvar = self._executor.submit(_salvar, doc, caminho_destino)
+            self.after(POLL_MS, self._acompanhar_salvamento, future_salvar, caminho_destino)
+
+    def _acompanhar_salvamento(self, future, caminho_destino):
+        if not future.done():
+            self.after(POLL_MS, self._acompanhar_salvamento, future, caminho_destino)
+            return
+        self._set_gerando(False)
+        try:
+            future.result()
+            logger.info("Documento salvo em %s", caminho_destino)
+            if self._ultimo_documento is not None:
+                self._ultimo_documento = self._ultimo_documento[:2] + (caminho_destino,)
+            messagebox.showinfo("Sucesso", f"Documento salvo em:\n{caminho_destino}")
+        except Exception as e:
+            logger.exception("Erro ao salvar documento")
+            messagebox.showerror("Erro ao salvar", f"Não foi possível salvar o arquivo:\n{e}")
+
+    def _set_gerando(self, gerando, texto="", cancelavel=True):
+        """Mostra/oculta a barra de progresso e (des)habilita os botões enquanto há trabalho em segundo plano."""
+        estado = "disabled" if gerando else "normal"
+        for botao in (self.botao_gerar, self.botao_limpar, self.botao_atualizar):
+            botao.configure(state=estado)
+        if gerando:
+            self.progresso_label.configure(text=texto)
+            self.progresso_bar.set(0)
+            self.botao_cancelar.configure(state="normal" if cancelavel else "disabled")
+            self.progresso_frame.pack(pady=(10, 0))
+        else:
+            self.progresso_frame.pack_forget()
+
+    def cancelar_geracao(self):
+        if self._cancelar is not None:
+            self._cancelar.set()
+            self.botao_cancelar.configure(state="disabled")
+            self.progresso_label.configure(text="Cancelando após o pedido atual...")
+
+    def _ao_fechar(self):
+        if self._cancelar is not None:
+            self._cancelar.set()
+        self._descartar_pre_composicao()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor_pre.shutdown(wait=False, cancel_futures=True)
+        self._executor_fundo.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+def main():
+    app = App()
+    app.mainloop()
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
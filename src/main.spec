@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['cProfile', 'pstats', 'tracemalloc'],
     hookspath=['hooks'],
     hooksconfig={},
     runtime_hooks=[],
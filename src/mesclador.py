@@ -0,0 +1,401 @@
+# Mesclagem de documentos no nível do pacote OPC, sem depender do docxcompose.
+#
+# Mesclador(doc).anexar(origem) move o corpo de 'origem' para o fim de 'doc' e leva junto tudo o que o corpo
+# referencia:
+#   - relacionamentos (r:id, r:embed, r:link...): imagens são copiadas para word/media (ou reaproveitadas se o
+#     destino já tiver uma imagem com o mesmo conteúdo), hyperlinks externos são recriados e demais partes
+#     (gráficos, objetos incorporados...) são copiadas com seus próprios relacionamentos;
+#   - estilos: estilos com o mesmo nome usam o do destino; os que faltam são copiados (com a cadeia basedOn);
+#   - numeração: cada lista da origem ganha um w:abstractNum/w:num novo no destino.
+# O documento de origem é consumido (seus elementos são movidos, não copiados) e deve ser descartado depois.
+#
+# Mídia repetida (o mesmo logotipo/assinatura em vários pedidos):
+#   - indexar_midias(doc) troca a coleção de imagens do pacote por uma indexada por hash, usada pelo docxcompose
+#     durante a composição (cada imagem anexada vira uma busca O(1) em vez de recalcular o hash de todas);
+#   - deduplicar_midias(doc), depois da composição, deixa uma única parte por conteúdo em todo o pacote
+#     (corpo, cabeçalhos, rodapés...) apontando os relacionamentos das cópias para ela.
+import hashlib
+import logging
+import re
+from copy import deepcopy
+
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import PartFactory
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+from docx.parts.image import ImagePart
+from docx.parts.numbering import NumberingPart
+from docx.package import ImageParts
+
+logger = logging.getLogger(__name__)
+
+_NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_W_SECTPR = qn("w:sectPr")
+_W_VAL = qn("w:val")
+_W_STYLEID = qn("w:styleId")
+_W_ABSTRACTNUMID = qn("w:abstractNumId")
+_W_NUMID = qn("w:numId")
+_W_NUM = qn("w:num")
+_W_ABSTRACTNUM = qn("w:abstractNum")
+
+# referências a estilos dentro do corpo e dentro das próprias definições de estilo
+_XPATH_REFS_ESTILO = ".//w:pStyle | .//w:rStyle | .//w:tblStyle"
+_XPATH_REFS_ESTILO_DEF = "./w:basedOn | ./w:next | ./w:link | ./w:pPr/w:pStyle | ./w:rPr/w:rStyle"
+_XPATH_NUMIDS = ".//w:numPr/w:numId"
+_XPATH_ATRIBUTOS_R = f'.//@*[namespace-uri()="{_NS_R}"]'
+
+
+def _modelo_partname(partname):
+    """'/word/media/image3.png' -> '/word/media/image%d.png' (modelo usado por _proximo_partname)."""
+    m = re.match(r"^(.*?)(\d*)(\.[^./]+)$", partname)
+    if not m:
+        return partname + "%d"
+    return f"{m.group(1)}%d{m.group(3)}"
+
+
+class Mesclador:
+    """Anexa documentos python-docx a 'doc' preservando mídia, hyperlinks, estilos e listas."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._pacote = doc.part.package
+        self._midias_por_hash = None  # sha256 -> ImagePart do destino (montado sob demanda)
+        self._partnames = None        # partnames em uso no destino, incluindo partes criadas aqui
+        self.estatisticas = {"documentos": 0, "midias_copiadas": 0, "midias_reaproveitadas": 0,
+                             "partes_copiadas": 0, "estilos_copiados": 0, "listas_copiadas": 0}
+
+    # ---------------------------------------------------------------- corpo
+
+    def anexar(self, origem):
+        """Move o corpo de 'origem' (exceto o w:sectPr final) para antes do w:sectPr final de 'doc'."""
+        corpo_origem = origem.element.body
+        elementos = [el for el in corpo_origem if el.tag != _W_SECTPR]
+        if not elementos:
+            return
+
+        mapa_estilos, estilos_novos = self._mesclar_estilos(origem, elementos)
+        # estilos copiados podem trazer listas (w:pPr/w:numPr) da origem
+        mapa_numeracao = self._mesclar_numeracao(origem, elementos + estilos_novos)
+        for estilo in estilos_novos:
+            self._remapear_numeracao(estilo, mapa_numeracao)
+
+        mapa_rels, partes_copiadas = {}, {}
+        for el in elementos:
+            self._remapear_estilos(el, mapa_estilos)
+            self._remapear_numeracao(el, mapa_numeracao)
+            self._remapear_relacionamentos(el, origem.part, self.doc.part, mapa_rels, partes_copiadas)
+
+        corpo = self.doc.element.body
+        sect_pr = corpo.find(_W_SECTPR)
+        for el in elementos:
+            if sect_pr is not None:
+                sect_pr.addprevious(el)
+            else:
+                corpo.append(el)
+        self.estatisticas["documentos"] += 1
+
+    # ---------------------------------------------------------------- relacionamentos
+
+    def _remapear_relacionamentos(self, elemento, parte_origem, parte_destino, mapa_rels, partes_copiadas):
+        for attr in elemento.xpath(_XPATH_ATRIBUTOS_R):
+            rid_antigo = str(attr)
+            chave = (id(parte_origem), rid_antigo)
+            rid_novo = mapa_rels.get(chave)
+            if rid_novo is None:
+                rel = parte_origem.rels.get(rid_antigo)
+                if rel is None:
+                    continue
+                rid_novo = self._copiar_relacionamento(rel, parte_destino, partes_copiadas)
+                mapa_rels[chave] = rid_novo
+            if rid_novo != rid_antigo:
+                attr.getparent().set(attr.attrname, rid_novo)
+
+    def _copiar_relacionamento(self, rel, parte_destino, partes_copiadas):
+        if rel.is_external:
+            return parte_destino.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        if rel.reltype == RT.IMAGE:
+            return parte_destino.relate_to(self._obter_midia(rel.target_part), RT.IMAGE)
+        return parte_destino.relate_to(self._copiar_parte(rel.target_part, rel.reltype, partes_copiadas), rel.reltype)
+
+    def _obter_midia(self, parte):
+        """ImagePart do destino com o mesmo conteúdo de 'parte' (copiada se ainda não existir)."""
+        if self._midias_por_hash is None:
+            self._midias_por_hash = {}
+            for p in self._pacote.iter_parts():
+                if isinstance(p, ImagePart):
+                    self._midias_por_hash.setdefault(hashlib.sha256(p.blob).hexdigest(), p)
+        blob = parte.blob
+        h = hashlib.sha256(blob).hexdigest()
+        existente = self._midias_por_hash.get(h)
+        if existente is not None:
+            self.estatisticas["midias_reaproveitadas"] += 1
+            return existente
+        nova = ImagePart.load(self._proximo_partname(parte.partname), parte.content_type, blob, self._pacote)
+        self._midias_por_hash[h] = nova
+        self.estatisticas["midias_copiadas"] += 1
+        return nova
+
+    def _proximo_partname(self, partname_origem):
+        """
+        Nome livre no destino seguindo o padrão do nome de origem. Não usamos OpcPackage.next_partname porque
+        ele só enxerga partes já ligadas ao pacote, e as partes copiadas recursivamente ainda não estão.
+        """
+        if self._partnames is None:
+            self._partnames = {str(p.partname) for p in self._pacote.iter_parts()}
+        modelo = _modelo_partname(partname_origem)
+        n = 1
+        while modelo % n in self._partnames:
+            n += 1
+        partname = modelo % n
+        self._partnames.add(partname)
+        return PackURI(partname)
+
+    def _copiar_parte(self, parte, reltype, partes_copiadas):
+        """
+        Copia uma parte (e, recursivamente, as partes que ela referencia) para o pacote de destino. A cópia é
+        criada pela PartFactory, como na leitura do pacote: cabeçalhos/rodapés viram HeaderPart/FooterPart
+        (com .element) e as demais partes XML conhecidas ganham a classe do python-docx.
+        """
+        nova = partes_copiadas.get(id(parte))
+        if nova is not None:
+            return nova
+        nova = PartFactory(self._proximo_partname(parte.partname), parte.content_type, reltype, parte.blob, self._pacote)
+        partes_copiadas[id(parte)] = nova
+        for rel in parte.rels.values():
+            if rel.is_external:
+                nova.rels.add_relationship(rel.reltype, rel.target_ref, rel.rId, is_external=True)
+            elif rel.reltype == RT.IMAGE:
+                nova.rels.add_relationship(rel.reltype, self._obter_midia(rel.target_part), rel.rId)
+            else:
+                nova.rels.add_relationship(rel.reltype, self._copiar_parte(rel.target_part, rel.reltype, partes_copiadas), rel.rId)
+        self.estatisticas["partes_copiadas"] += 1
+        return nova
+
+    # ---------------------------------------------------------------- estilos
+
+    def _mesclar_estilos(self, origem, elementos):
+        """
+        Garante no destino os estilos usados pelos elementos. Retorna ({styleId da origem: styleId no destino},
+        lista das definições copiadas).
+        """
+        usados = set()
+        for el in elementos:
+            for ref in el.xpath(_XPATH_REFS_ESTILO):
+                val = ref.get(_W_VAL)
+                if val:
+                    usados.add(val)
+        if not usados:
+            return {}, []
+
+        estilos_origem = {s.styleId: s for s in origem.styles.element.style_lst}
+        estilos_destino = self.doc.styles.element
+        ids_destino = {s.styleId for s in estilos_destino.style_lst}
+        nomes_destino = {s.name_val: s.styleId for s in estilos_destino.style_lst if s.name_val}
+
+        mapa, novos = {}, []
+        pendentes = list(usados)
+        while pendentes:
+            sid = pendentes.pop()
+            if sid in mapa:
+                continue
+            estilo = estilos_origem.get(sid)
+            if estilo is None:
+                mapa[sid] = sid  # referência órfã na origem: mantém como está
+                continue
+            nome = estilo.name_val
+            if nome and nome in nomes_destino:
+                mapa[sid] = nomes_destino[nome]
+                continue
+            novo_id = sid
+            n = 1
+            while novo_id in ids_destino:
+                novo_id = f"{sid}{n}"
+                n += 1
+            mapa[sid] = novo_id
+            ids_destino.add(novo_id)
+            if nome:
+                nomes_destino[nome] = novo_id
+            copia = deepcopy(estilo)
+            copia.set(_W_STYLEID, novo_id)
+            novos.append(copia)
+            # estilos referenciados pela definição copiada também precisam existir no destino
+            for ref in copia.xpath(_XPATH_REFS_ESTILO_DEF):
+                val = ref.get(_W_VAL)
+                if val and val not in mapa:
+                    pendentes.append(val)
+
+        for copia in novos:
+            self._remapear_estilos(copia, mapa, _XPATH_REFS_ESTILO_DEF)
+            estilos_destino.append(copia)
+        self.estatisticas["estilos_copiados"] += len(novos)
+        return mapa, novos
+
+    @staticmethod
+    def _remapear_estilos(elemento, mapa, xpath=_XPATH_REFS_ESTILO):
+        if not mapa:
+            return
+        for ref in elemento.xpath(xpath):
+            val = ref.get(_W_VAL)
+            novo = mapa.get(val)
+            if novo is not None and novo != val:
+                ref.set(_W_VAL, novo)
+
+    # ---------------------------------------------------------------- numeração
+
+    def _mesclar_numeracao(self, origem, elementos):
+        """Copia as listas usadas pelos elementos; retorna {numId da origem: numId novo no destino}."""
+        usados = set()
+        for el in elementos:
+            for num_id in el.xpath(_XPATH_NUMIDS):
+                val = num_id.get(_W_VAL)
+                if val and val != "0":
+                    usados.add(val)
+        if not usados:
+            return {}
+        parte_numeracao = None
+        for rel in origem.part.rels.values():
+            if rel.reltype == RT.NUMBERING and not rel.is_external:
+                parte_numeracao = rel.target_part
+                break
+        if parte_numeracao is None:
+            return {}
+        numeracao_origem = parte_numeracao.element
+        abstratos_origem = {a.get(_W_ABSTRACTNUMID): a for a in numeracao_origem.findall(_W_ABSTRACTNUM)}
+
+        numeracao = self._parte_numeracao_destino().element
+        prox_abstrato = 1 + max((int(a.get(_W_ABSTRACTNUMID)) for a in numeracao.findall(_W_ABSTRACTNUM)), default=-1)
+        prox_num = 1 + max((int(n.get(_W_NUMID)) for n in numeracao.findall(_W_NUM)), default=0)
+        primeiro_num = numeracao.find(_W_NUM)
+
+        mapa, mapa_abstratos = {}, {}
+        for num_id in sorted(usados, key=int):
+            try:
+                num = numeracao_origem.num_having_numId(int(num_id))
+            except (KeyError, ValueError):
+                continue
+            abstrato_id = num.abstractNumId.val
+            novo_abstrato = mapa_abstratos.get(abstrato_id)
+            if novo_abstrato is None:
+                abstrato = abstratos_origem.get(str(abstrato_id))
+                if abstrato is None:
+                    continue
+                novo_abstrato = prox_abstrato
+                prox_abstrato += 1
+                copia = deepcopy(abstrato)
+                copia.set(_W_ABSTRACTNUMID, str(novo_abstrato))
+                # w:abstractNum precisa vir antes de todos os w:num
+                if primeiro_num is not None:
+                    primeiro_num.addprevious(copia)
+                else:
+                    numeracao.append(copia)
+                mapa_abstratos[abstrato_id] = novo_abstrato
+            copia_num = deepcopy(num)
+            copia_num.set(_W_NUMID, str(prox_num))
+            copia_num.abstractNumId.val = novo_abstrato
+            numeracao.append(copia_num)
+            mapa[num_id] = str(prox_num)
+            prox_num += 1
+        self.estatisticas["listas_copiadas"] += len(mapa)
+        return mapa
+
+    def _parte_numeracao_destino(self):
+        parte = self.doc.part
+        for rel in parte.rels.values():
+            if rel.reltype == RT.NUMBERING and not rel.is_external:
+                return rel.target_part
+        # NumberingPart.new() não é implementado no python-docx: criamos a parte vazia aqui
+        elemento = parse_xml(f"<w:numbering {nsdecls('w')}/>")
+        nova = NumberingPart(self._proximo_partname("/word/numbering.xml"), CT.WML_NUMBERING, elemento, self._pacote)
+        parte.relate_to(nova, RT.NUMBERING)
+        return nova
+
+    @staticmethod
+    def _remapear_numeracao(elemento, mapa):
+        if not mapa:
+            return
+        for num_id in elemento.xpath(_XPATH_NUMIDS):
+            novo = mapa.get(num_id.get(_W_VAL))
+            if novo is not None:
+                num_id.set(_W_VAL, novo)
+
+
+class _IndiceMidias(ImageParts):
+    """
+    ImageParts indexada por SHA-1. O python-docx recalcula o SHA-1 de todas as imagens do pacote a cada
+    _get_by_sha1, e o docxcompose chama _get_by_sha1 para cada imagem anexada.
+    """
+
+    def __init__(self, partes=()):
+        super().__init__()
+        self._por_sha1 = {}
+        self.reaproveitadas = 0
+        self.copiadas = 0
+        for parte in partes:
+            self.append(parte)
+
+    def append(self, item):
+        super().append(item)
+        self._por_sha1.setdefault(item.sha1, item)
+
+    def _get_by_sha1(self, sha1):
+        parte = self._por_sha1.get(sha1)
+        if parte is not None:
+            self.reaproveitadas += 1
+        return parte
+
+    def _add_image_part(self, image):
+        self.copiadas += 1
+        return super()._add_image_part(image)
+
+
+def indexar_midias(doc):
+    """Instala a coleção indexada de imagens no pacote de 'doc' e a devolve (contadores de reaproveitamento)."""
+    pacote = doc.part.package
+    atual = pacote.image_parts
+    if isinstance(atual, _IndiceMidias):
+        return atual
+    indice = _IndiceMidias(atual)
+    pacote.__dict__["image_parts"] = indice  # lazyproperty somente leitura: o valor fica no __dict__ da instância
+    return indice
+
+
+def deduplicar_midias(doc):
+    """
+    Mantém uma única ImagePart por conteúdo (sha256) em todo o pacote: os relacionamentos que apontam para
+    cópias passam a apontar para a primeira ocorrência (o rId não muda, então o XML fica intacto) e as cópias
+    deixam de ser gravadas. Retorna as estatísticas da passada.
+    """
+    pacote = doc.part.package
+    partes = list(pacote.iter_parts())
+    canonicas = {}
+    substitutas = {}
+    for parte in partes:
+        if isinstance(parte, ImagePart):
+            h = hashlib.sha256(parte.blob).hexdigest()
+            canonica = canonicas.setdefault(h, parte)
+            if canonica is not parte:
+                substitutas[parte] = canonica
+
+    reescritos = 0
+    if substitutas:
+        for rels in [pacote.rels] + [p.rels for p in partes]:
+            for rel in list(rels.values()):
+                if not rel.is_external and rel.target_part in substitutas:
+                    # recria o relacionamento com o mesmo rId: atualiza também related_parts[rId]
+                    rels.add_relationship(rel.reltype, substitutas[rel.target_part], rel.rId)
+                    reescritos += 1
+        restantes = [p for p in pacote.image_parts if p not in substitutas]
+        if isinstance(pacote.image_parts, _IndiceMidias):
+            indice = _IndiceMidias(restantes)
+            indice.reaproveitadas, indice.copiadas = pacote.image_parts.reaproveitadas, pacote.image_parts.copiadas
+            pacote.__dict__["image_parts"] = indice
+        else:
+            pacote.image_parts._image_parts = restantes
+
+    return {
+        "midias_unicas": len(canonicas),
+        "midias_removidas": len(substitutas),
+        "bytes_economizados": sum(len(p.blob) for p in substitutas),
+        "relacionamentos_reescritos": reescritos,
+    }
@@ -0,0 +1,206 @@
+# Métricas estruturadas da geração: spans com duração por fase (abrir, preencher, anexar cada pedido,
+# títulos, salvar...), agrupados por um ID de geração e gravados em JSON Lines em logs/metricas.jsonl.
+#
+# Desligado por padrão: span()/geracao() devolvem um context manager nulo e não medem nada.
+# Ative com a variável de ambiente GERADOR_METRICAS=1 (ou configurar(..., habilitado=True)).
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+METRICAS_FILENAME = "metricas.jsonl"
+
+_habilitado = os.environ.get("GERADOR_METRICAS", "").strip().lower() in ("1", "true", "sim", "yes", "on")
+_arquivo = None
+_lock = threading.Lock()
+
+# geração corrente (por thread/contexto): {"id", "fases": {fase: total_ms}}
+_geracao_atual = contextvars.ContextVar("geracao_atual", default=None)
+# atributo gravado no documento gerado com o id da geração (para associar o salvar_documento posterior);
+# Document não é hashable (compara por elemento), então não dá para usar um WeakKeyDictionary
+_ATRIBUTO_ID = "_metricas_id_geracao"
+
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **extra):
+        pass
+
+
+_NULO = _Nulo()
+
+
+def configurar(diretorio_logs=None, habilitado=None):
+    """Define onde gravar metricas.jsonl e (opcionalmente) liga/desliga a coleta."""
+    global _arquivo, _habilitado
+    if diretorio_logs:
+        _arquivo = os.path.join(diretorio_logs, METRICAS_FILENAME)
+    if habilitado is not None:
+        _habilitado = bool(habilitado)
+
+
+def habilitado():
+    return _habilitado
+
+
+def rss_atual_mb():
+    """Memória residente atual do processo em MB (Linux e Windows); None se não for possível medir."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", "r") as f:
+                paginas = int(f.read().split()[1])
+            return round(paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class _Contadores(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            contadores = _Contadores()
+            contadores.cb = ctypes.sizeof(contadores)
+            processo = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb):
+                return round(contadores.WorkingSetSize / (1024 * 1024), 1)
+    except Exception:
+        pass
+    return None
+
+
+def _emitir(registro):
+    caminho = _arquivo
+    if caminho is None:
+        return
+    linha = json.dumps(registro, ensure_ascii=False) + "\n"
+    try:
+        with _lock:
+            with open(caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+    except Exception as e:
+        logger.warning("[metricas] não foi possível gravar %s: %s", caminho, e)
+
+
+class _Span:
+    __slots__ = ("fase", "extra", "_t0", "_inicio")
+
+    def __init__(self, fase, extra):
+        self.fase = fase
+        self.extra = extra
+
+    def set(self, **extra):
+        """Acrescenta atributos ao span (ex.: contagens só conhecidas ao final)."""
+        self.extra.update(extra)
+
+    def __enter__(self):
+        self._inicio = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duracao_ms = (time.perf_counter() - self._t0) * 1000.0
+        atual = _geracao_atual.get()
+        registro = {
+            "tipo": "span",
+            "geracao": atual["id"] if atual else None,
+            "fase": self.fase,
+            "inicio": round(self._inicio, 6),
+            "duracao_ms": round(duracao_ms, 3),
+            "thread": threading.current_thread().name,
+        }
+        if exc_type is not None:
+            registro["erro"] = exc_type.__name__
+        if self.extra:
+            registro.update(self.extra)
+        if atual is not None:
+            atual["fases"][self.fase] = atual["fases"].get(self.fase, 0.0) + duracao_ms
+        _emitir(registro)
+        return False
+
+
+def span(fase, **extra):
+    """Mede um trecho da geração: `with span("preencher"): ...`."""
+    if not _habilitado:
+        return _NULO
+    return _Span(fase, extra)
+
+
+class _Geracao:
+    __slots__ = ("nome", "extra", "id", "_token", "_t0", "_inicio", "_estado")
+
+    def __init__(self, nome, id_geracao, extra):
+        self.nome = nome
+        self.extra = extra
+        self.id = id_geracao or uuid.uuid4().hex[:12]
+
+    def set(self, **extra):
+        self.extra.update(extra)
+
+    def __enter__(self):
+        self._estado = {"id": self.id, "fases": {}}
+        self._token = _geracao_atual.set(self._estado)
+        self._inicio = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duracao_ms = (time.perf_counter() - self._t0) * 1000.0
+        _geracao_atual.reset(self._token)
+        registro = {
+            "tipo": "geracao",
+            "geracao": self.id,
+            "fase": self.nome,
+            "inicio": round(self._inicio, 6),
+            "duracao_ms": round(duracao_ms, 3),
+            "fases_ms": {k: round(v, 3) for k, v in self._estado["fases"].items()},
+            "ok": exc_type is None,
+        }
+        if exc_type is not None:
+            registro["erro"] = exc_type.__name__
+        if self.extra:
+            registro.update(self.extra)
+        _emitir(registro)
+        return False
+
+
+def geracao(nome, id_geracao=None, **extra):
+    """
+    Abre uma geração (todos os spans internos recebem o mesmo ID). Se já houver uma geração
+    corrente neste contexto, o bloco vira apenas um span dela.
+    """
+    if not _habilitado:
+        return _NULO
+    if _geracao_atual.get() is not None:
+        return _Span(nome, extra)
+    return _Geracao(nome, id_geracao, extra)
+
+
+def associar_documento(doc, ctx):
+    """Guarda o ID da geração que produziu 'doc' (usado por salvar_documento)."""
+    if _habilitado and isinstance(ctx, _Geracao) and doc is not None:
+        try:
+            setattr(doc, _ATRIBUTO_ID, ctx.id)
+        except AttributeError:
+            pass
+
+
+def id_do_documento(doc):
+    if not _habilitado:
+        return None
+    return getattr(doc, _ATRIBUTO_ID, None)
@@ -0,0 +1,174 @@
+# normalizacao.py — normalização dos runs dos templates ao carregá-los.
+#
+# Templates editados no Word ficam cheios de runs fragmentados (revisões com rsid diferentes, marcas de
+# verificação ortográfica, autocorreção): um placeholder como {{NOME_RECLAMANTE}} chega a ocupar vários w:r.
+# normalizar_documento(doc) remove esse ruído e junta runs vizinhos com a mesma formatação:
+#   - atributos w:rsid* e elementos w:proofErr são removidos do corpo, cabeçalhos e rodapés;
+#   - runs adjacentes (mesmo pai) com w:rPr idêntico e só texto (w:t) viram um único run.
+# Runs com tabulação, quebra, campo, desenho etc. não são mesclados. O texto e a formatação visíveis não mudam.
+#
+# Aplicada pelo cache de templates (src/template_cache.py) e no modo de baixa memória; GERADOR_NORMALIZAR=0
+# desliga. Relatório por template:
+#   python -m src.normalizacao templates/
+import argparse
+import logging
+import os
+import sys
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+HABILITADA = os.environ.get("GERADOR_NORMALIZAR", "1").strip().lower() not in ("0", "false", "nao", "não", "no", "off")
+
+_NS_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W_R = qn("w:r")
+_W_T = qn("w:t")
+_W_RPR = qn("w:rPr")
+_W_PROOFERR = qn("w:proofErr")
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+_XPATH_RSID = f'.//@*[namespace-uri()="{_NS_W}" and starts-with(local-name(), "rsid")]'
+_ATRIBUTO_ESTATISTICAS = "_gerador_normalizacao"
+
+
+def _raizes(doc):
+    """Elementos raiz do corpo e de todos os cabeçalhos/rodapés (inclusive primeira página e pares)."""
+    raizes = [doc.element.body]
+    vistos = set()
+    for rel in doc.part.rels.values():
+        if rel.is_external or rel.reltype not in (RT.HEADER, RT.FOOTER):
+            continue
+        parte = rel.target_part
+        if id(parte) not in vistos:
+            vistos.add(id(parte))
+            raizes.append(parte.element)
+    return raizes
+
+
+def _so_texto(r):
+    """True se o run tem apenas w:rPr (opcional) e w:t."""
+    for filho in r:
+        if filho.tag != _W_T and filho.tag != _W_RPR:
+            return False
+    return True
+
+
+def _chave_formatacao(r):
+    rpr = r.find(_W_RPR)
+    return b"" if rpr is None else etree.tostring(rpr)
+
+
+def _remover_rsid(raiz):
+    removidos = 0
+    for atributo in raiz.xpath(_XPATH_RSID):
+        atributo.getparent().attrib.pop(atributo.attrname)
+        removidos += 1
+    return removidos
+
+
+def _mesclar_runs(raiz):
+    """Junta sequências de runs irmãos só com texto e mesma formatação. Retorna quantos runs foram removidos."""
+    removidos = 0
+    pais = {r.getparent() for r in raiz.iter(_W_R)}
+    for pai in pais:
+        anterior = None
+        chave_anterior = None
+        for filho in list(pai):
+            if filho.tag != _W_R or not _so_texto(filho):
+                anterior = None
+                continue
+            chave = _chave_formatacao(filho)
+            if anterior is not None and chave == chave_anterior:
+                textos = filho.findall(_W_T)
+                if textos:
+                    t_anterior = anterior.findall(_W_T)
+                    if t_anterior:
+                        t = t_anterior[-1]
+                        t.text = (t.text or "") + "".join(x.text or "" for x in textos)
+                    else:
+                        t = etree.SubElement(anterior, _W_T)
+                        t.text = "".join(x.text or "" for x in textos)
+                    if t.text != t.text.strip():
+                        t.set(_XML_SPACE, "preserve")
+                pai.remove(filho)
+                removidos += 1
+                continue
+            anterior = filho
+            chave_anterior = chave
+    return removidos
+
+
+def contar_runs(doc):
+    return sum(1 for raiz in _raizes(doc) for _ in raiz.iter(_W_R))
+
+
+def normalizar_documento(doc):
+    """
+    Normaliza o documento em memória e devolve as estatísticas
+    {"runs_antes", "runs_depois", "rsid_removidos", "proof_err_removidos"} (também guardadas no próprio doc).
+    """
+    estatisticas = {"runs_antes": 0, "runs_depois": 0, "rsid_removidos": 0, "proof_err_removidos": 0}
+    for raiz in _raizes(doc):
+        estatisticas["runs_antes"] += sum(1 for _ in raiz.iter(_W_R))
+        estatisticas["rsid_removidos"] += _remover_rsid(raiz)
+        marcas = list(raiz.iter(_W_PROOFERR))
+        for marca in marcas:
+            marca.getparent().remove(marca)
+        estatisticas["proof_err_removidos"] += len(marcas)
+        _mesclar_runs(raiz)
+        estatisticas["runs_depois"] += sum(1 for _ in raiz.iter(_W_R))
+    try:
+        setattr(doc, _ATRIBUTO_ESTATISTICAS, estatisticas)
+    except AttributeError:
+        pass
+    return estatisticas
+
+
+def estatisticas_do_documento(doc):
+    """Estatísticas da normalização aplicada a 'doc' (ou ao template de que ele é clone), ou None."""
+    return getattr(doc, _ATRIBUTO_ESTATISTICAS, None)
+
+
+def normalizar_template(doc, caminho):
+    """Normaliza um template recém-aberto (se habilitado) e registra a redução no log."""
+    if not HABILITADA:
+        return None
+    estatisticas = normalizar_documento(doc)
+    logger.info("[normalizacao] %s: %d -> %d runs (%d rsid, %d proofErr removidos)", os.path.basename(caminho),
+                estatisticas["runs_antes"], estatisticas["runs_depois"], estatisticas["rsid_removidos"],
+                estatisticas["proof_err_removidos"])
+    return estatisticas
+
+
+def main(argv=None):
+    from docx import Document
+
+    parser = argparse.ArgumentParser(prog="python -m src.normalizacao", description="Relatório da normalização de runs dos templates.")
+    parser.add_argument("templates", nargs="?", default="templates", help="pasta de templates (inclui modelos/)")
+    args = parser.parse_args(argv)
+
+    caminhos = []
+    for pasta in (args.templates, os.path.join(args.templates, "modelos")):
+        if os.path.isdir(pasta):
+            caminhos += sorted(os.path.join(pasta, n) for n in os.listdir(pasta) if n.lower().endswith(".docx") and not n.startswith("~$"))
+    if not caminhos:
+        print(f"nenhum .docx em {args.templates}", file=sys.stderr)
+        return 2
+
+    total_antes = total_depois = 0
+    for caminho in caminhos:
+        estatisticas = normalizar_documento(Document(caminho))
+        antes, depois = estatisticas["runs_antes"], estatisticas["runs_depois"]
+        total_antes += antes
+        total_depois += depois
+        reducao = 100.0 * (antes - depois) / antes if antes else 0.0
+        print(f"{os.path.relpath(caminho, args.templates):50s} {antes:7d} -> {depois:7d} runs ({reducao:5.1f}% menos)")
+    reducao = 100.0 * (total_antes - total_depois) / total_antes if total_antes else 0.0
+    print(f"{'total':50s} {total_antes:7d} -> {total_depois:7d} runs ({reducao:5.1f}% menos)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
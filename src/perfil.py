@@ -0,0 +1,168 @@
+# Modo de profiling opcional: grava, para cada gerar_documento/salvar_documento, as estatísticas do
+# cProfile (.prof, abrir com `python -m pstats` ou snakeviz) e um resumo em texto com as funções mais
+# caras e os principais pontos de alocação (tracemalloc) em logs/.
+#
+# Ative com a variável de ambiente GERADOR_PERFIL=1. Funciona também no executável do PyInstaller
+# (cProfile, pstats e tracemalloc são da biblioteca padrão e importados aqui de forma estática).
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+TOP_FUNCOES = 40
+TOP_ALOCACOES = 25
+
+_ativo = os.environ.get("GERADOR_PERFIL", "").strip().lower() in ("1", "true", "sim", "yes", "on")
+_diretorio = None
+_lock = threading.Lock()
+_ativos = set()   # perfis em andamento (o tracemalloc é do processo inteiro e fica ligado enquanto houver algum)
+_sequencia = itertools.count(1)
+
+# atributo gravado no documento para que o salvar_documento use o mesmo prefixo de arquivo da geração
+_ATRIBUTO_PREFIXO = "_perfil_prefixo"
+
+
+class _Nulo:
+    __slots__ = ()
+    prefixo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+def configurar(diretorio_logs=None, ativo=None):
+    """Define a pasta onde os perfis são gravados e (opcionalmente) liga/desliga o modo."""
+    global _diretorio, _ativo
+    if diretorio_logs:
+        _diretorio = diretorio_logs
+    if ativo is not None:
+        _ativo = bool(ativo)
+
+
+def habilitado():
+    return _ativo
+
+
+def _novo_prefixo(pedidos):
+    """Prefixo único: data-hora com microssegundos, PID e um contador (várias gerações no mesmo segundo)."""
+    carimbo = datetime.now().strftime("%Y%m%d-%H%M%S.%f")
+    with _lock:
+        seq = next(_sequencia)
+    return f"perfil_{carimbo}_{os.getpid()}-{seq}_{pedidos}pedidos"
+
+
+def _iniciar_tracemalloc(perfil):
+    """
+    O pico do tracemalloc é do processo inteiro: só é zerado quando nenhum outro perfil está em andamento.
+    Perfis simultâneos (lote, serviço) ficam marcados como não exclusivos e o resumo avisa que o pico é conjunto.
+    """
+    with _lock:
+        if _ativos:
+            for outro in _ativos:
+                outro.exclusivo = False
+            perfil.exclusivo = False
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+            perfil.exclusivo = True
+        _ativos.add(perfil)
+
+
+def _parar_tracemalloc(perfil):
+    with _lock:
+        _ativos.discard(perfil)
+        if not _ativos and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class _Perfil:
+    def __init__(self, etapa, pedidos, prefixo):
+        self.etapa = etapa
+        self.prefixo = prefixo or _novo_prefixo(pedidos)
+        self.exclusivo = True
+        self._profiler = None
+
+    def __enter__(self):
+        _iniciar_tracemalloc(self)
+        self._t0 = time.perf_counter()
+        self._profiler = cProfile.Profile()
+        try:
+            self._profiler.enable()
+        except ValueError as e:
+            # outro profiler já ativo nesta thread/interpretador: seguimos só com tracemalloc
+            logger.warning("[perfil] cProfile indisponível para %s: %s", self.etapa, e)
+            self._profiler = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._profiler is not None:
+            self._profiler.disable()
+        duracao = time.perf_counter() - self._t0
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            _parar_tracemalloc(self)
+        try:
+            self._gravar(snapshot, pico, duracao, exc_type)
+        except Exception:
+            logger.exception("[perfil] falha ao gravar perfil %s", self.prefixo)
+        return False
+
+    def _gravar(self, snapshot, pico, duracao, exc_type):
+        base = os.path.join(_diretorio, f"{self.prefixo}_{self.etapa}")
+        resumo = io.StringIO()
+        resumo.write(f"etapa: {self.etapa}\nduracao: {duracao:.3f}s\n")
+        resumo.write(f"pico de memória (tracemalloc, só objetos Python): {pico / (1024 * 1024):.1f} MB\n")
+        if not self.exclusivo:
+            resumo.write("  (outra etapa foi perfilada ao mesmo tempo: o pico e as alocações são do processo todo)\n")
+        if exc_type is not None:
+            resumo.write(f"terminou com erro: {exc_type.__name__}\n")
+
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + ".prof")
+            resumo.write(f"\n=== cProfile: {TOP_FUNCOES} funções por tempo cumulativo ({base}.prof) ===\n")
+            pstats.Stats(self._profiler, stream=resumo).strip_dirs().sort_stats("cumulative").print_stats(TOP_FUNCOES)
+
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        resumo.write(f"\n=== tracemalloc: {TOP_ALOCACOES} maiores pontos de alocação ===\n")
+        for stat in snapshot.filter_traces(filtros).statistics("lineno")[:TOP_ALOCACOES]:
+            resumo.write(f"{stat.size / 1024:10.1f} KB  {stat.count:8d} blocos  {stat.traceback}\n")
+
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(resumo.getvalue())
+        logger.info("[perfil] perfil de %s gravado em %s.txt", self.etapa, base)
+
+
+def perfilar(etapa, pedidos=0, prefixo=None):
+    """Context manager que perfila o bloco quando o modo está ativo (senão não faz nada)."""
+    if not _ativo or _diretorio is None:
+        return _NULO
+    return _Perfil(etapa, pedidos, prefixo)
+
+
+def associar_documento(doc, ctx):
+    if isinstance(ctx, _Perfil) and doc is not None:
+        try:
+            setattr(doc, _ATRIBUTO_PREFIXO, ctx.prefixo)
+        except AttributeError:
+            pass
+
+
+def prefixo_do_documento(doc):
+    return getattr(doc, _ATRIBUTO_PREFIXO, None)
@@ -0,0 +1,139 @@
+# registro_log.py — logging assíncrono: quem loga só enfileira o registro; arquivo e console são escritos
+# por uma thread própria, em lotes.
+#
+# Níveis por módulo sem mexer no código, com GERADOR_LOG_NIVEIS (nomes de logger separados por vírgula):
+#   GERADOR_LOG_NIVEIS="src.main.listas=WARNING,src.generate_word.listas=WARNING"   # desliga os dumps de listas
+#   GERADOR_LOG_NIVEIS="root=WARNING,src.servico=INFO"
+# "root" (ou "*") ajusta o nível geral. Entradas inválidas são ignoradas com um aviso no próprio log.
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+logger = logging.getLogger(__name__)
+
+FORMATO = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+# registros gravados por vez antes do flush do arquivo/console
+LOTE_MAXIMO = 500
+
+_listener = None
+
+
+class _AdiaFlush:
+    """Mixin: StreamHandler.emit faz flush a cada registro; dentro de um lote o flush fica para o fim."""
+    adiar = False
+
+    def flush(self):
+        if not self.adiar:
+            super().flush()
+
+
+class _ArquivoRotativo(_AdiaFlush, RotatingFileHandler):
+    pass
+
+
+class _Console(_AdiaFlush, logging.StreamHandler):
+    pass
+
+
+class _ListenerEmLotes(QueueListener):
+    """QueueListener que esvazia a fila de uma vez (até LOTE_MAXIMO) e faz um único flush por lote."""
+
+    def _monitor(self):
+        fila = self.queue
+        parar = False
+        while not parar:
+            lote = [fila.get()]
+            while len(lote) < LOTE_MAXIMO:
+                try:
+                    lote.append(fila.get_nowait())
+                except queue.Empty:
+                    break
+            for handler in self.handlers:
+                handler.adiar = True
+            try:
+                for registro in lote:
+                    if registro is self._sentinel:
+                        parar = True
+                        continue
+                    self.handle(registro)
+            finally:
+                for handler in self.handlers:
+                    handler.adiar = False
+                    handler.flush()
+
+
+def _interpretar_nivel(texto):
+    texto = texto.strip().upper()
+    if texto.isdigit():
+        return int(texto)
+    nivel = logging.getLevelName(texto)
+    return nivel if isinstance(nivel, int) else None
+
+
+def aplicar_niveis(especificacao=None):
+    """
+    Aplica "logger=NIVEL,logger=NIVEL" (padrão: GERADOR_LOG_NIVEIS). Retorna {logger: nível} efetivamente aplicado.
+    """
+    if especificacao is None:
+        especificacao = os.environ.get("GERADOR_LOG_NIVEIS", "")
+    aplicados = {}
+    for item in especificacao.replace(";", ",").split(","):
+        if not item.strip():
+            continue
+        nome, sep, texto_nivel = item.partition("=")
+        nome = nome.strip()
+        nivel = _interpretar_nivel(texto_nivel) if sep else None
+        if not nome or nivel is None:
+            logger.warning("[registro_log] GERADOR_LOG_NIVEIS: entrada ignorada %r (use logger=NIVEL)", item.strip())
+            continue
+        alvo = logging.getLogger() if nome in ("root", "*") else logging.getLogger(nome)
+        alvo.setLevel(nivel)
+        aplicados[nome] = logging.getLevelName(nivel)
+    return aplicados
+
+
+def configurar(arquivo=None, console=True, nivel=logging.INFO):
+    """
+    Troca os handlers do logger raiz por um QueueHandler e inicia a thread que grava em `arquivo`
+    (rotativo, 5 MB x 3) e/ou no console. Chamadas seguintes não fazem nada. Encerrado no atexit.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    formatter = logging.Formatter(FORMATO, FORMATO_DATA)
+    handlers = []
+    if arquivo:
+        handlers.append(_ArquivoRotativo(arquivo, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"))
+    if console:
+        handlers.append(_Console())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    fila = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    for antigo in list(root_logger.handlers):
+        root_logger.removeHandler(antigo)
+    root_logger.addHandler(QueueHandler(fila))
+    root_logger.setLevel(nivel)
+
+    _listener = _ListenerEmLotes(fila, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(encerrar)
+
+    aplicados = aplicar_niveis()
+    if aplicados:
+        logger.info("[registro_log] níveis por logger: %s", aplicados)
+
+
+def encerrar():
+    """Grava o que ainda está na fila e para a thread de escrita."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,212 @@
+# salvamento.py — grava o pacote .docx sem recomprimir o que veio intacto dos templates.
+#
+# doc.save() (python-docx) recomprime com deflate todas as partes, inclusive imagens e fontes que já vêm
+# comprimidas e foram copiadas sem alteração dos modelos. Aqui cada template aberto é registrado
+# (registrar_origem lê só o diretório central do zip) e, ao salvar, a parte cujo conteúdo bate com uma
+# entrada registrada tem os bytes já comprimidos copiados direto do zip de origem. CRC-32 + tamanho só
+# selecionam os candidatos; a cópia exige o mesmo SHA-256 (o da entrada de origem é calculado uma vez).
+#
+# Configuração (variáveis de ambiente):
+#   GERADOR_COMPRESSAO=0..9         nível do deflate das partes recomprimidas (padrão 6; 0 = sem compressão)
+#   GERADOR_COMPRESSAO_MIDIA=copiar     (padrão) copia os bytes comprimidos quando a origem é conhecida
+#                            armazenar  grava imagens/fontes/binários sem compressão (mais rápido, arquivo maior)
+#                            comprimir  recomprime tudo, como o doc.save() do python-docx
+import hashlib
+import logging
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+logger = logging.getLogger(__name__)
+
+MODOS_MIDIA = ("copiar", "armazenar", "comprimir")
+
+_ASSINATURA_CABECALHO_LOCAL = b"PK\x03\x04"
+_TAMANHO_CABECALHO_LOCAL = 30
+
+# (crc32, tamanho descompactado) -> [(caminho do zip, mtime_ns, tamanho do zip, ZipInfo), ...]
+_origens = {}
+# (caminho do zip, mtime_ns, nome da entrada) -> SHA-256 do conteúdo descompactado
+_digests = {}
+# caminho absoluto -> (mtime_ns, tamanho) da última vez que o zip foi registrado
+_registrados = {}
+_lock = threading.Lock()
+
+
+def _nivel_do_ambiente():
+    try:
+        return min(9, max(0, int(os.environ.get("GERADOR_COMPRESSAO", "6"))))
+    except ValueError:
+        return 6
+
+
+def _modo_midia_do_ambiente():
+    modo = os.environ.get("GERADOR_COMPRESSAO_MIDIA", "copiar").strip().lower()
+    return modo if modo in MODOS_MIDIA else "copiar"
+
+
+NIVEL = _nivel_do_ambiente()
+MODO_MIDIA = _modo_midia_do_ambiente()
+
+
+def registrar_origem(caminho):
+    """Registra as entradas do .docx como possíveis origens de cópia sem recompressão (idempotente por mtime)."""
+    caminho_abs = os.path.abspath(caminho)
+    try:
+        st = os.stat(caminho_abs)
+        marca = (st.st_mtime_ns, st.st_size)
+        with _lock:
+            if _registrados.get(caminho_abs) == marca:
+                return
+        with zipfile.ZipFile(caminho_abs) as z:
+            infos = [i for i in z.infolist()
+                     if not i.is_dir() and not i.flag_bits & 0x1
+                     and i.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)]
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.debug("[salvamento] origem não registrada %s: %s", caminho_abs, e)
+        return
+    with _lock:
+        if caminho_abs in _registrados:
+            # versão anterior do mesmo arquivo: entradas e digests antigos deixam de valer
+            for chave, candidatos in list(_origens.items()):
+                candidatos = [c for c in candidatos if c[0] != caminho_abs]
+                if candidatos:
+                    _origens[chave] = candidatos
+                else:
+                    del _origens[chave]
+            for chave in [c for c in _digests if c[0] == caminho_abs]:
+                del _digests[chave]
+        for info in infos:
+            _origens.setdefault((info.CRC, info.file_size), []).append((caminho_abs, marca[0], marca[1], info))
+        _registrados[caminho_abs] = marca
+
+
+def _digest_da_entrada(caminho, mtime_ns, info):
+    chave = (caminho, mtime_ns, info.filename)
+    with _lock:
+        digest = _digests.get(chave)
+    if digest is None:
+        with zipfile.ZipFile(caminho) as z:
+            digest = hashlib.sha256(z.read(info)).digest()
+        with _lock:
+            _digests[chave] = digest
+    return digest
+
+
+def _origem_de(blob):
+    """(caminho, ZipInfo) de uma entrada registrada com exatamente o conteúdo de 'blob', ou None."""
+    with _lock:
+        candidatos = list(_origens.get((zlib.crc32(blob), len(blob)), ()))
+    if not candidatos:
+        return None
+    digest = None
+    for caminho, mtime_ns, tamanho, info in candidatos:
+        try:
+            st = os.stat(caminho)
+            if (st.st_mtime_ns, st.st_size) != (mtime_ns, tamanho):
+                continue
+            if digest is None:
+                digest = hashlib.sha256(blob).digest()
+            if _digest_da_entrada(caminho, mtime_ns, info) == digest:
+                return caminho, info
+        except (OSError, KeyError, zipfile.BadZipFile):
+            continue
+    return None
+
+
+def _ler_comprimido(caminho, info):
+    """Bytes da entrada exatamente como estão no zip (sem descompactar)."""
+    with open(caminho, "rb") as f:
+        f.seek(info.header_offset)
+        cabecalho = f.read(_TAMANHO_CABECALHO_LOCAL)
+        if len(cabecalho) != _TAMANHO_CABECALHO_LOCAL or cabecalho[:4] != _ASSINATURA_CABECALHO_LOCAL:
+            return None
+        tamanho_nome, tamanho_extra = struct.unpack("<HH", cabecalho[26:30])
+        f.seek(tamanho_nome + tamanho_extra, os.SEEK_CUR)
+        dados = f.read(info.compress_size)
+    return dados if len(dados) == info.compress_size else None
+
+
+def _gravar_bruto(zf, nome, info, dados, data_hora):
+    """
+    Acrescenta ao zip uma entrada com dados já comprimidos. O zipfile não tem API pública para isso: o
+    cabeçalho local é escrito aqui e a entrada é registrada para o diretório central, como faz ZipFile.writestr.
+    """
+    destino = zipfile.ZipInfo(nome, date_time=data_hora)
+    destino.compress_type = info.compress_type
+    destino.CRC = info.CRC
+    destino.compress_size = info.compress_size
+    destino.file_size = info.file_size
+    destino.external_attr = 0o600 << 16
+    with zf._lock:
+        zf._writecheck(destino)
+        zf._didModify = True
+        destino.header_offset = zf.fp.tell()
+        zf.fp.write(destino.FileHeader(False))
+        zf.fp.write(dados)
+        zf.filelist.append(destino)
+        zf.NameToInfo[nome] = destino
+        zf.start_dir = zf.fp.tell()
+
+
+def _eh_xml(part):
+    tipo = part.content_type or ""
+    return tipo.endswith("xml") or part.partname.ext in ("xml", "rels")
+
+
+def gravar_pacote(doc, destino, nivel=None, modo_midia=None):
+    """
+    Grava o pacote do documento em `destino` (caminho ou arquivo binário), na mesma ordem de doc.save().
+    Retorna estatísticas: partes, copiadas (sem recompressão), armazenadas, comprimidas e segundos.
+    """
+    nivel = NIVEL if nivel is None else nivel
+    modo_midia = MODO_MIDIA if modo_midia is None else modo_midia
+    inicio = time.perf_counter()
+    estatisticas = {"partes": 0, "copiadas": 0, "armazenadas": 0, "comprimidas": 0}
+
+    pacote = doc.part.package
+    partes = list(pacote.parts)
+    for part in partes:
+        part.before_marshal()
+
+    compressao_xml = zipfile.ZIP_DEFLATED if nivel > 0 else zipfile.ZIP_STORED
+    data_hora = time.localtime(time.time())[:6]
+
+    def escrever(nome, blob, compressao):
+        zf.writestr(nome, blob, compress_type=compressao, compresslevel=nivel if compressao == zipfile.ZIP_DEFLATED else None)
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        escrever(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(partes).blob, compressao_xml)
+        escrever(PACKAGE_URI.rels_uri.membername, pacote.rels.xml, compressao_xml)
+        for part in partes:
+            nome = part.partname.membername
+            blob = part.blob
+            estatisticas["partes"] += 1
+            xml = _eh_xml(part)
+            if modo_midia == "copiar":
+                origem = _origem_de(blob)
+                dados = _ler_comprimido(*origem) if origem else None
+                if dados is not None:
+                    _gravar_bruto(zf, nome, origem[1], dados, data_hora)
+                    estatisticas["copiadas"] += 1
+                    compressao = None
+                else:
+                    compressao = compressao_xml
+            elif modo_midia == "armazenar" and not xml:
+                compressao = zipfile.ZIP_STORED
+            else:
+                compressao = compressao_xml
+            if compressao is not None:
+                escrever(nome, blob, compressao)
+                estatisticas["comprimidas" if compressao == zipfile.ZIP_DEFLATED else "armazenadas"] += 1
+            if len(part.rels):
+                escrever(part.partname.rels_uri.membername, part.rels.xml, compressao_xml)
+
+    estatisticas["segundos"] = round(time.perf_counter() - inicio, 4)
+    return estatisticas
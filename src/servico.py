@@ -0,0 +1,193 @@
+# servico.py — serviço local de geração (HTTP em 127.0.0.1) que mantém templates e imports "quentes".
+#
+# Uso:
+#   python -m src.servico                          # porta 8765, templates/ do projeto, 2 workers
+#   python -m src.servico --porta 9000 --workers 4 --templates /caminho/templates
+#
+# API (JSON, só aceita conexões locais):
+#   GET  /saude    -> {"ok": true, "workers": 2, "cache": {...}}
+#   GET  /modelos  -> {"modelos": ["Horas Extras", ...]}  (nomes como exibidos, com "/")
+#   POST /gerar    -> corpo: o mesmo registro do modo lote (campos do preâmbulo, "pedidos", "numeracao_inicial")
+#                     resposta: o .docx gerado (application/vnd.openxmlformats-officedocument.wordprocessingml.document)
+#                     erros: {"erro": "..."} com 400 (registro inválido), 503 (fila cheia) ou 500
+#
+# A interface (GERADOR_SERVICO=http://127.0.0.1:8765) e o lote (--servico) enviam os trabalhos para cá
+# através de src/servico_cliente.py.
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .batch import indice_modelos, get_base_dir, preparar_registro
+from .generate_word import documento_em_bytes, gerar_documento, indice_templates, replace_bar_placeholder
+from .template_cache import abrir_template, estatisticas_cache
+from . import metricas, perfil, registro_log
+
+logger = logging.getLogger(__name__)
+
+PORTA_PADRAO = 8765
+WORKERS_PADRAO = 2
+# trabalhos aguardando além dos que estão em execução; acima disso o serviço responde 503
+FILA_POR_WORKER = 4
+MAX_CORPO_BYTES = 1024 * 1024
+TIPO_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class _FilaCheia(Exception):
+    pass
+
+
+class ServicoGeracao:
+    """Estado compartilhado pelas requisições: diretório de templates, pool de geração e limite da fila."""
+
+    def __init__(self, templates_dir, workers=WORKERS_PADRAO):
+        self.templates_dir = os.path.abspath(templates_dir)
+        self.caminho_template = os.path.join(self.templates_dir, "modelo_base.docx")
+        self.workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="servico")
+        self._vagas = threading.BoundedSemaphore(self.workers * (1 + FILA_POR_WORKER))
+
+    def aquecer(self):
+        """Indexa os templates e deixa todos parseados no cache, para a primeira requisição já sair quente."""
+        inicio = time.perf_counter()
+        fatos = indice_templates(self.templates_dir).atualizar()
+        for rel in fatos:
+            try:
+                abrir_template(os.path.join(self.templates_dir, rel))
+            except Exception as e:
+                logger.warning("[servico] não foi possível pré-carregar %s: %s", rel, e)
+        logger.info("[servico] %d templates pré-carregados em %.2fs; cache=%s", len(fatos), time.perf_counter() - inicio, estatisticas_cache())
+
+    def modelos(self):
+        indice = indice_modelos(os.path.join(self.templates_dir, "modelos"))
+        return sorted({replace_bar_placeholder(nome_raw) for nome_raw, _ in indice.values()})
+
+    def gerar(self, registro):
+        """Gera o documento do registro no pool. Levanta ValueError (registro inválido) ou _FilaCheia."""
+        indice = indice_modelos(os.path.join(self.templates_dir, "modelos"))
+        campos, pedidos_ordenados, numeracao = preparar_registro(registro, indice)
+        if not self._vagas.acquire(blocking=False):
+            raise _FilaCheia()
+        try:
+            return self._pool.submit(self._gerar, campos, pedidos_ordenados, numeracao).result()
+        finally:
+            self._vagas.release()
+
+    def _gerar(self, campos, pedidos_ordenados, numeracao):
+        doc = gerar_documento(self.caminho_template, campos, pedidos_ordenados, numeracao)
+        return documento_em_bytes(doc)
+
+    def encerrar(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    servico = None  # ServicoGeracao, definido em criar_servidor
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        logger.info("[servico] %s %s", self.address_string(), formato % args)
+
+    def _responder(self, status, corpo, tipo="application/json; charset=utf-8", extras=None):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (extras or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_json(self, status, dados):
+        self._responder(status, json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        if self.path == "/saude":
+            self._responder_json(200, {"ok": True, "workers": self.servico.workers, "cache": estatisticas_cache()})
+        elif self.path == "/modelos":
+            self._responder_json(200, {"modelos": self.servico.modelos()})
+        else:
+            self._responder_json(404, {"erro": f"caminho desconhecido: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/gerar":
+            self._responder_json(404, {"erro": f"caminho desconhecido: {self.path}"})
+            return
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            tamanho = -1
+        if tamanho <= 0 or tamanho > MAX_CORPO_BYTES:
+            self.close_connection = True
+            self._responder_json(400, {"erro": "corpo ausente ou maior que o permitido"})
+            return
+        try:
+            registro = json.loads(self.rfile.read(tamanho).decode("utf-8"))
+            if not isinstance(registro, dict):
+                raise ValueError("o corpo deve ser um objeto JSON")
+        except ValueError as e:
+            self._responder_json(400, {"erro": f"JSON inválido: {e}"})
+            return
+
+        inicio = time.perf_counter()
+        try:
+            conteudo = self.servico.gerar(registro)
+        except ValueError as e:
+            self._responder_json(400, {"erro": str(e)})
+            return
+        except _FilaCheia:
+            self._responder_json(503, {"erro": "serviço ocupado; tente novamente"})
+            return
+        except Exception as e:
+            logger.exception("[servico] falha ao gerar documento")
+            self._responder_json(500, {"erro": f"{type(e).__name__}: {e}"})
+            return
+        self._responder(200, conteudo, TIPO_DOCX, {"X-Tempo-Geracao": f"{time.perf_counter() - inicio:.3f}"})
+
+
+def criar_servidor(servico, porta=PORTA_PADRAO):
+    """Servidor HTTP (uma thread por conexão) ligado só à interface local."""
+    handler = type("Handler", (_Handler,), {"servico": servico})
+    return ThreadingHTTPServer(("127.0.0.1", porta), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.servico", description="Serviço local de geração de iniciais.")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO, help=f"porta em 127.0.0.1 (padrão: {PORTA_PADRAO})")
+    parser.add_argument("--templates", default=os.path.join(get_base_dir(), "templates"), help="pasta com modelo_base.docx e modelos/")
+    parser.add_argument("--workers", type=int, default=WORKERS_PADRAO, help=f"gerações simultâneas (padrão: {WORKERS_PADRAO})")
+    parser.add_argument("--sem-aquecer", action="store_true", help="não pré-carrega os templates na inicialização")
+    args = parser.parse_args(argv)
+
+    registro_log.configurar(console=True, nivel=logging.INFO)
+    diretorio_logs = os.path.join(get_base_dir(), "logs")
+    if metricas.habilitado() or perfil.habilitado():
+        os.makedirs(diretorio_logs, exist_ok=True)
+        metricas.configurar(diretorio_logs)
+        perfil.configurar(diretorio_logs)
+
+    if not os.path.isfile(os.path.join(args.templates, "modelo_base.docx")):
+        print(f"modelo_base.docx não encontrado em {args.templates}", file=sys.stderr)
+        return 2
+
+    servico = ServicoGeracao(args.templates, args.workers)
+    if not args.sem_aquecer:
+        servico.aquecer()
+    servidor = criar_servidor(servico, args.porta)
+    print(f"serviço de geração em http://127.0.0.1:{args.porta} ({servico.workers} workers) — Ctrl+C para encerrar", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servico.encerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
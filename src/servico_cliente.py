@@ -0,0 +1,45 @@
+# servico_cliente.py — cliente do serviço local de geração (src/servico.py).
+# Só usa a biblioteca padrão: pode ser importado sem carregar python-docx.
+import json
+import urllib.error
+import urllib.request
+
+
+class DocumentoGerado:
+    """Resultado de uma geração remota: expõe save() como um Document, para reaproveitar salvar_documento."""
+
+    def __init__(self, conteudo):
+        self.conteudo = conteudo
+
+    def save(self, destino):
+        if hasattr(destino, "write"):
+            destino.write(self.conteudo)
+        else:
+            with open(destino, "wb") as f:
+                f.write(self.conteudo)
+
+
+def gerar_no_servico(url, registro, timeout=600):
+    """Envia o registro para POST {url}/gerar e devolve um DocumentoGerado. Erros do serviço viram RuntimeError."""
+    corpo = json.dumps(registro, ensure_ascii=False).encode("utf-8")
+    requisicao = urllib.request.Request(url.rstrip("/") + "/gerar", data=corpo, method="POST",
+                                        headers={"Content-Type": "application/json; charset=utf-8"})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            return DocumentoGerado(resposta.read())
+    except urllib.error.HTTPError as e:
+        try:
+            mensagem = json.loads(e.read().decode("utf-8")).get("erro")
+        except Exception:
+            mensagem = None
+        raise RuntimeError(f"serviço de geração respondeu {e.code}: {mensagem or e.reason}")
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"serviço de geração indisponível em {url}: {e.reason}")
+
+
+def registro_de_geracao(campos, pedidos_ordenados, numeracao_inicial=6):
+    """Monta o registro da API a partir dos argumentos de gerar_documento (pedidos pelo nome do arquivo)."""
+    registro = dict(campos)
+    registro["pedidos"] = [nome_raw for nome_raw, _ in pedidos_ordenados]
+    registro["numeracao_inicial"] = numeracao_inicial
+    return registro
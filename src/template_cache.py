@@ -0,0 +1,157 @@
+# Cache em memória dos templates .docx já abertos (modelo_base, modelos/*.docx e modelo_base_final).
+# Cada template é parseado uma única vez por (caminho, mtime, tamanho); quem pede recebe um clone
+# (deepcopy das árvores lxml, que é bem mais barato que unzip + parse) e pode alterá-lo livremente.
+import logging
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from copy import deepcopy
+from docx import Document
+from .normalizacao import normalizar_template
+from .salvamento import registrar_origem
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de memória do cache (MB); pode ser ajustado pela variável de ambiente GERADOR_CACHE_MB.
+# Com 0 o cache fica desligado e todo pedido volta a abrir o arquivo do disco.
+DEFAULT_CACHE_MB = 256
+
+# Fator aproximado entre o tamanho descompactado das partes XML e a memória ocupada pelas árvores lxml.
+_XML_OVERHEAD = 4
+
+
+def template_key(caminho):
+    """Retorna a chave (caminho absoluto, mtime_ns, tamanho) do arquivo."""
+    caminho_abs = os.path.abspath(caminho)
+    st = os.stat(caminho_abs)
+    return (caminho_abs, st.st_mtime_ns, st.st_size)
+
+
+def clonar_documento(doc):
+    """
+    Clone independente de um Document. O deepcopy das árvores lxml não usa o memo: referências a elementos
+    internos guardadas pelo python-docx (o _Body do corpo, criado no primeiro doc.paragraphs/add_paragraph)
+    virariam cópias soltas da árvore. O cache do corpo é descartado para ser recriado sobre o clone.
+    """
+    clone = deepcopy(doc)
+    clone._Document__body = None
+    return clone
+
+
+def _estimate_template_bytes(caminho):
+    """Estimativa da memória ocupada pelo template parseado (partes XML pesam mais que binárias)."""
+    total = 0
+    try:
+        with zipfile.ZipFile(caminho, 'r') as z:
+            for info in z.infolist():
+                if info.filename.endswith('.xml') or info.filename.endswith('.rels'):
+                    total += info.file_size * _XML_OVERHEAD
+                else:
+                    total += info.file_size
+    except Exception:
+        total = os.path.getsize(caminho) * _XML_OVERHEAD
+    return total
+
+
+class TemplateCache:
+    """
+    Cache LRU de documentos parseados, limitado por um orçamento de memória (em bytes).
+    - get(caminho) devolve sempre um clone independente do documento em cache.
+    - Entradas cujo arquivo mudou (mtime/tamanho) são descartadas automaticamente.
+    - stats() expõe hits/misses/evictions para diagnóstico.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()  # caminho_abs -> (key, Document, peso)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, caminho):
+        key = template_key(caminho)
+        caminho_abs = key[0]
+        with self._lock:
+            entry = self._entries.get(caminho_abs)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(caminho_abs)
+                self.hits += 1
+            else:
+                if entry is not None:
+                    # arquivo foi alterado em disco: descarta versão antiga
+                    self._drop(caminho_abs)
+                entry = None
+                self.misses += 1
+        if entry is not None:
+            # o documento em cache nunca é alterado: o clone é feito fora do lock, em paralelo entre threads
+            return clonar_documento(entry[1])
+
+        doc = Document(caminho_abs)
+        # imagens/fontes intactas deste template podem ser copiadas sem recompressão ao salvar
+        registrar_origem(caminho_abs)
+        # runs fragmentados/rsid removidos uma vez aqui; todos os clones já saem normalizados
+        normalizar_template(doc, caminho_abs)
+        if self.max_bytes <= 0:
+            return doc
+
+        peso = _estimate_template_bytes(caminho_abs)
+        if peso > self.max_bytes:
+            logger.info("[template_cache] %s (%d bytes) excede o orçamento do cache; não armazenado.", caminho_abs, peso)
+            return doc
+
+        with self._lock:
+            if caminho_abs in self._entries:
+                self._drop(caminho_abs)
+            self._entries[caminho_abs] = (key, doc, peso)
+            self._total_bytes += peso
+            while self._total_bytes > self.max_bytes and self._entries:
+                antigo = next(iter(self._entries))
+                self._drop(antigo)
+                self.evictions += 1
+                logger.debug("[template_cache] evict LRU %s", antigo)
+        return clonar_documento(doc)
+
+    def _drop(self, caminho_abs):
+        entry = self._entries.pop(caminho_abs, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def _cache_budget_from_env():
+    try:
+        return int(float(os.environ.get("GERADOR_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024)
+    except ValueError:
+        logger.warning("[template_cache] GERADOR_CACHE_MB inválido; usando %s MB.", DEFAULT_CACHE_MB)
+        return DEFAULT_CACHE_MB * 1024 * 1024
+
+
+# instância compartilhada pelo processo
+template_cache = TemplateCache(_cache_budget_from_env())
+
+
+def abrir_template(caminho):
+    """Abre um .docx através do cache compartilhado (equivalente a Document(caminho), mas reaproveitando o parse)."""
+    return template_cache.get(caminho)
+
+
+def estatisticas_cache():
+    return template_cache.stats()
@@ -0,0 +1,146 @@
+# Índice persistente de metadados dos templates (arquivo JSON em templates/.indice_templates.json).
+# Para cada .docx guardamos (mtime, tamanho, sha256) e, por hash de conteúdo, os fatos derivados
+# (placeholders, parágrafos de título, runs...). Somente arquivos alterados são reprocessados;
+# arquivos renomeados/copiados com o mesmo conteúdo reaproveitam os fatos já calculados.
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = ".indice_templates.json"
+INDEX_VERSION = 3
+
+
+def _sha256_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class TemplateIndex:
+    """
+    Índice de um diretório de templates.
+    - fatos(caminho): fatos do template, recalculados só se o arquivo mudou (mtime/tamanho e depois hash).
+    - listar(): .docx do diretório (e de modelos/) só pela listagem, sem abrir nenhum arquivo.
+    - atualizar(): reindexa incrementalmente todos os .docx listados.
+    calcular_fatos(caminho) -> dict é fornecido por quem usa o índice (generate_word).
+    """
+
+    def __init__(self, diretorio, calcular_fatos):
+        self.diretorio = os.path.abspath(diretorio)
+        self.caminho_indice = os.path.join(self.diretorio, INDEX_FILENAME)
+        self._calcular_fatos = calcular_fatos
+        self._lock = threading.RLock()
+        self._arquivos = {}   # caminho relativo -> {"mtime_ns", "tamanho", "sha256"}
+        self._conteudo = {}   # sha256 -> fatos
+        self._sujo = False
+        self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_indice, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+            if dados.get("versao") != INDEX_VERSION:
+                logger.info("[template_index] versão do índice diferente; reconstruindo %s", self.caminho_indice)
+                return
+            self._arquivos = dados.get("arquivos", {})
+            self._conteudo = dados.get("conteudo", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("[template_index] índice ilegível em %s (%s); será reconstruído.", self.caminho_indice, e)
+
+    def salvar(self):
+        """Grava o índice (atomicamente) se houve alteração. Falhas de escrita só geram aviso."""
+        with self._lock:
+            if not self._sujo:
+                return
+            # remove fatos de conteúdos que nenhum arquivo referencia mais
+            usados = {info["sha256"] for info in self._arquivos.values()}
+            self._conteudo = {h: f for h, f in self._conteudo.items() if h in usados}
+            dados = {"versao": INDEX_VERSION, "arquivos": self._arquivos, "conteudo": self._conteudo}
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=self.diretorio)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(dados, f, ensure_ascii=False, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.caminho_indice)
+                self._sujo = False
+            except Exception as e:
+                logger.warning("[template_index] não foi possível gravar %s: %s", self.caminho_indice, e)
+                try:
+                    if tmp_path and os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    def _relativo(self, caminho):
+        return os.path.relpath(os.path.abspath(caminho), self.diretorio).replace(os.sep, "/")
+
+    def _atualizar_arquivo(self, caminho):
+        rel = self._relativo(caminho)
+        st = os.stat(caminho)
+        info = self._arquivos.get(rel)
+        if info and info["mtime_ns"] == st.st_mtime_ns and info["tamanho"] == st.st_size and info["sha256"] in self._conteudo:
+            return self._conteudo[info["sha256"]]
+
+        sha = _sha256_arquivo(caminho)
+        self._arquivos[rel] = {"mtime_ns": st.st_mtime_ns, "tamanho": st.st_size, "sha256": sha}
+        self._sujo = True
+        fatos = self._conteudo.get(sha)
+        if fatos is None:
+            fatos = self._calcular_fatos(caminho)
+            self._conteudo[sha] = fatos
+            logger.info("[template_index] indexado %s", rel)
+        return fatos
+
+    def fatos(self, caminho):
+        """Fatos do template em 'caminho' (dict). Grava o índice se algo foi recalculado."""
+        with self._lock:
+            fatos = self._atualizar_arquivo(caminho)
+            self.salvar()
+            return fatos
+
+    def listar(self):
+        """
+        Caminhos relativos dos .docx do diretório e de modelos/, pela listagem (nenhum arquivo é aberto).
+        Entradas de arquivos que não existem mais saem do índice.
+        """
+        listados = []
+        for pasta in (self.diretorio, os.path.join(self.diretorio, "modelos")):
+            if not os.path.isdir(pasta):
+                continue
+            for nome in sorted(os.listdir(pasta)):
+                if nome.lower().endswith(".docx") and not nome.startswith("~$"):
+                    listados.append(self._relativo(os.path.join(pasta, nome)))
+        with self._lock:
+            presentes = set(listados)
+            for rel in list(self._arquivos):
+                if rel not in presentes:
+                    del self._arquivos[rel]
+                    self._sujo = True
+        return listados
+
+    def atualizar(self):
+        """
+        Reindexa os .docx listados (o lock é tomado arquivo a arquivo: fatos() de uma geração não espera a
+        reindexação inteira). Retorna {caminho_relativo: fatos}; arquivos que não puderam ser lidos continuam
+        na lista, com fatos vazios, e são tentados de novo na próxima vez.
+        """
+        encontrados = {}
+        for rel in self.listar():
+            caminho = os.path.join(self.diretorio, *rel.split("/"))
+            try:
+                with self._lock:
+                    encontrados[rel] = self._atualizar_arquivo(caminho)
+            except Exception as e:
+                logger.warning("[template_index] falha ao indexar %s: %s", caminho, e)
+                encontrados[rel] = {}
+        self.salvar()
+        return encontrados
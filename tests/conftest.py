@@ -0,0 +1,117 @@
+# Fixtures dos testes: templates sintéticos (modelo_base, pedidos e modelo_base_final) gerados numa pasta
+# temporária, no mesmo layout de templates/ (modelo_base*.docx na raiz e os pedidos em modelos/).
+import base64
+import os
+import sys
+
+import pytest
+from docx import Document
+from docx.enum.section import WD_SECTION
+from docx.shared import Inches
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import generate_word  # noqa: E402
+
+CAMPOS = {
+    "Nome reclamante": "MARIA DA SILVA",
+    "Número do cpf": "123.456.789-00",
+    "Nome reclamada": "EMPRESA X LTDA",
+}
+
+# PNG 1x1 (logotipo repetido em vários pedidos)
+_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+
+class Templates:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.modelos = os.path.join(pasta, "modelos")
+        os.makedirs(self.modelos, exist_ok=True)
+        self.logo = os.path.join(pasta, "logo.png")
+        with open(self.logo, "wb") as f:
+            f.write(_PNG)
+
+    @property
+    def modelo_base(self):
+        return os.path.join(self.pasta, "modelo_base.docx")
+
+    def pedido(self, nome):
+        return (nome, os.path.join(self.modelos, nome + ".docx"))
+
+
+def _modelo_base(t):
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Cabeçalho {{NOME_RECLAMANTE}}"
+    doc.add_paragraph("Reclamante: {{NOME_RECLAMANTE}}, CPF {{NUMERO_CPF_RECLAMANTE}}")
+    doc.add_paragraph("Reclamada: {{NOME_RECLAMADA}}")
+    doc.add_picture(t.logo, width=Inches(0.5))
+    doc.save(t.modelo_base)
+
+
+def _pedido_com_cabecalho(caminho):
+    """Pedido com duas seções: a primeira (w:sectPr interno) tem cabeçalho e rodapé próprios."""
+    doc = Document()
+    secao = doc.sections[0]
+    secao.header.is_linked_to_previous = False
+    secao.header.paragraphs[0].text = "Cabeçalho do pedido"
+    secao.footer.is_linked_to_previous = False
+    secao.footer.paragraphs[0].text = "Rodapé do pedido"
+    doc.add_paragraph("Pedido com cabeçalho de {{NOME_RECLAMANTE}}")
+    doc.add_section(WD_SECTION.NEW_PAGE)
+    doc.add_paragraph("Fim do pedido com cabeçalho")
+    doc.save(caminho)
+
+
+def _pedido_com_lista(caminho):
+    """Itens com numeração direta (w:numPr no parágrafo) apontando para uma lista do numbering.xml do pedido."""
+    doc = Document()
+    doc.add_paragraph("Pedido com lista")
+    for item in ("primeiro", "segundo"):
+        num_pr = doc.add_paragraph(f"item {item}")._p.get_or_add_pPr().get_or_add_numPr()
+        num_pr.get_or_add_ilvl().val = 0
+        num_pr.get_or_add_numId().val = 5
+    doc.save(caminho)
+
+
+def _pedido_com_imagem(caminho, logo):
+    doc = Document()
+    doc.add_paragraph("Pedido com logotipo")
+    doc.add_picture(logo, width=Inches(0.5))
+    doc.save(caminho)
+
+
+def _modelo_base_final(caminho):
+    doc = Document()
+    for titulo in ("Dos pedidos", "Do valor da causa", "Das provas"):
+        doc.add_paragraph().add_run(titulo).bold = True
+        doc.add_paragraph("Texto da seção.")
+    doc.save(caminho)
+
+
+@pytest.fixture
+def templates(tmp_path):
+    t = Templates(str(tmp_path))
+    _modelo_base(t)
+    _pedido_com_cabecalho(t.pedido("cabecalho")[1])
+    _pedido_com_lista(t.pedido("lista")[1])
+    _pedido_com_imagem(t.pedido("imagem_a")[1], t.logo)
+    _pedido_com_imagem(t.pedido("imagem_b")[1], t.logo)
+    _modelo_base_final(os.path.join(t.pasta, "modelo_base_final.docx"))
+    return t
+
+
+@pytest.fixture(params=["interna", "composer"])
+def mesclagem(request, monkeypatch):
+    """Roda o teste nos dois caminhos de anexação (mesclador interno e docxcompose, se instalado)."""
+    if request.param == "composer" and generate_word.Composer is None:
+        pytest.skip("docxcompose não instalado")
+    monkeypatch.setattr(generate_word, "MESCLAGEM", request.param)
+    return request.param
+
+
+@pytest.fixture
+def interna(monkeypatch):
+    monkeypatch.setattr(generate_word, "MESCLAGEM", "interna")
@@ -0,0 +1,27 @@
+import os
+
+from src import generate_word as gw
+from src.template_cache import template_cache
+
+from conftest import CAMPOS
+
+
+def _em_cache(pasta):
+    with template_cache._lock:
+        return [c for c in template_cache._entries if c.startswith(os.path.abspath(pasta))]
+
+
+def test_baixa_memoria_nao_usa_o_cache_de_templates(templates, mesclagem):
+    pedidos = [templates.pedido("cabecalho"), templates.pedido("lista")]
+    doc = gw.gerar_documento(templates.modelo_base, CAMPOS, pedidos, baixa_memoria=True)
+    assert doc.paragraphs[0].text == "Reclamante: MARIA DA SILVA, CPF 123.456.789-00"
+
+    esqueleto = gw.compor_esqueleto(templates.modelo_base, pedidos, baixa_memoria=True)
+    assert esqueleto.preencher(CAMPOS).paragraphs[0].text == doc.paragraphs[0].text
+
+    assert _em_cache(templates.pasta) == []
+
+
+def test_modo_normal_usa_o_cache(templates, interna):
+    gw.gerar_documento(templates.modelo_base, CAMPOS, [templates.pedido("lista")], baixa_memoria=False)
+    assert _em_cache(templates.pasta)
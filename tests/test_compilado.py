@@ -0,0 +1,52 @@
+import os
+
+from docx import Document
+
+from src import generate_word as gw
+
+from conftest import CAMPOS
+
+PLACEHOLDERS = tuple(ph for ph, _ in gw.PLACEHOLDERS_CAMPOS)
+
+
+def test_mapa_localiza_corpo_e_cabecalho(templates):
+    compilado = gw.compilar_template(templates.modelo_base, PLACEHOLDERS)
+    locais = {(partname, encontrados) for partname, _, encontrados in compilado.locations}
+    assert ("/word/document.xml", ("{{NOME_RECLAMANTE}}", "{{NUMERO_CPF_RECLAMANTE}}")) in locais
+    assert ("/word/document.xml", ("{{NOME_RECLAMADA}}",)) in locais
+    assert any(partname.startswith("/word/header") for partname, _ in locais)
+    assert gw.compilar_template(templates.modelo_base, PLACEHOLDERS) is compilado
+
+
+def test_preenchimento_compilado_igual_ao_completo(templates):
+    compilado = gw.compilar_template(templates.modelo_base, PLACEHOLDERS)
+    substituicoes = gw.montar_substituicoes(CAMPOS)
+    pelo_mapa = gw.abrir_template(templates.modelo_base)
+    completo = gw.abrir_template(templates.modelo_base)
+
+    assert gw.replace_placeholders_compiled(pelo_mapa, compilado, substituicoes, gw.CAMPOS_NEGRITO)
+    gw.replace_placeholders_in_doc(completo, substituicoes, gw.CAMPOS_NEGRITO)
+
+    assert pelo_mapa.element.xml == completo.element.xml
+    assert [p.element.xml for p in gw._header_footer_parts(pelo_mapa)] == \
+        [p.element.xml for p in gw._header_footer_parts(completo)]
+
+
+def test_documento_diferente_do_mapa_retorna_false(templates):
+    compilado = gw.compilar_template(templates.modelo_base, PLACEHOLDERS)
+    doc = gw.abrir_template(templates.modelo_base)
+    doc.element.body.remove(doc.paragraphs[0]._p)
+    assert gw.replace_placeholders_compiled(doc, compilado, gw.montar_substituicoes(CAMPOS), gw.CAMPOS_NEGRITO) is False
+
+
+def test_template_alterado_e_recompilado(templates):
+    antigo = gw.compilar_template(templates.modelo_base, PLACEHOLDERS)
+    doc = Document(templates.modelo_base)
+    doc.add_paragraph("Mãe: {{NOME_MAE_RECLAMANTE}}")
+    doc.save(templates.modelo_base)
+    st = os.stat(templates.modelo_base)
+    os.utime(templates.modelo_base, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    novo = gw.compilar_template(templates.modelo_base, PLACEHOLDERS)
+    assert novo is not antigo
+    assert len(novo.locations) == len(antigo.locations) + 1
@@ -0,0 +1,32 @@
+from src import generate_word as gw
+
+from conftest import CAMPOS
+
+OUTROS_CAMPOS = {
+    "Nome reclamante": "JOSÉ PEREIRA",
+    "Número do cpf": "987.654.321-00",
+    "Nome reclamada": "OUTRA EMPRESA S/A",
+}
+
+
+def _partes_xml(doc):
+    """XML do corpo e dos cabeçalhos/rodapés, na ordem das partes."""
+    return [doc.element.xml] + [p.element.xml for p in gw._header_footer_parts(doc)]
+
+
+def test_esqueleto_equivale_a_gerar_documento(templates, mesclagem):
+    pedidos = [templates.pedido("cabecalho"), templates.pedido("lista"), templates.pedido("imagem_a")]
+    esqueleto = gw.compor_esqueleto(templates.modelo_base, pedidos)
+
+    for campos in (CAMPOS, OUTROS_CAMPOS):
+        preenchido = esqueleto.preencher(campos)
+        gerado = gw.gerar_documento(templates.modelo_base, campos, pedidos)
+        assert [p.text for p in preenchido.paragraphs] == [p.text for p in gerado.paragraphs]
+        assert _partes_xml(preenchido) == _partes_xml(gerado)
+
+
+def test_esqueleto_nao_preenche_placeholders_dos_pedidos(templates, mesclagem):
+    esqueleto = gw.compor_esqueleto(templates.modelo_base, [templates.pedido("cabecalho")])
+    textos = [p.text for p in esqueleto.preencher(CAMPOS).paragraphs]
+    assert textos[0] == "Reclamante: MARIA DA SILVA, CPF 123.456.789-00"
+    assert "Pedido com cabeçalho de {{NOME_RECLAMANTE}}" in textos
@@ -0,0 +1,129 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.parts.hdrftr import FooterPart, HeaderPart
+from docx.oxml.ns import qn
+from docx.parts.image import ImagePart
+
+from src import generate_word as gw
+from src.mesclador import Mesclador, deduplicar_midias
+
+from conftest import CAMPOS
+
+
+def _textos(part):
+    return [p.text for p in gw.BlockItemContainer(part.element, part).paragraphs if p.text]
+
+
+def _reabrir(doc):
+    return Document(io.BytesIO(gw.documento_em_bytes(doc)))
+
+
+def test_cabecalho_do_pedido_copiado_como_header_part(templates):
+    doc = Document(templates.modelo_base)
+    mesclador = Mesclador(doc)
+    mesclador.anexar(Document(templates.pedido("cabecalho")[1]))
+
+    partes = gw._header_footer_parts(doc)
+    assert all(isinstance(p, (HeaderPart, FooterPart)) for p in partes)
+    textos = [t for p in partes for t in _textos(p)]
+    assert "Cabeçalho do pedido" in textos
+    assert "Rodapé do pedido" in textos
+    assert mesclador.estatisticas["partes_copiadas"] == 2
+
+
+def test_pedido_com_cabecalho_pela_mesclagem_interna(templates, interna):
+    pedidos = [templates.pedido("cabecalho")]
+    doc = gw.gerar_documento(templates.modelo_base, CAMPOS, pedidos)
+
+    textos = [t for p in gw._header_footer_parts(doc) for t in _textos(p)]
+    assert "Cabeçalho MARIA DA SILVA" in textos
+    assert "Cabeçalho do pedido" in textos
+
+    reaberto = _reabrir(doc)
+    assert [t for p in gw._header_footer_parts(reaberto) for t in _textos(p)] == textos
+
+    esqueleto = gw.compor_esqueleto(templates.modelo_base, pedidos)
+    preenchido = esqueleto.preencher(CAMPOS)
+    assert "Cabeçalho MARIA DA SILVA" in [t for p in gw._header_footer_parts(preenchido) for t in _textos(p)]
+
+
+def test_pre_composicao_com_cabecalho_no_pedido(templates, interna):
+    pedidos = [templates.pedido("cabecalho")]
+    doc = gw.compor_documento(templates.modelo_base, pedidos)
+    assert gw.preencher_documento_composto(doc, templates.modelo_base, CAMPOS) is True
+    assert doc.paragraphs[0].text == "Reclamante: MARIA DA SILVA, CPF 123.456.789-00"
+
+
+def test_deduplicar_midias_atualiza_related_parts(templates):
+    doc = Document(templates.modelo_base)
+    pacote = doc.part.package
+    original = next(p for p in pacote.iter_parts() if isinstance(p, ImagePart))
+    copia = ImagePart.load(PackURI("/word/media/image99.png"), original.content_type, original.blob, pacote)
+    rid = doc.part.relate_to(copia, RT.IMAGE)
+    assert doc.part.related_parts[rid] is copia
+
+    estatisticas = deduplicar_midias(doc)
+
+    assert estatisticas["midias_removidas"] == 1
+    assert estatisticas["relacionamentos_reescritos"] == 1
+    assert doc.part.related_parts[rid] is original
+    assert doc.part.rels[rid].target_part is original
+    assert copia not in list(pacote.iter_parts())
+    with zipfile.ZipFile(io.BytesIO(gw.documento_em_bytes(doc))) as z:
+        assert [n for n in z.namelist() if n.startswith("word/media/")] == [original.partname.membername]
+
+
+def test_parte_de_cabecalho_sem_xml_nao_impede_as_demais(templates):
+    from docx.opc.part import Part
+
+    doc = Document(templates.pedido("cabecalho")[1])
+    partes = gw._header_footer_parts(doc)
+    generica = partes[0]
+    # simula uma parte carregada sem classe do python-docx (bug corrigido no mesclador)
+    bruta = Part(generica.partname, generica.content_type, generica.blob, generica.package)
+    rid = next(r for r, alvo in doc.part.related_parts.items() if alvo is generica)
+    doc.part.rels.add_relationship(doc.part.rels[rid].reltype, bruta, rid)
+
+    restantes = gw._header_footer_parts(doc)
+    assert bruta not in restantes and len(restantes) == len(partes) - 1
+    gw.replace_placeholders_in_doc(doc, gw.montar_substituicoes(CAMPOS), gw.CAMPOS_NEGRITO)
+    assert doc.paragraphs[0].text == "Pedido com cabeçalho de MARIA DA SILVA"
+
+
+def _num_ids(doc):
+    return [p._p.pPr.numPr.numId.val for p in doc.paragraphs
+            if p._p.pPr is not None and p._p.pPr.numPr is not None and p._p.pPr.numPr.numId is not None]
+
+
+def test_listas_de_cada_pedido_ganham_numeracao_propria(templates):
+    doc = Document(templates.modelo_base)
+    numeracao = doc.part.numbering_part.element
+    nums_antes = {n.numId for n in numeracao.num_lst}
+    mesclador = Mesclador(doc)
+    for _ in range(2):
+        mesclador.anexar(Document(templates.pedido("lista")[1]))
+
+    num_ids = _num_ids(doc)
+    assert len(num_ids) == 4
+    # cada pedido anexado reinicia a própria lista: um w:num novo por anexo, nenhum reaproveitado do destino
+    assert len(set(num_ids)) == 2 and not set(num_ids) & nums_antes
+    abstratos = {a.get(qn("w:abstractNumId")) for a in numeracao.findall(qn("w:abstractNum"))}
+    for num_id in set(num_ids):
+        assert str(numeracao.num_having_numId(num_id).abstractNumId.val) in abstratos
+    assert mesclador.estatisticas["listas_copiadas"] == 2
+
+
+def test_logotipo_repetido_vira_uma_unica_midia(templates, mesclagem):
+    pedidos = [templates.pedido("imagem_a"), templates.pedido("imagem_b")]
+    doc = gw.gerar_documento(templates.modelo_base, CAMPOS, pedidos)
+
+    reaberto = _reabrir(doc)
+    imagens = [p for p in reaberto.part.package.iter_parts() if isinstance(p, ImagePart)]
+    assert len(imagens) == 1
+    embeds = reaberto.element.body.xpath(".//a:blip/@r:embed")
+    assert len(embeds) == 3
+    assert all(reaberto.part.related_parts[rid] is imagens[0] for rid in embeds)
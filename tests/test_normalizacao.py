@@ -0,0 +1,61 @@
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
+
+from src.normalizacao import contar_runs, estatisticas_do_documento, normalizar_documento
+
+_PARAGRAFO = (
+    f'<w:p {nsdecls("w")} w:rsidR="00A1" w:rsidRDefault="00A2">'
+    '<w:r w:rsidR="00B1"><w:t xml:space="preserve">Nome: {{NOME_</w:t></w:r>'
+    '<w:proofErr w:type="spellStart"/>'
+    '<w:r w:rsidR="00B2"><w:t>RECLAMANTE}}</w:t></w:r>'
+    '<w:proofErr w:type="spellEnd"/>'
+    '<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve"> em </w:t></w:r>'
+    '<w:r><w:rPr><w:b/></w:rPr><w:t>negrito</w:t></w:r>'
+    '<w:r><w:tab/></w:r>'
+    '<w:r><w:t>depois</w:t></w:r>'
+    '</w:p>'
+)
+
+
+def _documento():
+    doc = Document()
+    doc.element.body.insert(0, parse_xml(_PARAGRAFO))
+    doc.sections[0].header.paragraphs[0].text = "{{NOME_"
+    doc.sections[0].header.paragraphs[0].add_run("RECLAMANTE}}")
+    return doc
+
+
+def test_mescla_runs_com_mesma_formatacao_sem_mudar_o_texto():
+    doc = _documento()
+    texto = doc.paragraphs[0].text
+    cabecalho = doc.sections[0].header.paragraphs[0].text
+
+    estatisticas = normalizar_documento(doc)
+
+    p = doc.paragraphs[0]
+    assert p.text == texto
+    assert [r.text for r in p.runs] == ["Nome: {{NOME_RECLAMANTE}}", " em negrito", "\t", "depois"]
+    assert p.runs[1].bold and not p.runs[0].bold
+    assert p.runs[1]._r.t_lst[0].get("{http://www.w3.org/XML/1998/namespace}space") == "preserve"
+    assert [r.text for r in doc.sections[0].header.paragraphs[0].runs] == [cabecalho]
+    assert estatisticas["runs_antes"] - estatisticas["runs_depois"] == 3
+    assert estatisticas["runs_depois"] == contar_runs(doc)
+    assert estatisticas_do_documento(doc) == estatisticas
+
+
+def test_remove_rsid_e_proof_err():
+    doc = _documento()
+    estatisticas = normalizar_documento(doc)
+    xml = doc.element.xml
+    assert "w:rsid" not in xml and "proofErr" not in xml
+    assert estatisticas["proof_err_removidos"] == 2
+    assert estatisticas["rsid_removidos"] >= 4
+
+
+def test_run_com_tabulacao_nao_e_mesclado():
+    doc = _documento()
+    normalizar_documento(doc)
+    runs = doc.paragraphs[0]._p.findall(qn("w:r"))
+    assert runs[2].find(qn("w:tab")) is not None
+    assert runs[3].find(qn("w:t")).text == "depois"
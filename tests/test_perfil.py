@@ -0,0 +1,42 @@
+import os
+import threading
+
+from src import perfil
+
+
+def _perfilar(etapa):
+    with perfil.perfilar(etapa, pedidos=1) as ctx:
+        bytearray(1024)
+    return ctx
+
+
+def test_perfis_no_mesmo_segundo_nao_se_sobrescrevem(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfil, "_diretorio", str(tmp_path))
+    monkeypatch.setattr(perfil, "_ativo", True)
+    prefixos = {_perfilar("geracao").prefixo for _ in range(3)}
+    assert len(prefixos) == 3
+    assert all(str(os.getpid()) in p for p in prefixos)
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".txt")]) == 3
+
+
+def test_perfis_simultaneos_avisam_que_o_pico_e_do_processo(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfil, "_diretorio", str(tmp_path))
+    monkeypatch.setattr(perfil, "_ativo", True)
+    dentro, liberar = threading.Event(), threading.Event()
+
+    def outro():
+        with perfil.perfilar("outro"):
+            dentro.set()
+            liberar.wait(5)
+
+    t = threading.Thread(target=outro)
+    t.start()
+    dentro.wait(5)
+    ctx = _perfilar("geracao")
+    liberar.set()
+    t.join()
+
+    assert not ctx.exclusivo
+    with open(os.path.join(tmp_path, f"{ctx.prefixo}_geracao.txt"), encoding="utf-8") as f:
+        assert "processo todo" in f.read()
+    assert _perfilar("sozinho").exclusivo
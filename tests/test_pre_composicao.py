@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import main, registro_log
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _encerrar_log():
+    # importar main configura o log no console capturado pelo pytest; encerra antes de ele ser fechado
+    yield
+    registro_log.encerrar()
+
+
+def _janela(chave, ultimo):
+    submetidos = []
+    return SimpleNamespace(
+        _pre_composicao_after="after#1",
+        _especulacao=None,
+        _ultimo_documento=ultimo,
+        _caminho_template=lambda: "modelo_base.docx",
+        _pedidos_ordenados=lambda: [("lista", "lista.docx")],
+        _chave_composicao=lambda caminho, pedidos: chave,
+        _descartar_pre_composicao=lambda: None,
+        _executor_pre=SimpleNamespace(submit=lambda *a: submetidos.append(a)),
+    ), submetidos
+
+
+def test_nao_pre_compoe_a_selecao_do_ultimo_documento():
+    janela, submetidos = _janela("k1", ("k1", object(), None))
+    main.App._iniciar_pre_composicao(janela)
+    assert not submetidos and janela._especulacao is None
+
+
+def test_pre_compoe_quando_a_selecao_mudou():
+    janela, submetidos = _janela("k2", ("k1", object(), None))
+    main.App._iniciar_pre_composicao(janela)
+    assert len(submetidos) == 1 and janela._especulacao[0] == "k2"
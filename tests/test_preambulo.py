@@ -0,0 +1,54 @@
+import pytest
+
+from src import generate_word as gw
+
+from conftest import CAMPOS
+
+CORRIGIDOS = dict(CAMPOS, **{"Número do cpf": "111.222.333-44", "Nome reclamante": "MARIA SOUZA"})
+
+
+def _partes_xml(doc):
+    return [doc.element.xml] + [p.element.xml for p in gw._header_footer_parts(doc)]
+
+
+def _pedidos(templates):
+    return [templates.pedido("cabecalho"), templates.pedido("lista"), templates.pedido("imagem_a")]
+
+
+def _gerar(templates, campos):
+    return gw.gerar_documento(templates.modelo_base, campos, _pedidos(templates))
+
+
+def _pre_compor(templates, campos):
+    doc = gw.compor_documento(templates.modelo_base, _pedidos(templates))
+    assert gw.preencher_documento_composto(doc, templates.modelo_base, campos)
+    return doc
+
+
+def _esqueleto(templates, campos):
+    return gw.compor_esqueleto(templates.modelo_base, _pedidos(templates)).preencher(campos)
+
+
+@pytest.mark.parametrize("montar", [_gerar, _pre_compor, _esqueleto], ids=["gerar", "pre_composicao", "esqueleto"])
+def test_atualizar_preambulo_equivale_a_gerar_de_novo(templates, mesclagem, montar):
+    # valor vazio na primeira geração: o run vazio registrado precisa receber o valor depois
+    iniciais = dict(CAMPOS, **{"Nome reclamada": ""})
+    doc = montar(templates, iniciais)
+
+    alterados = gw.atualizar_preambulo(doc, CORRIGIDOS)
+
+    assert alterados > 0
+    assert _partes_xml(doc) == _partes_xml(_gerar(templates, CORRIGIDOS))
+
+
+def test_atualizar_preambulo_sem_mudancas(templates, interna):
+    doc = _gerar(templates, CAMPOS)
+    antes = _partes_xml(doc)
+    assert gw.atualizar_preambulo(doc, CAMPOS) == 0
+    assert _partes_xml(doc) == antes
+
+
+def test_documento_sem_mapa(templates):
+    from docx import Document
+
+    assert gw.atualizar_preambulo(Document(templates.modelo_base), CAMPOS) is None
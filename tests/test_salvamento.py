@@ -0,0 +1,55 @@
+import io
+import zipfile
+import zlib
+
+from docx import Document
+
+from src import salvamento
+
+
+def _entrada(caminho, prefixo):
+    with zipfile.ZipFile(caminho) as z:
+        info = next(i for i in z.infolist() if i.filename.startswith(prefixo))
+        return info, z.read(info)
+
+
+def test_colisao_de_crc_e_tamanho_nao_copia_bytes_de_outra_parte(templates, monkeypatch):
+    monkeypatch.setattr(salvamento, "_origens", {})
+    monkeypatch.setattr(salvamento, "_digests", {})
+    monkeypatch.setattr(salvamento, "_registrados", {})
+    salvamento.registrar_origem(templates.modelo_base)
+    info, conteudo = _entrada(templates.modelo_base, "word/media/")
+    origem = salvamento._origem_de(conteudo)
+    assert origem is not None and origem[1].filename == info.filename
+
+    # outra parte, mesmo tamanho, registrada como se tivesse o mesmo CRC-32 da entrada do template
+    outro = bytes(b ^ 0xFF for b in conteudo)
+    candidatos = salvamento._origens[(info.CRC, info.file_size)]
+    salvamento._origens[(zlib.crc32(outro), len(outro))] = candidatos
+    assert salvamento._origem_de(outro) is None
+
+
+def test_gravar_pacote_copia_partes_intactas(templates):
+    salvamento.registrar_origem(templates.modelo_base)
+    doc = Document(templates.modelo_base)
+    destino = io.BytesIO()
+    estatisticas = salvamento.gravar_pacote(doc, destino)
+    assert estatisticas["copiadas"] > 0
+    with zipfile.ZipFile(destino) as z, zipfile.ZipFile(templates.modelo_base) as original:
+        assert z.testzip() is None
+        for nome in original.namelist():
+            if nome.startswith("word/media/"):
+                assert z.read(nome) == original.read(nome)
+
+
+def test_documento_do_servico_grava_os_bytes_sem_aviso(tmp_path, caplog):
+    from src import generate_word as gw
+    from src.servico_cliente import DocumentoGerado
+
+    conteudo = b"PK\x05\x06" + b"\x00" * 18  # zip vazio
+    destino = tmp_path / "saida.docx"
+    with caplog.at_level("WARNING"):
+        gw.salvar_documento(DocumentoGerado(conteudo), str(destino))
+        assert gw.documento_em_bytes(DocumentoGerado(conteudo)) == conteudo
+    assert destino.read_bytes() == conteudo
+    assert not [r for r in caplog.records if "salvamento próprio falhou" in r.getMessage()]
@@ -0,0 +1,74 @@
+import pytest
+from docx import Document
+
+from src import generate_word as gw
+
+SUBSTITUICOES = gw.montar_substituicoes({
+    "Nome reclamante": "MARIA DA SILVA",
+    "Número do cpf": "123.456.789-00",
+    "Profissao / Cargo": "PEDREIRA",
+})
+
+
+def _paragrafo(*textos):
+    p = Document().add_paragraph()
+    for texto in textos:
+        p.add_run(texto)
+    return p
+
+
+def _substituir(p, campos_negrito=frozenset()):
+    gw.replace_placeholders_in_paragraph_preserve_runs(p, SUBSTITUICOES, campos_negrito)
+    return p
+
+
+def test_placeholder_dividido_entre_runs():
+    p = _substituir(_paragrafo("Nome: {{NOME_", "RECLA", "MANTE}}."))
+    assert p.text == "Nome: MARIA DA SILVA."
+
+
+def test_placeholders_adjacentes():
+    p = _substituir(_paragrafo("{{NOME_RECLAMANTE}}{{PROFISSAO_RECLAMANTE}}"))
+    assert p.text == "MARIA DA SILVAPEDREIRA"
+    assert [r.text for r in p.runs] == ["MARIA DA SILVA", "PEDREIRA"]
+
+
+def test_placeholder_desconhecido_fica_intacto():
+    p = _substituir(_paragrafo("{{X}} e {{NOME_RECLAMANTE}} e {{OUTRO}}"))
+    assert p.text == "{{X}} e MARIA DA SILVA e {{OUTRO}}"
+
+
+def test_texto_depois_do_ultimo_placeholder_e_mantido():
+    p = _substituir(_paragrafo("CPF {{NUMERO_CPF_RECLAMANTE}}", ", residente e domiciliada"))
+    assert p.text == "CPF 123.456.789-00, residente e domiciliada"
+
+
+def test_paragrafo_sem_placeholder_nao_e_alterado():
+    p = _paragrafo("sem ", "placeholders")
+    runs = [r._r for r in p.runs]
+    _substituir(p)
+    assert [r._r for r in p.runs] == runs
+
+
+@pytest.mark.parametrize("negrito", [True, False])
+def test_negrito_dos_campos_negrito(negrito):
+    campos_negrito = {"{{NOME_RECLAMANTE}}"} if negrito else set()
+    p = _substituir(_paragrafo("Reclamante: {{NOME_RECLAMANTE}}, CPF {{NUMERO_CPF_RECLAMANTE}}"), campos_negrito)
+    por_texto = {r.text: r for r in p.runs}
+    assert bool(por_texto["MARIA DA SILVA"].bold) is negrito
+    assert not por_texto["123.456.789-00"].bold
+    assert not por_texto["Reclamante: "].bold
+    assert por_texto["MARIA DA SILVA"].font.name == "Garamond"
+
+
+def test_formatacao_do_run_de_origem_e_preservada():
+    p = _paragrafo("CPF {{NUMERO_CPF_RECLAMANTE}} fim")
+    p.runs[0].italic = True
+    p.runs[0].font.name = "Arial"
+    _substituir(p)
+    assert all(r.italic for r in p.runs)
+    assert {r.font.name for r in p.runs} == {"Arial"}
+
+
+def test_nome_reclamante_e_campo_negrito_padrao():
+    assert "{{NOME_RECLAMANTE}}" in gw.CAMPOS_NEGRITO
@@ -0,0 +1,74 @@
+import os
+
+from docx import Document
+
+from src.template_cache import TemplateCache, _estimate_template_bytes, clonar_documento
+
+
+def _salvar(caminho, texto):
+    doc = Document()
+    doc.add_paragraph(texto)
+    doc.save(caminho)
+
+
+def test_clone_independente_do_documento_em_cache(tmp_path):
+    caminho = str(tmp_path / "a.docx")
+    _salvar(caminho, "original")
+    cache = TemplateCache(10 * _estimate_template_bytes(caminho))
+
+    primeiro = cache.get(caminho)
+    primeiro.paragraphs[0].text = "alterado"
+    primeiro.add_paragraph("novo")
+    segundo = cache.get(caminho)
+
+    assert [p.text for p in segundo.paragraphs] == ["original"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_clonar_documento_recria_o_corpo():
+    doc = Document()
+    doc.add_paragraph("original")  # cria o _Body do original
+    clone = clonar_documento(doc)
+    clone.add_paragraph("novo")
+    # doc.paragraphs precisa enxergar a mesma árvore de clone.element
+    assert [p._p for p in clone.paragraphs] == list(clone.element.body.iterchildren(clone.paragraphs[0]._p.tag))
+    assert [p.text for p in doc.paragraphs] == ["original"]
+
+
+def test_evicao_pelo_orcamento(tmp_path):
+    a, b = str(tmp_path / "a.docx"), str(tmp_path / "b.docx")
+    _salvar(a, "a")
+    _salvar(b, "b")
+    cache = TemplateCache(int(_estimate_template_bytes(a) * 1.5))
+
+    cache.get(a)
+    cache.get(b)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+    cache.get(a)  # 'a' foi o menos usado e saiu do cache
+    assert cache.stats()["misses"] == 3
+
+
+def test_arquivo_alterado_em_disco_e_relido(tmp_path):
+    caminho = str(tmp_path / "a.docx")
+    _salvar(caminho, "versão 1")
+    cache = TemplateCache(10 * _estimate_template_bytes(caminho))
+    assert cache.get(caminho).paragraphs[0].text == "versão 1"
+
+    _salvar(caminho, "versão 2")
+    st = os.stat(caminho)
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    assert cache.get(caminho).paragraphs[0].text == "versão 2"
+    assert cache.stats()["misses"] == 2 and cache.stats()["entries"] == 1
+
+
+def test_orcamento_zero_desliga_o_cache(tmp_path):
+    caminho = str(tmp_path / "a.docx")
+    _salvar(caminho, "a")
+    cache = TemplateCache(0)
+    cache.get(caminho)
+    cache.get(caminho)
+    assert cache.stats()["entries"] == 0 and cache.stats()["misses"] == 2
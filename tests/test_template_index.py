@@ -0,0 +1,36 @@
+import os
+import shutil
+
+from src import generate_word as gw
+from src.template_index import TemplateIndex
+
+
+def test_listar_nao_abre_arquivos_e_atualizar_mantem_ilegiveis(templates):
+    with open(os.path.join(templates.modelos, "corrompido.docx"), "wb") as f:
+        f.write(b"nao e um zip")
+    chamadas = []
+
+    def calcular(caminho):
+        chamadas.append(caminho)
+        return gw._calcular_fatos_template(caminho)
+
+    indice = TemplateIndex(templates.pasta, calcular)
+    listados = indice.listar()
+    assert "modelos/corrompido.docx" in listados
+    assert not chamadas
+
+    fatos = indice.atualizar()
+    assert set(fatos) == set(listados)
+    assert fatos["modelos/corrompido.docx"] == {}
+    base = fatos["modelo_base.docx"]
+    assert "{{NOME_RECLAMANTE}}" in base["placeholders"] and "tem_midia" not in base
+
+
+def test_arquivo_removido_sai_do_indice(templates):
+    indice = TemplateIndex(templates.pasta, gw._calcular_fatos_template)
+    copia = os.path.join(templates.modelos, "copia.docx")
+    shutil.copy(templates.modelo_base, copia)
+    assert "modelos/copia.docx" in indice.atualizar()
+    os.remove(copia)
+    assert "modelos/copia.docx" not in indice.listar()
+    assert "modelos/copia.docx" not in indice._arquivos
@@ -0,0 +1,45 @@
+from docx import Document
+
+from src import generate_word as gw
+
+
+def _documento(*paragrafos):
+    doc = Document()
+    for texto, estilo, negrito in paragrafos:
+        p = doc.add_paragraph(style=estilo)
+        p.add_run(texto).bold = negrito
+    return doc
+
+
+def test_estilos_de_titulo_tem_prioridade():
+    doc = _documento(
+        ("Introdução em negrito", None, True),
+        ("Texto", None, False),
+        ("Dos fatos", "Heading 1", False),
+        ("Texto", None, False),
+        ("Do direito", "Title", False),
+        ("Dos pedidos", "Heading 2", False),
+    )
+    assert gw._find_title_paragraph_indices(doc) == [2, 4, 5]
+
+
+def test_completa_com_negrito_e_paragrafos_curtos():
+    doc = _documento(
+        ("", None, False),
+        ("Dos fatos", "Heading 1", False),
+        ("Texto do fato", None, False),
+        ("Do valor", None, True),
+        ("Texto " * 60, None, False),
+        ("Curto", None, False),
+        ("Seguinte", None, False),
+    )
+    # 1 título por estilo, 1 em negrito e o primeiro curto seguido de conteúdo que ainda não foi escolhido
+    assert gw._find_title_paragraph_indices(doc) == [1, 2, 3]
+
+
+def test_titulos_sequenciais_no_modelo_final():
+    doc = _documento(("Dos pedidos", None, True), ("Texto", None, False), ("Das provas", None, True),
+                     ("Texto", None, False), ("Do valor", None, True))
+    assert gw._apply_sequential_titles_to_doc(doc, 9) == 12
+    titulos = [doc.paragraphs[i].text.strip() for i in (0, 2, 4)]
+    assert titulos == ["IX - Dos pedidos", "X - Das provas", "XI - Do valor"]